@@ -5,6 +5,8 @@
 
 import os
 import sys
+import time
+import fnmatch
 import subprocess
 
 import lx
@@ -16,6 +18,7 @@ import lxu.select
 from PySide.QtGui import QGridLayout, QMessageBox
 
 import projectmanager
+import projectmanager_scan
 
 
 def os_startFile(filename):
@@ -29,6 +32,184 @@ def os_startFile(filename):
 		subprocess.call( [opener, filename] )
 
 
+def pm_currentProject():
+	'''
+	Return Modo's current project directory, or None if no project is set.
+	'''
+	try:
+		return lx.service.File().FileSystemPath( lx.symbol.sSYSTEM_PATH_PROJECT )
+	except:
+		return None
+
+
+def pm_parseTime(text):
+	'''
+	Parse a 'newer than' value: epoch seconds, 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM'.
+	'''
+	text = text.strip()
+	try:
+		return float(text)
+	except ValueError:
+		pass
+	for fmt in ('%Y-%m-%d %H:%M', '%Y-%m-%d'):
+		try:
+			return time.mktime(time.strptime(text, fmt))
+		except ValueError:
+			pass
+	raise ValueError('Unrecognised time: %s' %text)
+
+
+def pm_queryFiles(projDir, types=None, newer=None, pattern=None, refresh=False):
+	'''
+	Return full paths of files in a project, reusing the shared scan cache.
+	Scans go through the shared index or index daemon if the view options ask for
+	them, even when no Project Manager panel is open.
+	Arg 1: the project path <string>
+	Arg 2: optional '|' separated extensions, defaults to all compatible types <string>
+	Arg 3: optional modification time the files must be newer than <float>
+	Arg 4: optional name pattern; wildcards use fnmatch, otherwise a substring match <string>
+	Arg 5: rescan even if a cached scan exists <bool>
+	'''
+	allTypes = projectmanager_scan.scan_splitExtensions(projectmanager.FILETYPES.values())
+	wanted = projectmanager_scan.scan_splitExtensions([types]) if types else None
+
+	# image types are only scanned when asked for, as render folders can hold millions of frames
+	scanTypes = allTypes - projectmanager_scan.SEQUENCE_EXTENSIONS
+	if wanted:
+		scanTypes |= wanted
+	projectmanager_scan.SCANNER = projectmanager.read_scanner()
+	result = projectmanager_scan.scan_cached(projDir, scanTypes, refresh)
+
+	if pattern:
+		pattern = pattern.lower()
+		if not any(c in pattern for c in '*?['):
+			pattern = '*%s*' %pattern
+
+	paths = []
+	for row in result.rows(wanted):
+		if newer is not None and result.mtime(row) <= newer:
+			continue
+		if pattern and not fnmatch.fnmatchcase(result.name(row).lower(), pattern):
+			continue
+		paths.append(result.fullPath(row))
+	return sorted(paths, key=projectmanager_scan.scan_naturalKey)
+
+
+#----------------------------------------------------------------------------------------------------------------------
+class QueryCommand (lxu.command.BasicCommand):
+	'''
+	Base class for the scriptable pm.* query commands.
+	Subclasses add their arguments, then a final query argument, and implement query_Values().
+	Example: lx.evalN('pm.scan types:.lxo newer:2015-05-01 files:?')
+	'''
+	def __init__(self):
+		lxu.command.BasicCommand.__init__(self)
+
+	def cmd_Flags(self):
+		return lx.symbol.fCMD_UI
+
+	def query_Values(self):
+		return []
+
+	def cmd_Query(self, index, vaQuery):
+		va = lx.object.ValueArray()
+		va.set(vaQuery)
+		try:
+			for value in self.query_Values():
+				va.AddString(value)
+		except (ValueError, OSError) as error:
+			lx.out('PROJECT MANAGER: %s' %error)
+			return lx.result.FAILED
+		return lx.result.OK
+
+	def basic_Execute(self, msg, flags):
+		''' Log the results when run without a query '''
+		try:
+			for value in self.query_Values():
+				lx.out(value)
+		except (ValueError, OSError) as error:
+			lx.out('PROJECT MANAGER: %s' %error)
+
+
+#----------------------------------------------------------------------------------------------------------------------
+class ScanProject (QueryCommand):
+	'''
+	Query the files of a project, e.g. all .lxo files newer than a date.
+	Defaults to the current project. Cached scans are reused unless refresh is set.
+	'''
+	def __init__(self):
+		QueryCommand.__init__(self)
+		self.dyna_Add('project', lx.symbol.sTYPE_STRING)
+		self.basic_SetFlags(0, lx.symbol.fCMDARG_OPTIONAL)
+		self.dyna_Add('types', lx.symbol.sTYPE_STRING)
+		self.basic_SetFlags(1, lx.symbol.fCMDARG_OPTIONAL)
+		self.dyna_Add('newer', lx.symbol.sTYPE_STRING)
+		self.basic_SetFlags(2, lx.symbol.fCMDARG_OPTIONAL)
+		self.dyna_Add('refresh', lx.symbol.sTYPE_BOOLEAN)
+		self.basic_SetFlags(3, lx.symbol.fCMDARG_OPTIONAL)
+		self.dyna_Add('files', lx.symbol.sTYPE_STRING)
+		self.basic_SetFlags(4, lx.symbol.fCMDARG_QUERY | lx.symbol.fCMDARG_OPTIONAL)
+
+	def query_Values(self):
+		projDir = self.dyna_String(0, '') or pm_currentProject()
+		if not projDir or not os.path.isdir(projDir):
+			raise ValueError('No valid project to scan.')
+		newer = self.dyna_String(2, '')
+		return pm_queryFiles(	projDir,
+								types=self.dyna_String(1, ''),
+								newer=pm_parseTime(newer) if newer else None,
+								refresh=self.dyna_Bool(3, False))
+
+
+#----------------------------------------------------------------------------------------------------------------------
+class ListProjects (QueryCommand):
+	'''
+	Query the project paths in the Project Manager's project list.
+	'''
+	def __init__(self):
+		QueryCommand.__init__(self)
+		self.dyna_Add('missing', lx.symbol.sTYPE_BOOLEAN)
+		self.basic_SetFlags(0, lx.symbol.fCMDARG_OPTIONAL)
+		self.dyna_Add('projects', lx.symbol.sTYPE_STRING)
+		self.basic_SetFlags(1, lx.symbol.fCMDARG_QUERY | lx.symbol.fCMDARG_OPTIONAL)
+
+	def query_Values(self):
+		projects = projectmanager.read_projectList()
+		if not self.dyna_Bool(0, False):
+			projects = [p for p in projects if os.path.exists(p)]
+		return projects
+
+
+#----------------------------------------------------------------------------------------------------------------------
+class FindScene (QueryCommand):
+	'''
+	Query scenes by name, in the current project or in every listed project (project:*).
+	'''
+	def __init__(self):
+		QueryCommand.__init__(self)
+		self.dyna_Add('name', lx.symbol.sTYPE_STRING)
+		self.dyna_Add('project', lx.symbol.sTYPE_STRING)
+		self.basic_SetFlags(1, lx.symbol.fCMDARG_OPTIONAL)
+		self.dyna_Add('types', lx.symbol.sTYPE_STRING)
+		self.basic_SetFlags(2, lx.symbol.fCMDARG_OPTIONAL)
+		self.dyna_Add('files', lx.symbol.sTYPE_STRING)
+		self.basic_SetFlags(3, lx.symbol.fCMDARG_QUERY | lx.symbol.fCMDARG_OPTIONAL)
+
+	def query_Values(self):
+		project = self.dyna_String(1, '') or pm_currentProject()
+		if project == '*':
+			projects = [p for p in projectmanager.read_projectList() if os.path.isdir(p)]
+		elif project and os.path.isdir(project):
+			projects = [project]
+		else:
+			raise ValueError('No valid project to search.')
+
+		paths = []
+		for projDir in projects:
+			paths.extend(pm_queryFiles(projDir, types=self.dyna_String(2, ''), pattern=self.dyna_String(0, '')))
+		return paths
+
+
 #----------------------------------------------------------------------------------------------------------------------
 class ShowProjectManager ( lxu.command.BasicCommand ):
 	'''
@@ -114,6 +295,8 @@ class ProjectManager_CustomView(lxifc.CustomView):
 		if parentWidget != None:
 			layout = QGridLayout()
 			layout.setContentsMargins(1,1,1,1)
+			# panels share their project list, options and caches through projectmanager.read_service(),
+			# so reopening the layout only builds the widgets
 			self.form = projectmanager.ProjectManager()
 			layout.addWidget(self.form)
 			parentWidget.setLayout(layout)
@@ -127,4 +310,7 @@ class ProjectManager_CustomView(lxifc.CustomView):
 lx.bless( ShowProjectManager, "pm.open" )
 lx.bless( ExploreProjectFolder, "pm.exploreCurrent" )
 lx.bless( ExploreSceneFolder, "pm.exploreSceneFolder" )
+lx.bless( ScanProject, "pm.scan" )
+lx.bless( ListProjects, "pm.projects" )
+lx.bless( FindScene, "pm.findScene" )
 lx.bless( ProjectManager_CustomView, "ProjectManager" )
@@ -5,7 +5,7 @@
 
 import os
 import sys
-import pickle
+import time
 import subprocess
 
 import lx
@@ -14,6 +14,21 @@ from PySide.QtGui import *
 from PySide.QtCore import *
 
 from projectmanager_ui import Ui_projectManager
+import projectmanager_scan
+import projectmanager_match
+import projectmanager_snapshot
+import projectmanager_catalog
+import projectmanager_prewarm
+import projectmanager_localcache
+import projectmanager_index
+import projectmanager_daemon
+import projectmanager_archive
+import projectmanager_multiscan
+import projectmanager_loadtimes
+import projectmanager_service
+import projectmanager_cleanup
+import projectmanager_thumbs
+import projectmanager_stalls
 
 version = '1.0.7'
 
@@ -23,6 +38,197 @@ KITPATH = os.path.dirname(__file__)
 DATAPATH = os.path.join(KITPATH, 'data')
 FILTERSPATH = os.path.join(DATAPATH, 'filters.p')
 PROJECTLISTFILE = os.path.join(DATAPATH, 'projects.projlist')
+USAGEPATH = os.path.join(DATAPATH, 'usage.p')
+OPTIONSPATH = os.path.join(DATAPATH, 'options.p')
+VERSIONPATTERNSFILE = os.path.join(DATAPATH, 'versionpatterns.txt')
+
+# DEFAULT VIEW OPTIONS
+OPTIONS = {
+    'collapseSequences': True,
+    'groupVersions': True,
+    'changesOnly': False,
+    'projectCatalog': False,
+    'catalogLevel': 1,
+    'prewarmScenes': False,
+    'prewarmBudgetMB': 2048,
+    'localCache': False,
+    'localCachePath': projectmanager_localcache.LOCALCACHE_PATH,
+    'localCacheQuotaGB': 20,
+    'sharedIndex': False,
+    'indexDaemon': False,
+    'sceneFoldersOnly': False,
+    'heavySceneSecs': projectmanager_loadtimes.LOADTIMES_HEAVYSECS,
+    'cleanupOlderThanDays': 30,
+    'cleanupKeepVersions': 2,
+    'cleanupToTrash': True,
+    'thumbnailGrid': False,
+    'stallDetector': False,
+    }
+
+# CHANGES SINCE LAST VISIT
+CHANGE_COLORS = {
+    'added': '#6DA34D',
+    'modified': '#D9A33F',
+    'removed': '#8C2727',
+    }
+
+# COMPATIBLE SCENE FILETYPES
+FILETYPES = {
+    'Modo (*.lxo)': '.lxo',
+    'Preset (*.lxl)': '.lxl',
+    'Lightwave (*.lwo)': '.lwo',
+    'Wavefront (*.obj)': '.obj',
+    'Alembic (*.abc)':'.abc',
+    'Filmbox (*.fbx)': '.fbx',
+    'Collada (*.dae)': '.dae',
+    'Rhino (*.3dm)': '.3dm',
+    'Autodesk DXF (.*dxf)': '.dxf',
+    'Adobe Illustrator (*.eps, *.ai)': '.eps|.ai',
+    'Stereolithography (*.stl)': '.stl',
+    'Videoscape (*.geo)': '.geo',
+    'Solidworks (*.sldprt, *.sldasm)': '.sldprt|.sldasm',
+    'Protein DB (*.pdb)': '.pdb',
+    'OpenEXR (*.exr)': '.exr',
+    'Images (*.png, *.jpg, *.tif, *.tga, *.hdr)': '.png|.jpg|.jpeg|.tif|.tiff|.tga|.hdr'
+    }
+
+# PREFETCH
+PREFETCH_IDLEMS = 1500      # quiet time before likely-next projects are pre-scanned
+PREFETCH_NEIGHBORS = 2      # rows above and below the selection to consider
+
+# PREWARM
+PREWARM_DELAYMS = 400       # how long a scene must stay selected or hovered before it is read ahead
+PREWARM_BUDGETS = (512, 2048, 8192)
+
+# LOCAL CACHE
+LOCALCACHE_QUOTAS = (5, 20, 100)
+LOCALCACHE_POLLMS = 1000    # how often the Source column is refreshed while copies are running
+LOCALCACHE_LABELS = {
+    'local': ('Local', '#6DA34D'),
+    'copying': ('Copying', '#D9A33F'),
+    'stale': ('Remote', '#8C2727'),
+    'remote': ('Remote', '#575757'),
+    }
+
+# SCENE LIST COLUMNS
+SCENECOL_NAME = 0
+SCENECOL_PATH = 1
+SCENECOL_SIZE = 2
+SCENECOL_MODIFIED = 3
+SCENECOL_SOURCE = 4
+SCENECOL_PROJECT = 5
+SCENECOL_LOADTIME = 6
+
+# LOAD TIMES
+LOADTIMES_THRESHOLDS = (30, 60, 180, 600)
+LOADTIMES_HEAVYCOLOR = '#8C2727'
+
+# MULTI-PROJECT SCAN
+MULTISCAN_POLLMS = 150      # how often rows scanned from several projects are added to the list
+
+# CLEANUP
+CLEANUP_AGES = (7, 30, 90)              # days
+CLEANUP_KEEPVERSIONS = (1, 2, 3, 5)
+
+# THUMBNAIL GRID
+GRID_CELLWIDTH = 150
+GRID_CELLHEIGHT = 170
+GRID_DELAYMS = 40           # scrolling debounce before the cells on screen get their thumbnails
+GRID_POLLMS = 50            # how often decoded thumbnails are shown while some are pending
+GRID_REBUILDMS = 100        # how long the grid waits for the Scene List to settle before following it
+GRID_NOTHUMBNAIL = False    # cached for files without a thumbnail, so they aren't decoded again
+
+# STALL DETECTOR
+STALLS_TICKMS = 50          # heartbeat interval; a gap between beats is the event loop's latency
+
+# SCENE FILTER
+FILTER_THREADROWS = 20000   # lists at least this long are matched off the UI thread
+FILTER_DELAYMS = 60         # keystroke debounce for lists matched off the UI thread
+
+
+def read_service():
+    '''
+    Return the process-wide ProjectService shared by every panel, reading the
+    data files on first use.
+    '''
+    return projectmanager_service.service_getShared(PROJECTLISTFILE, FILTERSPATH, OPTIONSPATH, USAGEPATH,
+                                                    VERSIONPATTERNSFILE, OPTIONS)
+
+
+def read_versionPatterns():
+    '''
+    Return the scene version patterns, one regular expression per line of the
+    Version Patterns File, or the defaults if the file is missing or empty.
+    Each pattern needs a 'version' group, e.g. _v(?P<version>\d+)$
+    '''
+    return read_service().versionPatterns()
+
+
+def read_scanner(options=None):
+    '''
+    Return the function project scans should go through, as set in the view options:
+    the index daemon and/or the shared index, or a plain walk.
+    Arg 1: optional view options, defaults to the saved ones <dict>
+    '''
+    if options is None:
+        options = read_service().options()
+    if options.get('sharedIndex'):
+        scanner = projectmanager_index.index_scan
+    else:
+        scanner = projectmanager_scan.scan_project
+    if options.get('indexDaemon'):
+        scanner = projectmanager_daemon.daemon_scanner(scanner)
+    return scanner
+
+
+def read_projectList():
+    '''
+    Return the project paths stored in the Project List File, in file order.
+    '''
+    return read_service().projects()
+
+
+def read_thumbnail(path, ext, size):
+    '''
+    Decode a downscaled thumbnail of an image file, or of the preview Modo
+    embeds in scenes and presets. Called from the thumbnail threads, so it
+    only uses QImage; returns None if there is nothing to show.
+    Arg 1: the file path <string>
+    Arg 2: the lowercase extension <string>
+    Arg 3: the longest side of the thumbnail, in pixels <int>
+    '''
+    if ext in projectmanager_thumbs.THUMBS_PREVIEWEXTENSIONS:
+        preview = projectmanager_thumbs.thumbs_lxoPreview(path)
+        if preview is None:
+            return None
+        if preview[0] == 'encoded':
+            image = QImage.fromData(preview[1])
+        elif preview[0] == 'rgba':
+            # bytes are R, G, B, A; ARGB32 reads them the other way round
+            image = QImage(preview[3], preview[1], preview[2], preview[1] * 4, QImage.Format_ARGB32).rgbSwapped()
+        else:
+            image = QImage(preview[3], preview[1], preview[2], preview[1] * 3, QImage.Format_RGB888).copy()
+    else:
+        # formats like JPEG decode straight at the scaled size, without the full resolution image
+        reader = QImageReader(path)
+        fullSize = reader.size()
+        if fullSize.isValid() and (fullSize.width() > size or fullSize.height() > size):
+            reader.setScaledSize(fullSize.scaled(size, size, Qt.KeepAspectRatio))
+        image = reader.read()
+    if image.isNull():
+        return None
+    if image.width() > size or image.height() > size:
+        image = image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    return image
+
+
+def write_thumbnail(image, path):
+    '''
+    Save a thumbnail to the thumbnail folder; returns True if it was written.
+    Arg 1: the thumbnail <QImage>
+    Arg 2: the file path <string>
+    '''
+    return image.save(path)
 
 
 class StickyMenu(QObject):
@@ -40,6 +246,191 @@ class StickyMenu(QObject):
         return super(StickyMenu, self).eventFilter(obj, event)
 
 
+class HealthCheckWorker(QThread):
+    '''
+    Checks whether project paths are reachable off the UI thread, so dead shares don't block it.
+    '''
+    checked = Signal(object)
+
+    def __init__(self, paths, parent=None):
+        QThread.__init__(self, parent)
+        self.paths = paths
+
+    def run(self):
+        self.checked.emit(projectmanager_scan.scan_checkHealth(self.paths))
+
+
+class ProjectScanWorker(QThread):
+    '''
+    Scans a whole project in the background, once its scene folders are listed,
+    then diffs it against the snapshot of the previous visit and stores a fresh one.
+    Arg 5: the snapshot of the previous visit, when the visit goes on <Snapshot>
+    Arg 6: whether to load the stored snapshot instead, for a new visit <bool>
+    Arg 7: an existing scan of the whole project, which only needs diffing <ScanResult>
+    '''
+    scanned = Signal(int, object, object)
+
+    def __init__(self, projDir, extensions, versionPatterns, generation, baseline=None, load=True,
+                 result=None, parent=None):
+        QThread.__init__(self, parent)
+        self.projDir = projDir
+        self.extensions = extensions
+        self.versionPatterns = versionPatterns
+        self.generation = generation
+        self.baseline = baseline
+        self.load = load
+        self.result = result
+
+    def run(self):
+        result = self.result
+        if result is None:
+            try:
+                result = projectmanager_scan.scan_cached(self.projDir, self.extensions,
+                                                         versionPatterns=self.versionPatterns)
+            except (OSError, projectmanager_scan.ScanAborted):
+                self.scanned.emit(self.generation, None, None)
+                return
+        changes = projectmanager_snapshot.snapshot_visit(result, self.baseline, self.load)
+        self.scanned.emit(self.generation, result, changes)
+
+
+class ArchiveWorker(QThread):
+    '''
+    Lists the files to archive, then runs an Archiver over them in the background,
+    relaying its progress. The progress is None while files are being listed.
+    Arg 1: the project path <string>
+    Arg 2: the archive path <string>
+    Arg 3: callable taking a cancelled callable and returning (files, outside) <callable>
+    '''
+    progressed = Signal(object)
+    archived = Signal(object)
+
+    def __init__(self, projDir, archivePath, listFiles, parent=None):
+        QThread.__init__(self, parent)
+        self.projDir = projDir
+        self.archivePath = archivePath
+        self.listFiles = listFiles
+        self.outside = []
+        self.archiver = None
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+        if self.archiver is not None:
+            self.archiver.cancel()
+
+    def run(self):
+        try:
+            self.progressed.emit(None)
+            files, self.outside = self.listFiles(lambda: self.cancelled)
+            self.archiver = projectmanager_archive.Archiver(self.projDir, self.archivePath, files,
+                                                            self.progressed.emit)
+            if self.cancelled:
+                raise projectmanager_archive.ArchiveCancelled(self.archivePath)
+            self.archiver.run()
+            self.archived.emit(None)
+        except projectmanager_archive.ArchiveCancelled:
+            if self.archiver is None:
+                self.archived.emit('Cancelled while listing files.')
+            else:
+                self.archived.emit('Cancelled. Archive the same files to the same place to resume.')
+        except (IOError, OSError) as error:
+            self.archived.emit(str(error))
+
+
+class CleanupPlanWorker(QThread):
+    '''
+    Lists the files a cleanup would remove, in the background.
+    '''
+    planned = Signal(object)
+
+    def __init__(self, projDirs, rules, parent=None):
+        QThread.__init__(self, parent)
+        self.projDirs = projDirs
+        self.rules = rules
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        try:
+            plan = projectmanager_cleanup.cleanup_plan(self.projDirs, self.rules, cancelled=lambda: self.cancelled)
+        except projectmanager_cleanup.CleanupCancelled:
+            plan = None
+        self.planned.emit(plan)
+
+
+class CleanupWorker(QThread):
+    '''
+    Runs a Cleaner in the background, relaying its progress.
+    '''
+    progressed = Signal(object)
+    cleaned = Signal(object, object)
+
+    def __init__(self, cleaner, parent=None):
+        QThread.__init__(self, parent)
+        self.cleaner = cleaner
+        self.cleaner.progress = self.progressed.emit
+
+    def run(self):
+        try:
+            self.cleaned.emit(self.cleaner.execute(), None)
+        except projectmanager_cleanup.CleanupCancelled:
+            self.cleaned.emit(None, 'Cancelled. Files already handled stay cleaned up.')
+        except (IOError, OSError) as error:
+            self.cleaned.emit(None, str(error))
+
+
+class TrashEmptyWorker(QThread):
+    '''
+    Permanently deletes the cleanup trash of some projects in the background.
+    '''
+    progressed = Signal(int)
+    emptied = Signal(object)
+
+    def __init__(self, projDirs, parent=None):
+        QThread.__init__(self, parent)
+        self.projDirs = projDirs
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        errors = []
+        for idx, projDir in enumerate(self.projDirs):
+            if self.cancelled:
+                break
+            try:
+                projectmanager_cleanup.cleanup_emptyTrash(projDir)
+            except (IOError, OSError) as error:
+                errors.append('%s (%s)' % (projDir, error))
+            self.progressed.emit(idx + 1)
+        self.emptied.emit(errors)
+
+
+class SceneFilterWorker(QThread):
+    '''
+    Matches scene names against a filter query off the UI thread.
+    '''
+    matched = Signal(int, object, object)
+
+    def __init__(self, keys, candidates, query, generation, isStale, parent=None):
+        QThread.__init__(self, parent)
+        self.keys = keys
+        self.candidates = candidates
+        self.query = query
+        self.generation = generation
+        self.isStale = isStale
+
+    def run(self):
+        matches = projectmanager_match.match_filter(self.keys, self.query, self.candidates,
+                                                    lambda: self.isStale(self.generation))
+        if matches is not None:
+            self.matched.emit(self.generation, self.query, matches)
+
+
 class ProjectManager(QMainWindow):
     '''
     Modo Project Manager Class.
@@ -48,10 +439,134 @@ class ProjectManager(QMainWindow):
         QMainWindow.__init__(self, parent)
         self.ui = Ui_projectManager()
         self.ui.setupUi(self)
+
+        # the project list, filters, options and caches are shared by every panel
+        self.service = read_service()
+
+        # background pre-scanning of likely-next projects
+        self.prefetcher = projectmanager_scan.prefetch_getShared(self.scenes_getSceneExtensions())
+        self.prefetchTimer = QTimer(self)
+        self.prefetchTimer.setSingleShot(True)
+        self.prefetchTimer.setInterval(PREFETCH_IDLEMS)
+        self.prefetchTimer.timeout.connect(self.prefetch_idle)
+
+        # type-to-filter for the scene list
+        self.sceneItems = []
+        self.sceneVisible = None
+        self.sceneFilter = projectmanager_match.IncrementalFilter([])
+        self.filterGeneration = 0
+        self.filterWorkers = []
+        self.filterTimer = QTimer(self)
+        self.filterTimer.setSingleShot(True)
+        self.filterTimer.setInterval(FILTER_DELAYMS)
+        self.filterTimer.timeout.connect(self.filter_apply)
+        self.ui_buildSceneFilterField()
+
+        # stat columns and keyed sorting for the scene list
+        self.sceneResult = None
+        self.sceneEntries = []
+        self.sceneSortKeys = {}
+        self.sceneSort = (SCENECOL_NAME, Qt.AscendingOrder)
+        self.ui_buildSceneColumns()
+
+        # scene folders are listed first, the rest of the project is scanned in the background
+        self.scanGeneration = 0
+        self.scanWorkers = []
+        self.sceneHeader = self.ui.sceneTree.headerItem().text(0)
+
+        # several selected projects are scanned together into one merged list
+        self.multiScan = None
+        self.multiScanTimer = QTimer(self)
+        self.multiScanTimer.setInterval(MULTISCAN_POLLMS)
+        self.multiScanTimer.timeout.connect(self.multiscan_receive)
+        self.ui.projectTree.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.ui.sceneTree.setColumnHidden(SCENECOL_PROJECT, True)
+
+        # how long scenes took to load, recorded on every open, import and reference
+        self.loadTimes = projectmanager_loadtimes.loadtimes_getShared()
+
+        # changes since the last visit of the listed project
+        self.visitProject = None
+        self.visitBaseline = None
+        self.visitChanges = None
+        self.sceneChanges = {}
+        self.sceneRemoved = []
+
+        # view options, shown as checkboxes next to 'Show Paths'
+        self.options = self.service.options()
+        self.optionCheckBoxes = {}
+        self.ui_buildOptionsRow()
+        self.options_applyScanner()
+
+        # project catalog, type-ahead lookup and background health checks
+        self.projectPaths = []
+        self.projectItems = {}
+        self.projectHealth = {}
+        self.projectCatalog = None
+        self.projectIndex = None
+        self.healthWorkers = []
+        self.ui_buildProjectFindField()
+
+        # scene prewarming, started once a scene stays selected or hovered
+        self.prewarmer = None
+        self.prewarmItem = None
+        self.prewarmTimer = QTimer(self)
+        self.prewarmTimer.setSingleShot(True)
+        self.prewarmTimer.setInterval(PREWARM_DELAYMS)
+        self.prewarmTimer.timeout.connect(self.prewarm_start)
+        self.ui.sceneTree.setMouseTracking(True)
+
+        # local copies of files imported as references
+        self.localCache = None
+        self.localCacheItems = {}
+        self.localCacheTimer = QTimer(self)
+        self.localCacheTimer.setInterval(LOCALCACHE_POLLMS)
+        self.localCacheTimer.timeout.connect(self.localcache_refresh)
+        self.ui.sceneTree.setColumnHidden(SCENECOL_SOURCE, not self.options.get('localCache'))
+
+        # project archives, written in the background
+        self.archiveWorker = None
+        self.archiveDialog = None
+
+        # cache and render folder cleanups, planned and run in the background
+        self.cleanupWorker = None
+        self.cleanupDialog = None
+
+        # thumbnail grid, with thumbnails decoded in the background for the cells on screen
+        self.thumbCache = projectmanager_thumbs.thumbs_getShared()
+        self.thumbLoader = None
+        self.gridItems = {}
+        self.gridWaiting = {}
+        self.gridShown = set()
+        self.gridExtensions = None
+        self.gridRebuildTimer = QTimer(self)
+        self.gridRebuildTimer.setSingleShot(True)
+        self.gridRebuildTimer.setInterval(GRID_REBUILDMS)
+        self.gridRebuildTimer.timeout.connect(self.grid_rebuild)
+        self.gridVisibleTimer = QTimer(self)
+        self.gridVisibleTimer.setSingleShot(True)
+        self.gridVisibleTimer.setInterval(GRID_DELAYMS)
+        self.gridVisibleTimer.timeout.connect(self.grid_requestVisible)
+        self.gridTimer = QTimer(self)
+        self.gridTimer.setInterval(GRID_POLLMS)
+        self.gridTimer.timeout.connect(self.grid_receive)
+        self.ui_buildSceneGrid()
+
+        # opt-in watchdog, logging what blocks the UI thread
+        self.stallDetector = None
+        self.stallCount = None
+        self.stallTimer = QTimer(self)
+        self.stallTimer.setInterval(STALLS_TICKMS)
+        self.stallTimer.timeout.connect(self.stalls_beat)
+        self.ui_buildStallCounter()
+        self.ui.sceneTree.setSelectionMode(QAbstractItemView.ExtendedSelection)
+
         self.ui_setConnections()
 
         # set some initial UI states
-        self.ui.projectsSplitter.setSizes([450,450])
+        self.ui.projectsSplitter.setSizes([450,450,450])
+        self.ui_showSceneGrid(self.options.get('thumbnailGrid', False))
+        self.stalls_enable(self.options.get('stallDetector', False))
         self.projects_getExisting()
         self.ui.projectTree.setColumnWidth(0, 200)
         self.ui.sceneTree.setColumnWidth(0, 200)
@@ -59,6 +574,9 @@ class ProjectManager(QMainWindow):
         self.ui.sceneTree.setColumnHidden(1, True)
         self.ui_buildFileTypeFilterMenu()
 
+        # follow changes made from other panels
+        self.service.subscribe(self.service_changed)
+
     def ui_setConnections(self):
         '''
         Connect signals and slots.
@@ -67,7 +585,30 @@ class ProjectManager(QMainWindow):
         self.ui.togglePathsCheckBox.stateChanged.connect(self.ui_togglePaths)
         self.ui.projectTree.itemDoubleClicked.connect(self.scenes_getAll)
         self.ui.projectTree.itemSelectionChanged.connect(self.scenes_clearList)
+        self.ui.projectTree.itemSelectionChanged.connect(self.prefetch_restartTimer)
         self.ui.sceneTree.itemDoubleClicked.connect(self.act_scn_openSelected)
+        self.ui.sceneFilterField.textChanged.connect(self.filter_queue)
+        self.ui.sceneTree.header().sectionClicked.connect(self.scenes_sortByColumn)
+        self.ui.sceneTree.itemExpanded.connect(self.scenes_expandItem)
+        self.ui.collapseSequencesCheckBox.stateChanged.connect(self.ui_toggleCollapseSequences)
+        self.ui.groupVersionsCheckBox.stateChanged.connect(self.ui_toggleGroupVersions)
+        self.ui.changesOnlyCheckBox.stateChanged.connect(self.ui_toggleChangesOnly)
+        self.ui.projectCatalogCheckBox.stateChanged.connect(self.ui_toggleProjectCatalog)
+        self.ui.projectFindField.textChanged.connect(self.projects_find)
+        self.ui.projectTree.itemExpanded.connect(self.projects_expandGroup)
+        self.ui.prewarmScenesCheckBox.stateChanged.connect(self.ui_togglePrewarmScenes)
+        self.ui.sceneTree.itemSelectionChanged.connect(self.prewarm_queue)
+        self.ui.sceneTree.itemEntered.connect(self.prewarm_queue)
+        self.ui.localCacheCheckBox.stateChanged.connect(self.ui_toggleLocalCache)
+        self.ui.sharedIndexCheckBox.stateChanged.connect(self.ui_toggleSharedIndex)
+        self.ui.indexDaemonCheckBox.stateChanged.connect(self.ui_toggleIndexDaemon)
+        self.ui.sceneFoldersOnlyCheckBox.stateChanged.connect(self.ui_toggleSceneFoldersOnly)
+        self.ui.thumbnailGridCheckBox.stateChanged.connect(self.ui_toggleThumbnailGrid)
+        self.ui.stallDetectorCheckBox.stateChanged.connect(self.ui_toggleStallDetector)
+        self.ui.sceneGrid.itemSelectionChanged.connect(self.grid_selectScenes)
+        self.ui.sceneGrid.itemDoubleClicked.connect(self.act_scn_openSelected)
+        self.ui.sceneGrid.verticalScrollBar().valueChanged.connect(self.grid_queueVisible)
+        self.ui.sceneGrid.verticalScrollBar().rangeChanged.connect(self.grid_queueVisible)
 
         # project actions
         self.ui.act_newProject.triggered.connect(self.act_project_create)
@@ -86,6 +627,7 @@ class ProjectManager(QMainWindow):
         # context menus
         self.ui.projectTree.customContextMenuRequested.connect(self.contextMenu_projectList)
         self.ui.sceneTree.customContextMenuRequested.connect(self.contextMenu_sceneList)
+        self.ui.sceneGrid.customContextMenuRequested.connect(self.contextMenu_sceneList)
 
     def ui_clearTreeWidget(self, treewidget):
         '''
@@ -118,12 +660,7 @@ class ProjectManager(QMainWindow):
         self.ui.filtersMenu.aboutToHide.connect(self.ui_closeFileTypeFilterMenu)
 
         # load prevous selection if possible
-        data = False
-        if os.path.exists(FILTERSPATH):
-            try:
-                data = pickle.load(open(FILTERSPATH, 'r'))
-            except IOError:
-                lx.out('PROJECT MANAGER: Unable to apply previous filters. Data incorrectly serialized.')
+        data = self.service.filters()
 
         # populate the list of filetype options
         fileTypes = self.ui_getFileTypes()
@@ -137,13 +674,347 @@ class ProjectManager(QMainWindow):
         # apply the menu to the button
         self.ui.filtersBtn.setMenu(self.ui.filtersMenu)
 
+    def ui_buildSceneFilterField(self):
+        '''
+        Add the type-to-filter field above the Scene List, in place of the header spacer.
+        '''
+        field = QLineEdit(self.ui.centralwidget)
+        field.setObjectName('sceneFilterField')
+        field.setPlaceholderText('Filter scenes...')
+        field.setToolTip('Narrow the Scene List by name. Letters may be skipped, e.g. "sh10lgt".')
+        field.setMinimumSize(QSize(0, 20))
+        field.setMaximumSize(QSize(16777215, 20))
+
+        spacer = self.ui.gridLayout.itemAtPosition(0, 1)
+        if spacer is not None:
+            self.ui.gridLayout.removeItem(spacer)
+        self.ui.gridLayout.addWidget(field, 0, 1, 1, 1)
+        self.ui.sceneFilterField = field
+
+    def ui_buildSceneColumns(self):
+        '''
+        Add the Size, Modified, Source, Project and Load Time columns to the Scene List.
+        Sorting is done by the Project Manager itself (see scenes_sort), not by the tree.
+        '''
+        tree = self.ui.sceneTree
+        tree.setColumnCount(7)
+        tree.headerItem().setText(SCENECOL_SIZE, 'Size')
+        tree.headerItem().setText(SCENECOL_MODIFIED, 'Modified')
+        tree.headerItem().setText(SCENECOL_SOURCE, 'Source')
+        tree.headerItem().setText(SCENECOL_PROJECT, 'Project')
+        tree.headerItem().setText(SCENECOL_LOADTIME, 'Load Time')
+        tree.headerItem().setToolTip(SCENECOL_LOADTIME, 'Median time taken to open, import or reference the file')
+        tree.setColumnWidth(SCENECOL_SIZE, 80)
+        tree.setColumnWidth(SCENECOL_MODIFIED, 120)
+        tree.setColumnWidth(SCENECOL_SOURCE, 70)
+        tree.setColumnWidth(SCENECOL_PROJECT, 120)
+        tree.setColumnWidth(SCENECOL_LOADTIME, 80)
+        tree.setSortingEnabled(False)
+        tree.header().setClickable(True)
+        tree.header().setSortIndicatorShown(True)
+        tree.header().setSortIndicator(*self.sceneSort)
+
+    def ui_buildOptionsRow(self):
+        '''
+        Move 'Show Paths' into a row of view option checkboxes, and add the other options to it.
+        '''
+        self.ui.gridLayout.removeWidget(self.ui.togglePathsCheckBox)
+        self.ui.optionsLayout = QHBoxLayout()
+        self.ui.optionsLayout.setSpacing(10)
+        self.ui.optionsLayout.addWidget(self.ui.togglePathsCheckBox)
+        self.ui.gridLayout.addLayout(self.ui.optionsLayout, 0, 0, 1, 1)
+
+        self.ui.collapseSequencesCheckBox = self.ui_addOptionCheckBox(
+            'collapseSequences', 'Collapse Sequences',
+            'Show numbered image files (name.####.ext) as one row per sequence')
+        self.ui.groupVersionsCheckBox = self.ui_addOptionCheckBox(
+            'groupVersions', 'Latest Versions Only',
+            'Show only the latest version of each scene; expand a scene to see older versions')
+        self.ui.changesOnlyCheckBox = self.ui_addOptionCheckBox(
+            'changesOnly', 'Changes Only',
+            'Show only files added, modified or deleted since you last viewed the project')
+        self.ui.projectCatalogCheckBox = self.ui_addOptionCheckBox(
+            'projectCatalog', 'Group Projects',
+            'Group the Project List by parent folder (e.g. show or client)')
+        self.ui.prewarmScenesCheckBox = self.ui_addOptionCheckBox(
+            'prewarmScenes', 'Prewarm Scenes',
+            'Read a selected or hovered scene and the files it references ahead of time, so opening it is faster')
+        self.ui.localCacheCheckBox = self.ui_addOptionCheckBox(
+            'localCache', 'Local Ref Cache',
+            'Copy files imported as references to a local folder, and reference the local copy while it is up to date.\n'
+            'Scenes saved with such references point to this machine\'s cache folder.')
+        self.ui.sharedIndexCheckBox = self.ui_addOptionCheckBox(
+            'sharedIndex', 'Shared Index',
+            'Keep a listing of each project in a %s file in its root folder, shared with other workstations,\n'
+            'so only folders that changed since are scanned again' % projectmanager_index.INDEX_NAME)
+        self.ui.indexDaemonCheckBox = self.ui_addOptionCheckBox(
+            'indexDaemon', 'Index Daemon',
+            'Ask the local index daemon for project listings, so several Modo instances share one scan.\n'
+            'Start it with: python projectmanager_daemon.py. Projects are scanned here when it is not running.')
+        self.ui.sceneFoldersOnlyCheckBox = self.ui_addOptionCheckBox(
+            'sceneFoldersOnly', 'Scene Folders Only',
+            'Only list the folders the project associates with scenes (e.g. Scenes), skipping renders and other folders.\n'
+            'Projects without scene folders are listed in full.')
+        self.ui.thumbnailGridCheckBox = self.ui_addOptionCheckBox(
+            'thumbnailGrid', 'Thumbnails',
+            'Show the Scene List as a grid of thumbnails: the previews saved in scenes and presets, and images.\n'
+            'Thumbnails are read in the background and kept downscaled in %s' % projectmanager_thumbs.THUMBS_PATH)
+        self.ui.stallDetectorCheckBox = self.ui_addOptionCheckBox(
+            'stallDetector', 'Stall Detector',
+            'Watch for moments the Modo interface freezes while this panel runs Python code, and log how long\n'
+            'they lasted and the Python stack to %s' % projectmanager_stalls.STALLS_PATH)
+
+    def ui_buildStallCounter(self):
+        '''
+        Add the count of UI stalls to the options row, shown while the stall detector runs.
+        '''
+        label = QLabel(self.ui.centralwidget)
+        label.setObjectName('stallCounter')
+        label.setMinimumSize(QSize(0, 20))
+        label.setMaximumSize(QSize(16777215, 20))
+        label.setVisible(False)
+        self.ui.optionsLayout.addWidget(label)
+        self.ui.stallCounter = label
+
+    def ui_buildSceneGrid(self):
+        '''
+        Add the thumbnail grid next to the Scene List; only one of them is shown at a time.
+        The grid follows the Scene List's order, filtering and selection.
+        '''
+        grid = QListWidget(self.ui.projectsSplitter)
+        grid.setObjectName('sceneGrid')
+        grid.setViewMode(QListView.IconMode)
+        grid.setResizeMode(QListView.Adjust)
+        grid.setMovement(QListView.Static)
+        grid.setUniformItemSizes(True)
+        grid.setIconSize(QSize(projectmanager_thumbs.THUMBS_SIZE, projectmanager_thumbs.THUMBS_SIZE))
+        grid.setGridSize(QSize(GRID_CELLWIDTH, GRID_CELLHEIGHT))
+        grid.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        grid.setContextMenuPolicy(Qt.CustomContextMenu)
+        grid.setFocusPolicy(Qt.NoFocus)
+        self.ui.projectsSplitter.insertWidget(self.ui.projectsSplitter.indexOf(self.ui.sceneTree) + 1, grid)
+        self.ui.sceneGrid = grid
+
+        # cells show a placeholder until their thumbnail is decoded
+        placeholder = QPixmap(projectmanager_thumbs.THUMBS_SIZE, projectmanager_thumbs.THUMBS_SIZE)
+        placeholder.fill(QColor('#3a3a3a'))
+        self.gridPlaceholder = QIcon(placeholder)
+
+    def ui_addOptionCheckBox(self, option, label, tooltip):
+        '''
+        Add a checkbox for a view option to the options row.
+        Arg 1: the option key <string>
+        Arg 2: the checkbox label <string>
+        Arg 3: the tooltip <string>
+        '''
+        checkBox = QCheckBox(self.ui.centralwidget)
+        checkBox.setObjectName(option + 'CheckBox')
+        checkBox.setText(label)
+        checkBox.setToolTip(tooltip)
+        checkBox.setMinimumSize(QSize(0, 20))
+        checkBox.setMaximumSize(QSize(16777215, 20))
+        checkBox.setChecked(self.options.get(option, False))
+        self.ui.optionsLayout.addWidget(checkBox)
+        self.optionCheckBoxes[option] = checkBox
+        return checkBox
+
+    def ui_toggleCollapseSequences(self):
+        '''
+        Switch between one row per frame and one row per image sequence.
+        '''
+        self.options_set('collapseSequences', self.ui.collapseSequencesCheckBox.isChecked())
+        self.scenes_getAll()
+
+    def ui_toggleGroupVersions(self):
+        '''
+        Switch between listing every scene version and only the latest of each.
+        '''
+        self.options_set('groupVersions', self.ui.groupVersionsCheckBox.isChecked())
+        self.scenes_getAll()
+
+    def ui_buildProjectFindField(self):
+        '''
+        Add a type-ahead field above the Project List.
+        '''
+        container = QWidget()
+        layout = QVBoxLayout(container)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(3)
+
+        field = QLineEdit(container)
+        field.setObjectName('projectFindField')
+        field.setPlaceholderText('Find project...')
+        field.setToolTip('Find projects by the start of their name, any word in it, or their path')
+        field.setMinimumSize(QSize(0, 20))
+        field.setMaximumSize(QSize(16777215, 20))
+        layout.addWidget(field)
+        layout.addWidget(self.ui.projectTree)
+
+        self.ui.projectsSplitter.insertWidget(0, container)
+        self.ui.projectFindField = field
+
+    def ui_toggleProjectCatalog(self):
+        '''
+        Switch the Project List between a flat list and projects grouped by folder.
+        '''
+        self.options_set('projectCatalog', self.ui.projectCatalogCheckBox.isChecked())
+        self.projects_getExisting()
+
+    def ui_setCatalogLevel(self, level):
+        '''
+        Group the project catalog by a folder 'level' steps above each project.
+        Arg 1: 1 for the parent folder, 2 for the grandparent, and so on <int>
+        '''
+        self.options_set('catalogLevel', level)
+        self.projects_getExisting()
+
+    def ui_togglePrewarmScenes(self):
+        '''
+        Enable or disable reading scenes ahead of time.
+        '''
+        self.options_set('prewarmScenes', self.ui.prewarmScenesCheckBox.isChecked())
+        if not self.ui.prewarmScenesCheckBox.isChecked():
+            self.prewarm_cancel()
+        else:
+            self.prewarm_queue()
+
+    def ui_setPrewarmBudget(self, budgetMB):
+        '''
+        Set how much of a scene and its references is read ahead.
+        Arg 1: the budget in megabytes <int>
+        '''
+        self.options_set('prewarmBudgetMB', budgetMB)
+        if self.prewarmer is not None:
+            self.prewarmer.maxBytes = budgetMB * 1024 * 1024
+
+    def ui_setHeavySceneThreshold(self, seconds):
+        '''
+        Set the median load time above which scenes are flagged as heavy.
+        Arg 1: the threshold in seconds <int>
+        '''
+        self.options_set('heavySceneSecs', seconds)
+        self.ui.sceneTree.setUpdatesEnabled(False)
+        for item in self.sceneItems:
+            self.loadtimes_show(item, self.scenes_getItemPath(item))
+        self.ui.sceneTree.setUpdatesEnabled(True)
+
+    def ui_toggleLocalCache(self):
+        '''
+        Enable or disable the local cache for referenced files, and its Source column.
+        '''
+        enabled = self.ui.localCacheCheckBox.isChecked()
+        self.options_set('localCache', enabled)
+        self.ui.sceneTree.setColumnHidden(SCENECOL_SOURCE, not enabled)
+        self.scenes_getAll()
+
+    def ui_setLocalCacheFolder(self):
+        '''
+        Choose the local folder copies are kept in.
+        '''
+        path = QFileDialog.getExistingDirectory(self, 'Select a local cache folder...',
+                                                self.options.get('localCachePath'))
+        if path:
+            self.options_set('localCachePath', path)
+            self.localCache = None
+            self.scenes_getAll()
+
+    def ui_setLocalCacheQuota(self, quotaGB):
+        '''
+        Set how much disk space local copies may use.
+        Arg 1: the quota in gigabytes <int>
+        '''
+        self.options_set('localCacheQuotaGB', quotaGB)
+        self.localcache_get().evict()
+
+    def ui_clearLocalCache(self):
+        '''
+        Delete every local copy.
+        '''
+        self.localcache_get().clear()
+        lx.out('PROJECT MANAGER: Local cache cleared: %s' % self.localCache.path)
+        self.scenes_getAll()
+
+    def ui_toggleSharedIndex(self):
+        '''
+        Enable or disable scanning projects through their shared index file.
+        '''
+        self.options_set('sharedIndex', self.ui.sharedIndexCheckBox.isChecked())
+        self.options_applyScanner()
+
+    def ui_toggleIndexDaemon(self):
+        '''
+        Enable or disable asking the local index daemon for project listings.
+        '''
+        self.options_set('indexDaemon', self.ui.indexDaemonCheckBox.isChecked())
+        self.options_applyScanner()
+        if self.ui.indexDaemonCheckBox.isChecked():
+            if projectmanager_daemon.daemon_request(['ping']) is None:
+                lx.out('PROJECT MANAGER: The index daemon is not running (%s); scanning in Modo instead.'
+                       % projectmanager_daemon.DAEMON_SOCKET)
+
+    def ui_toggleSceneFoldersOnly(self):
+        '''
+        Switch between listing only the scene folders of a project and listing all of it.
+        '''
+        self.options_set('sceneFoldersOnly', self.ui.sceneFoldersOnlyCheckBox.isChecked())
+        self.scenes_getAll()
+
+    def ui_toggleThumbnailGrid(self):
+        '''
+        Switch between the Scene List and the thumbnail grid.
+        '''
+        self.options_set('thumbnailGrid', self.ui.thumbnailGridCheckBox.isChecked())
+        self.ui_showSceneGrid(self.ui.thumbnailGridCheckBox.isChecked())
+
+    def ui_showSceneGrid(self, state):
+        '''
+        Show the thumbnail grid in place of the Scene List, or the other way round.
+        Arg 1: True to show the grid <bool>
+        '''
+        self.ui.sceneGrid.setVisible(state)
+        self.ui.sceneTree.setVisible(not state)
+        if state:
+            self.grid_rebuild()
+        else:
+            self.grid_clear()
+
+    def ui_toggleStallDetector(self):
+        '''
+        Start or stop watching for UI stalls.
+        '''
+        self.options_set('stallDetector', self.ui.stallDetectorCheckBox.isChecked())
+        self.stalls_enable(self.ui.stallDetectorCheckBox.isChecked())
+
+    def ui_toggleChangesOnly(self):
+        '''
+        Switch between the full Scene List and the files changed since the last visit.
+        '''
+        self.options_set('changesOnly', self.ui.changesOnlyCheckBox.isChecked())
+        self.scenes_getAll()
+
+    def ui_formatSize(self, size):
+        '''
+        Return a file size as a short human-readable string.
+        Arg 1: the size in bytes <int>
+        '''
+        for unit in ('B', 'KB', 'MB', 'GB'):
+            if size < 1024 or unit == 'GB':
+                break
+            size /= 1024.0
+        if unit == 'B':
+            return '%d B' % size
+        return '%.1f %s' % (size, unit)
+
     def ui_closeFileTypeFilterMenu(self):
         '''
         Close the file type filter menu, save out the checked items, and refresh the scene list
         '''
-        # serialize and store the checked items for later use
+        # store the checked items for later use, and for the other panels
         selectedTypes = [action.text() for action in self.ui.filtersMenu.actions() if action.isChecked()]
-        pickle.dump(selectedTypes, open(FILTERSPATH, 'w'))
+        try:
+            self.service.setFilters(selectedTypes)
+        except (IOError, OSError):
+            lx.out('PROJECT MANAGER: Unable to save filters.')
 
         # refresh the scenes list
         self.scenes_getAll()
@@ -152,23 +1023,7 @@ class ProjectManager(QMainWindow):
         '''
         Return compatible scene filetypes as a dictionary.
         '''
-        fileTypeLookup = {
-            'Modo (*.lxo)': '.lxo',
-            'Preset (*.lxl)': '.lxl',
-            'Lightwave (*.lwo)': '.lwo',
-            'Wavefront (*.obj)': '.obj',
-            'Alembic (*.abc)':'.abc',
-            'Filmbox (*.fbx)': '.fbx',
-            'Collada (*.dae)': '.dae',
-            'Rhino (*.3dm)': '.3dm',
-            'Autodesk DXF (.*dxf)': '.dxf',
-            'Adobe Illustrator (*.eps, *.ai)': '.eps|.ai',
-            'Stereolithography (*.stl)': '.stl',
-            'Videoscape (*.geo)': '.geo',
-            'Solidworks (*.sldprt, *.sldasm)': '.sldprt|.sldasm',
-            'Protein DB (*.pdb)': '.pdb'
-            }
-        return fileTypeLookup
+        return dict(FILETYPES)
 
     def ui_togglePaths(self):
         '''
@@ -179,6 +1034,7 @@ class ProjectManager(QMainWindow):
         self.ui.projectTree.setColumnWidth(0, 150)
         self.ui.sceneTree.setColumnHidden(1, not state)
         self.ui.sceneTree.setColumnWidth(0, 200)
+        self.scenes_fillPaths()
 
     def dialog_info(self, title, message):
         '''
@@ -284,59 +1140,472 @@ class ProjectManager(QMainWindow):
 
     def write_projectListFile(self, projectPath):
         '''
-        Open the Project List File and append the specified path.
+        Append the specified path to the Project List File, unless it is already listed.
+        Every panel's project list is refreshed.
         Arg 1: the project path <string>.
         '''
-        # read the lines
-        with open(PROJECTLISTFILE, 'r') as f:
-            lines = [line.strip() for line in f if line.strip()]
-            f.close()
+        try:
+            self.service.addProject(projectPath)
+        except (IOError, OSError):
+            lx.out('PROJECT MANAGER: Unable to update the project list.')
+
+    def options_set(self, option, value):
+        '''
+        Change a view option and save the options; other panels follow the change.
+        Arg 1: the option key <string>
+        Arg 2: the new value
+        '''
+        self.options[option] = value
+        try:
+            self.service.setOption(option, value)
+        except (IOError, OSError):
+            lx.out('PROJECT MANAGER: Unable to save view options.')
+
+    def options_applyScanner(self):
+        '''
+        Route project scans through the index daemon and/or the shared index,
+        or walk projects directly.
+        '''
+        projectmanager_scan.SCANNER = read_scanner(self.options)
+
+    def usage_record(self, projDir):
+        '''
+        Count a project as opened and save the counts.
+        Arg 1: the project path <string>
+        '''
+        try:
+            self.service.recordUsage(projDir)
+        except (IOError, OSError):
+            lx.out('PROJECT MANAGER: Unable to save project usage.')
+
+    def service_changed(self, topic, value):
+        '''
+        Follow a change to the shared state, made by this panel or another one.
+        Arg 1: 'projects', 'filters', 'options' or 'health' <string>
+        Arg 2: the new value, depending on the topic
+        '''
+        if topic == 'projects':
+            self.projects_getExisting()
+
+        # option checkboxes run their usual toggle, which finds the option already set
+        elif topic == 'options':
+            option, value = value
+            self.options = self.service.options()
+            checkBox = self.optionCheckBoxes.get(option)
+            if checkBox is not None and checkBox.isChecked() != bool(value):
+                checkBox.setChecked(bool(value))
+
+        elif topic == 'filters':
+            actions = self.ui.filtersMenu.actions()
+            if [a.text() for a in actions if a.isChecked()] != value:
+                for action in actions:
+                    action.setChecked(action.text() in value)
+                self.scenes_getAll()
+
+        elif topic == 'health':
+            self.projectHealth.update(value)
+            for projDir, reachable in value.items():
+                self.projects_showHealth(projDir, reachable)
+
+    def prefetch_restartTimer(self):
+        '''
+        (Re)start the idle timer which triggers prefetching.
+        '''
+        self.prefetchTimer.start()
+
+    def prefetch_idle(self):
+        '''
+        Queue the projects most likely to be opened next for background scanning.
+        Candidates come from recent-use counts and the rows around the selection.
+        '''
+        if QApplication.mouseButtons() != Qt.NoButton:
+            self.prefetchTimer.start()
+            return
+
+        current = self.projects_getSelectedPath()
+        neighbors = []
+        if current:
+            tree = self.ui.projectTree
+            selected = tree.selectedItems()[0]
+            parent = selected.parent() or tree.invisibleRootItem()
+            row = parent.indexOfChild(selected)
+            for offset in range(1, PREFETCH_NEIGHBORS + 1):
+                for idx in (row + offset, row - offset):
+                    item = parent.child(idx) if 0 <= idx < parent.childCount() else None
+                    if item is not None and item.text(1):
+                        neighbors.append(item.text(1).strip())
+            neighbors.insert(0, current)
+
+        known = set(self.projects_getAllPaths())
+        usage = dict((p, n) for p, n in self.service.usage().items() if p in known)
+        candidates = projectmanager_scan.prefetch_rankCandidates(usage, neighbors)
+        self.prefetcher.enqueue(candidates)
+
+    def prewarm_queue(self, item=None, column=None):
+        '''
+        (Re)start the prewarm timer for the hovered item, or the selection.
+        Arg 1: optional hovered item <QTreeWidgetItem>
+        '''
+        if self.ui.prewarmScenesCheckBox.isChecked():
+            self.prewarmItem = item
+            self.prewarmTimer.start()
+
+    def prewarm_start(self):
+        '''
+        Read the hovered or selected scene ahead of time, cancelling any other prewarm.
+        '''
+        item = self.prewarmItem
+        if item is None and self.ui.sceneTree.selectedItems():
+            item = self.ui.sceneTree.selectedItems()[0]
+        scenePath = self.scenes_getItemPath(item)
+        if scenePath is None:
+            return
+        if self.prewarmer is None:
+            self.prewarmer = projectmanager_prewarm.prewarm_getShared()
+        self.prewarmer.maxBytes = self.options.get('prewarmBudgetMB', 2048) * 1024 * 1024
+        self.prewarmer.request(scenePath)
+
+    def prewarm_cancel(self):
+        '''
+        Stop any prewarm in progress.
+        '''
+        self.prewarmTimer.stop()
+        self.prewarmItem = None
+        if self.prewarmer is not None:
+            self.prewarmer.cancel()
+
+    def localcache_get(self):
+        '''
+        Return the shared local cache, set up with the current folder and quota.
+        '''
+        if self.localCache is None or self.localCache is not projectmanager_localcache.LOCALCACHE:
+            path = self.options.get('localCachePath')
+            # the shared temp folder of earlier versions moves to the private default
+            if path == projectmanager_localcache.LOCALCACHE_TEMPPATH:
+                path = projectmanager_localcache.LOCALCACHE_PATH
+                self.options_set('localCachePath', path)
+            self.localCache = projectmanager_localcache.localcache_getShared(path)
+            try:
+                projectmanager_localcache.localcache_privateFolder(path)
+            except OSError as error:
+                lx.out('PROJECT MANAGER: Local cache not used, its folder is not private (%s)' % error)
+        self.localCache.quota = self.options.get('localCacheQuotaGB', 20) * 1024 * 1024 * 1024
+        return self.localCache
+
+    def localcache_resolve(self, scenePath):
+        '''
+        Return the local copy of a file if it is up to date, otherwise the file itself,
+        queueing a fresh copy for next time.
+        Arg 1: the path on the share <string>
+        '''
+        cache = self.localcache_get()
+        try:
+            st = os.stat(scenePath)
+        except OSError:
+            return scenePath
+        localPath = cache.localPath(scenePath, st.st_size, st.st_mtime)
+        if localPath is not None:
+            lx.out('PROJECT MANAGER: Using local copy of %s: %s' % (scenePath, localPath))
+            return localPath
+        cache.enqueue(scenePath)
+        if self.ui.sceneTree.selectedItems():
+            self.localCacheItems[scenePath] = (self.ui.sceneTree.selectedItems()[0], st.st_size, st.st_mtime)
+            self.localCacheTimer.start()
+        return scenePath
+
+    def localcache_showSource(self, item, status):
+        '''
+        Display whether a scene item is read from its local copy or from the share.
+        Arg 1: the scene item <QTreeWidgetItem>
+        Arg 2: the LocalCache status <string>
+        '''
+        label, color = LOCALCACHE_LABELS[status]
+        item.setText(SCENECOL_SOURCE, label)
+        item.setForeground(SCENECOL_SOURCE, QBrush(QColor(color)))
+        if status == 'stale':
+            item.setToolTip(SCENECOL_SOURCE, 'Changed on the share since it was copied; it will be copied again when next referenced')
+
+    def localcache_refresh(self):
+        '''
+        Update the Source column of files being copied, until all copies are done.
+        '''
+        cache = self.localcache_get()
+        for remotePath, (item, size, mtime) in list(self.localCacheItems.items()):
+            status = cache.status(remotePath, size, mtime)
+            self.localcache_showSource(item, status)
+            if status != 'copying':
+                del self.localCacheItems[remotePath]
+        if not self.localCacheItems:
+            self.localCacheTimer.stop()
+
+    def filter_index(self, items):
+        '''
+        Index the scene list items for filtering and apply the current filter text.
+        Arg 1: the scene items, in insertion order <list>
+        '''
+        self.sceneItems = items
+        self.sceneVisible = None
+        self.sceneFilter = projectmanager_match.IncrementalFilter([item.text(0).lower() for item in items])
+        self.filter_apply()
+
+    def filter_queue(self):
+        '''
+        React to a keystroke in the filter field.
+        Small lists are filtered at once; large ones after a short debounce.
+        '''
+        if len(self.sceneItems) >= FILTER_THREADROWS:
+            self.filterTimer.start()
+        else:
+            self.filter_apply()
 
-        # if the path isn't already in the list, add it
-        if not projectPath in lines:
-            with open(PROJECTLISTFILE, 'w') as f:
-                for line in lines:
-                    f.write(line + '\n')
-                f.write(projectPath + '\n')
-                f.close()
+    def filter_isStale(self, generation):
+        '''
+        Return True if a newer filter request has superseded the given one.
+        Arg 1: the filter request number <int>
+        '''
+        return generation != self.filterGeneration
+
+    def filter_apply(self):
+        '''
+        Match the filter text against the scene list, off the UI thread for large lists.
+        '''
+        query = self.ui.sceneFilterField.text().strip()
+        self.filterGeneration += 1
+        generation = self.filterGeneration
+
+        if not query or len(self.sceneItems) < FILTER_THREADROWS:
+            self.filter_show(generation, query, self.sceneFilter.run(query))
+            return
+
+        self.filterWorkers = [w for w in self.filterWorkers if not w.isFinished()]
+        worker = SceneFilterWorker(self.sceneFilter.keys, self.sceneFilter.candidates(query),
+                                   query, generation, self.filter_isStale, self)
+        worker.matched.connect(self.filter_show)
+        self.filterWorkers.append(worker)
+        worker.start()
+
+    def filter_show(self, generation, query, matches):
+        '''
+        Hide the scene items which no longer match, and show those which now do.
+        Only items whose visibility changes are touched.
+        Arg 1: the filter request number <int>
+        Arg 2: the filter text <string>
+        Arg 3: the matching indices, or None to show everything <list>
+        '''
+        if self.filter_isStale(generation):
+            return
+        self.sceneFilter.commit(query, matches)
+
+        allRows = range(len(self.sceneItems))
+        previous = self.sceneVisible if self.sceneVisible is not None else set(allRows)
+        current = set(matches) if matches is not None else set(allRows)
+
+        self.ui.sceneTree.setUpdatesEnabled(False)
+        for idx in previous - current:
+            self.sceneItems[idx].setHidden(True)
+        for idx in current - previous:
+            self.sceneItems[idx].setHidden(False)
+        self.ui.sceneTree.setUpdatesEnabled(True)
+
+        self.sceneVisible = current if matches is not None else None
+        self.grid_queueRebuild()
+
+    def changes_apply(self, result, changes):
+        '''
+        Show the changes a background scan found since the previous visit. The
+        snapshot of the previous visit is kept for the rest of the visit, so
+        refreshing the list doesn't clear the changes.
+        Arg 1: the scan result <ScanResult>
+        Arg 2: the changes found by snapshot_visit <SnapshotChanges>
+        '''
+        if changes.error is not None:
+            lx.out('PROJECT MANAGER: Unable to save the project snapshot (%s).' % changes.error)
+        if result.projDir != self.visitProject:
+            self.visitProject = result.projDir
+            self.visitBaseline = changes.baseline
+        self.visitChanges = (result, changes)
+        self.changes_restore(result)
+
+    def changes_restore(self, result):
+        '''
+        Show the changes already found for a scan result; returns False if there are none yet.
+        Arg 1: the scan result <ScanResult>
+        '''
+        self.sceneChanges = {}
+        self.sceneRemoved = []
+        if self.visitChanges is None or self.visitChanges[0] is not result:
+            return False
+        changes = self.visitChanges[1]
+        self.sceneChanges.update((row, 'added') for row in changes.added)
+        self.sceneChanges.update((row, 'modified') for row in changes.modified)
+        self.sceneRemoved = [projectmanager_scan.RemovedFile(*r) for r in changes.removed]
+
+        # summarize the changes on the checkbox
+        tooltip = 'Show only files added, modified or deleted since you last viewed the project'
+        if self.visitBaseline is not None:
+            tooltip += '\n%d new, %d modified, %d deleted since %s' % (
+                len(changes.added), len(changes.modified), len(changes.removed),
+                time.strftime('%Y-%m-%d %H:%M', time.localtime(self.visitBaseline.stamp)))
+        self.ui.changesOnlyCheckBox.setToolTip(tooltip)
+        return True
+
+    def changes_statusOf(self, entry):
+        '''
+        Return 'added', 'modified', 'removed' or None for a Scene List entry.
+        Sequences and version groups count as changed if any of their files did.
+        Arg 1: a row, Sequence, VersionGroup or RemovedFile <object>
+        '''
+        if isinstance(entry, projectmanager_scan.RemovedFile):
+            return 'removed'
+        if isinstance(entry, (projectmanager_scan.Sequence, projectmanager_scan.VersionGroup)):
+            statuses = set(self.sceneChanges.get(row) for row in entry.rows)
+            for status in ('added', 'modified'):
+                if status in statuses:
+                    return status
+            return None
+        return self.sceneChanges.get(entry)
+
+    def projects_getAllPaths(self):
+        '''
+        Return the paths of every project in the project list.
+        '''
+        return list(self.projectPaths)
 
     def projects_getExisting(self):
         '''
         Populate the Existing Projects list, via the projects.projlist file.
+        In catalog mode only the groups are created; their projects are added when
+        a group is expanded. Project health is checked in the background, unless
+        it was checked recently by any panel.
         '''
         # clear the list
         self.ui_clearTreeWidget(self.ui.projectTree)
+        self.projectItems = {}
+        self.projectHealth = self.service.health()
+        self.projectIndex = None
 
-        # ensure the project list file exists:
-        if not os.path.exists(PROJECTLISTFILE):
-            open(PROJECTLISTFILE, 'w').close
+        # the projects.projlist contents, read once for every panel
+        self.projectPaths = self.service.projects()
 
-        # read the contents of the projects.projlist file and add them to the list
-        else:
-            with open(PROJECTLISTFILE) as fileList:
+        catalog = self.ui.projectCatalogCheckBox.isChecked()
+        self.ui.projectTree.setItemsExpandable(catalog)
+        self.ui.projectTree.setRootIsDecorated(catalog)
+        self.projectCatalog = None
 
-                lines = [line.strip() for line in fileList if line.strip()]
+        # a type-ahead search in progress shows its results instead
+        if self.ui.projectFindField.text().strip():
+            self.projects_find()
 
-                for line in lines:
-                    projectTitle = os.path.split(line)[1]
+        # group the projects, leaving their items until a group is opened
+        elif catalog:
+            self.projectCatalog = projectmanager_catalog.Catalog(self.projectPaths, self.options.get('catalogLevel', 1))
+            groups = [self.projects_createGroupItem(group) for group in self.projectCatalog.groups()]
+            self.ui.projectTree.addTopLevelItems(groups)
 
-                    # create the projectItem
-                    projectItem = QTreeWidgetItem()
-                    projectItem.setSizeHint(0, QSize(200, 25))
-                    projectItem.setText(0, projectTitle)
-                    projectItem.setText(1, line)
-                    projectItem.setForeground(1 , QBrush(QColor('#575757')))
+        # or list every project, sorted once
+        else:
+            paths = sorted(self.projectPaths, key=lambda p: projectmanager_scan.scan_naturalKey(os.path.basename(p)))
+            self.ui.projectTree.addTopLevelItems([self.projects_createItem(p) for p in paths])
+            self.projects_checkHealth(paths)
+
+    def projects_createItem(self, projDir):
+        '''
+        Create a Project List item.
+        Arg 1: the project path <string>
+        '''
+        projectItem = QTreeWidgetItem()
+        projectItem.setSizeHint(0, QSize(200, 25))
+        projectItem.setText(0, os.path.split(projDir)[1])
+        projectItem.setText(1, projDir)
+        projectItem.setForeground(1 , QBrush(QColor('#575757')))
+        self.projectItems[projDir] = projectItem
+        if projDir in self.projectHealth:
+            self.projects_showHealth(projDir, self.projectHealth[projDir])
+        return projectItem
+
+    def projects_createGroupItem(self, group):
+        '''
+        Create a Project List group item, which lists its projects when expanded.
+        Arg 1: the group folder <string>
+        '''
+        groupItem = QTreeWidgetItem()
+        groupItem.setSizeHint(0, QSize(200, 25))
+        groupItem.setText(0, '%s  (%d)' % (os.path.basename(group) or group, self.projectCatalog.count(group)))
+        groupItem.setToolTip(0, group)
+        groupItem.setData(0, Qt.UserRole, group)
+        groupItem.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+        font = groupItem.font(0)
+        font.setBold(True)
+        groupItem.setFont(0, font)
+        return groupItem
+
+    def projects_expandGroup(self, groupItem):
+        '''
+        Add a catalog group's projects the first time it is expanded.
+        Arg 1: the group item <QTreeWidgetItem>
+        '''
+        group = groupItem.data(0, Qt.UserRole)
+        if group is None or groupItem.childCount() or self.projectCatalog is None:
+            return
+        projects = self.projectCatalog.projects(group)
+        groupItem.addChildren([self.projects_createItem(p) for p in projects])
+        self.projects_checkHealth(projects)
+
+    def projects_find(self):
+        '''
+        Show the projects matching the type-ahead text, looked up in a prefix index.
+        Clearing the text restores the full list or catalog.
+        '''
+        query = self.ui.projectFindField.text().strip()
+        if not query:
+            self.projects_getExisting()
+            return
 
-                    # display bad project paths in red
-                    if not os.path.exists(line):
-                        projectItem.setForeground(0, QBrush(QColor('#8C2727')))
-                        projectItem.setForeground(1, QBrush(QColor('#8C2727')))
+        if self.projectIndex is None:
+            self.projectIndex = projectmanager_catalog.PrefixIndex(self.projectPaths)
+        found = self.projectIndex.lookup(query)
 
-                    # add the item to the tree
-                    self.ui.projectTree.addTopLevelItem(projectItem)
+        self.ui_clearTreeWidget(self.ui.projectTree)
+        self.projectItems = {}
+        self.projectCatalog = None
+        self.ui.projectTree.setRootIsDecorated(False)
+        self.ui.projectTree.addTopLevelItems([self.projects_createItem(p) for p in found])
+        if found:
+            self.ui.projectTree.topLevelItem(0).setSelected(True)
+        self.projects_checkHealth(found)
+
+    def projects_checkHealth(self, paths):
+        '''
+        Check in the background whether projects can be reached, skipping known ones.
+        Arg 1: the project paths <list>
+        '''
+        paths = [p for p in paths if p not in self.projectHealth]
+        if not paths:
+            return
+        self.healthWorkers = [w for w in self.healthWorkers if not w.isFinished()]
+        worker = HealthCheckWorker(paths, self)
+        worker.checked.connect(self.projects_applyHealth)
+        self.healthWorkers.append(worker)
+        worker.start()
+
+    def projects_applyHealth(self, health):
+        '''
+        Receive background health check results, and share them with every panel
+        (see service_changed).
+        Arg 1: {path: reachable} <dict>
+        '''
+        self.service.setHealth(health)
 
-                    # sort the tree
-                    self.ui.projectTree.sortItems(0, Qt.AscendingOrder)
+    def projects_showHealth(self, projDir, reachable):
+        '''
+        Display a project in red if its path cannot be found.
+        Arg 1: the project path <string>
+        Arg 2: whether the path exists <bool>
+        '''
+        projectItem = self.projectItems.get(projDir)
+        if projectItem is not None and not reachable:
+            projectItem.setForeground(0, QBrush(QColor('#8C2727')))
+            projectItem.setForeground(1, QBrush(QColor('#8C2727')))
 
     def projects_getSelectedPath(self):
         '''
@@ -348,57 +1617,676 @@ class ProjectManager(QMainWindow):
             return projDir.strip()
         return False
 
+    def projects_getSelectedPaths(self):
+        '''
+        Return the paths of every selected project, skipping catalog groups.
+        '''
+        return [item.text(1).strip() for item in self.ui.projectTree.selectedItems() if item.text(1).strip()]
+
+    def stalls_enable(self, state):
+        '''
+        Start or stop the shared stall detector, and this panel's heartbeat and counter.
+        Arg 1: True to watch for stalls <bool>
+        '''
+        if state:
+            self.stallDetector = projectmanager_stalls.stalls_getShared()
+            self.stallDetector.start()
+            self.stallTimer.start()
+        else:
+            self.stallTimer.stop()
+            if self.stallDetector is not None:
+                self.stallDetector.stop()
+            self.stallCount = None
+        self.ui.stallCounter.setVisible(state)
+        self.ui.stallCounter.setText('Stalls: 0')
+
+    def stalls_beat(self):
+        '''
+        Beat the stall detector's heartbeat while the panel is shown, and bring the
+        counter up to date when stalls were recorded since the last beat.
+        '''
+        detector = self.stallDetector
+        if not self.isVisible() or detector is None:
+            return
+        detector.beat()
+        if detector.count == self.stallCount:
+            return
+        recent = list(detector.recent)
+        if self.stallCount is not None:
+            for stall in recent[-(detector.count - self.stallCount):]:
+                lx.out('PROJECT MANAGER: UI stall of %s' % stall.describe())
+        self.stallCount = detector.count
+        self.ui.stallCounter.setText('Stalls: %d' % detector.count)
+        lines = [stall.describe() for stall in reversed(recent)]
+        lines.append('Worst event loop latency: %d ms' % (detector.worstLatency * 1000))
+        lines.append('Logged to %s' % detector.path)
+        self.ui.stallCounter.setToolTip('\n'.join(lines))
+
+    def grid_queueRebuild(self):
+        '''
+        Rebuild the thumbnail grid once the Scene List settles, if the grid is shown.
+        '''
+        if not self.ui.sceneGrid.isHidden():
+            self.gridRebuildTimer.start()
+
+    def grid_clear(self):
+        '''
+        Empty the thumbnail grid and drop its pending thumbnails.
+        '''
+        self.gridRebuildTimer.stop()
+        self.gridTimer.stop()
+        if self.thumbLoader is not None:
+            self.thumbLoader.cancel()
+        self.ui.sceneGrid.clear()
+        self.gridItems = {}
+        self.gridWaiting = {}
+        self.gridShown = set()
+
+    def grid_rebuild(self):
+        '''
+        Fill the thumbnail grid with the shown top-level items of the Scene List, in its order.
+        The scroll position is kept, as rows stream in while projects are scanned.
+        '''
+        grid = self.ui.sceneGrid
+        tree = self.ui.sceneTree
+        scrolled = grid.verticalScrollBar().value()
+        self.grid_clear()
+        grid.setUpdatesEnabled(False)
+        grid.blockSignals(True)
+        for idx in range(tree.topLevelItemCount()):
+            treeItem = tree.topLevelItem(idx)
+            index = treeItem.data(0, Qt.UserRole + 1)
+            if treeItem.isHidden() or index is None:
+                continue
+            gridItem = QListWidgetItem(self.gridPlaceholder, treeItem.text(0))
+            gridItem.setData(Qt.UserRole, int(index))
+            gridItem.setToolTip(treeItem.text(0))
+            grid.addItem(gridItem)
+            gridItem.setSelected(treeItem.isSelected())
+            self.gridItems[int(index)] = gridItem
+        grid.blockSignals(False)
+        grid.setUpdatesEnabled(True)
+        grid.verticalScrollBar().setValue(scrolled)
+        self.grid_queueVisible()
+
+    def grid_selectScenes(self):
+        '''
+        Select the Scene List items of the selected cells, so scene actions apply to them.
+        '''
+        tree = self.ui.sceneTree
+        tree.clearSelection()
+        for gridItem in self.ui.sceneGrid.selectedItems():
+            self.sceneItems[int(gridItem.data(Qt.UserRole))].setSelected(True)
+
+    def grid_queueVisible(self):
+        '''
+        Request the thumbnails of the cells on screen once scrolling or resizing pauses.
+        '''
+        if not self.ui.sceneGrid.isHidden():
+            self.gridVisibleTimer.start()
+
+    def grid_visibleItems(self):
+        '''
+        Return the grid items on screen. Cells are laid out in order, so the first
+        one on screen is found by bisection rather than by visiting every cell.
+        '''
+        grid = self.ui.sceneGrid
+        viewport = grid.viewport().rect()
+        low, high = 0, grid.count()
+        while low < high:
+            middle = (low + high) // 2
+            if grid.visualItemRect(grid.item(middle)).bottom() < viewport.top():
+                low = middle + 1
+            else:
+                high = middle
+        items = []
+        for idx in range(low, grid.count()):
+            gridItem = grid.item(idx)
+            rect = grid.visualItemRect(gridItem)
+            if rect.top() > viewport.bottom():
+                break
+            if rect.intersects(viewport):
+                items.append(gridItem)
+        return items
+
+    def grid_getExtensions(self):
+        '''
+        Return the extensions thumbnails can be made for: scenes and presets with
+        previews, and every image format Qt reads.
+        '''
+        if self.gridExtensions is None:
+            extensions = set(projectmanager_thumbs.THUMBS_PREVIEWEXTENSIONS)
+            for fmt in QImageReader.supportedImageFormats():
+                extensions.add('.' + str(fmt.data().decode('ascii')).lower())
+            self.gridExtensions = extensions
+        return self.gridExtensions
+
+    def grid_requestVisible(self):
+        '''
+        Show the cached thumbnails of the cells on screen and decode the missing
+        ones in the background. Cells scrolled off screen go back to the
+        placeholder, so only the memory cache holds on to their thumbnails.
+        '''
+        result = self.sceneResult
+        if result is None or self.ui.sceneGrid.isHidden():
+            return
+        extensions = self.grid_getExtensions()
+        visible = set()
+        requests = []
+        for gridItem in self.grid_visibleItems():
+            index = int(gridItem.data(Qt.UserRole))
+            row = self.sceneItems[index].data(0, Qt.UserRole)
+            if row is None:
+                continue
+            path = result.fullPath(int(row))
+            if os.path.splitext(path)[1].lower() not in extensions:
+                continue
+            visible.add(index)
+            if index in self.gridShown:
+                continue
+            key = projectmanager_thumbs.thumbs_key(path, result.mtime(int(row)))
+            pixmap = self.thumbCache.get(key)
+            if pixmap is None:
+                requests.append((key, path, result.mtime(int(row))))
+                self.gridWaiting.setdefault(key, set()).add(index)
+            elif pixmap is not GRID_NOTHUMBNAIL:
+                gridItem.setIcon(QIcon(pixmap))
+                self.gridShown.add(index)
+
+        for index in self.gridShown - visible:
+            gridItem = self.gridItems.get(index)
+            if gridItem is not None:
+                gridItem.setIcon(self.gridPlaceholder)
+        self.gridShown &= visible
+
+        self.grid_getLoader().request(requests)
+        if requests:
+            self.gridTimer.start()
+
+    def grid_getLoader(self):
+        '''
+        Return this panel's thumbnail loader, creating it on first use.
+        '''
+        if self.thumbLoader is None:
+            self.thumbLoader = projectmanager_thumbs.ThumbnailLoader(read_thumbnail, write_thumbnail)
+        return self.thumbLoader
+
+    def grid_receive(self):
+        '''
+        Cache the thumbnails decoded since the last call and show those whose cells are waiting.
+        '''
+        loader = self.grid_getLoader()
+        for key, image in loader.results():
+            if image is None:
+                self.thumbCache.put(key, GRID_NOTHUMBNAIL, 0)
+                self.gridWaiting.pop(key, None)
+                continue
+            pixmap = QPixmap.fromImage(image)
+            self.thumbCache.put(key, pixmap, image.width() * image.height() * 4)
+            for index in self.gridWaiting.pop(key, ()):
+                gridItem = self.gridItems.get(index)
+                if gridItem is not None:
+                    gridItem.setIcon(QIcon(pixmap))
+                    self.gridShown.add(index)
+        if not loader.pending():
+            self.gridTimer.stop()
+
     def scenes_clearList(self):
         '''
         Clear the contents of the Scenes List.
         '''
+        self.prewarm_cancel()
+        self.multiscan_cancel()
+        self.localCacheItems = {}
+        self.localCacheTimer.stop()
         self.ui_clearTreeWidget(self.ui.sceneTree)
+        self.sceneResult = None
+        self.sceneEntries = []
+        self.sceneSortKeys = {}
+        self.filter_index([])
+
+    def scenes_getAllExtensions(self):
+        '''
+        Return every compatible extension, whether checked or not.
+        '''
+        return projectmanager_scan.scan_splitExtensions(self.ui_getFileTypes().values())
+
+    def scenes_getSceneExtensions(self):
+        '''
+        Return every compatible extension except image sequence types.
+        '''
+        return self.scenes_getAllExtensions() - projectmanager_scan.SEQUENCE_EXTENSIONS
+
+    def scenes_getScanExtensions(self):
+        '''
+        Return the extensions a scan should gather: all scene types, plus any checked image types.
+        Image types are left out unless wanted, as render folders can hold millions of frames.
+        '''
+        return self.scenes_getSceneExtensions() | self.scenes_getSelectedExtensions()
+
+    def scenes_getSelectedExtensions(self):
+        '''
+        Return the extensions checked in the filters menu.
+        '''
+        fileTypes = self.ui_getFileTypes()
+        checked = [fileTypes[action.text()] for action in self.ui.filtersMenu.actions() if action.isChecked()]
+        return projectmanager_scan.scan_splitExtensions(checked)
 
     def scenes_getAll(self):
         '''
         Search the selected project for files and display them in the scene list.
         Display only filetypes which are checked in the filters menu.
+        The folders the project associates with scenes are listed first; the rest
+        of the project is then scanned in the background, unless only scene folders
+        are wanted. Several selected projects are listed together (see scenes_getMerged).
         '''
-        if self.ui.projectTree.selectedItems():
+        # several projects
+        projDirs = self.projects_getSelectedPaths()
+        if len(projDirs) > 1:
+            self.scenes_getMerged(projDirs)
+            return
+
+        # get a clean project path (catalog groups have none)
+        projDir = self.projects_getSelectedPath()
+        if projDir:
 
             # change the cursor to indicate activity
             QApplication.setOverrideCursor(Qt.BusyCursor) 
 
-            # start by clearing the scene list
-            self.ui_clearTreeWidget(self.ui.sceneTree)
+            # start by clearing the scene list, and drop background scans of the previous one
+            self.scenes_clearList()
+            self.scanGeneration += 1
+            self.ui.sceneTree.headerItem().setText(0, self.sceneHeader)
+            self.ui.sceneTree.setColumnHidden(SCENECOL_PROJECT, True)
+            if self.ui.localCacheCheckBox.isChecked():
+                self.localcache_get()
+
+            # changes since the last visit need the whole project
+            extensions = self.scenes_getScanExtensions()
+            versionPatterns = read_versionPatterns()
+            folders = []
+            if not self.ui.changesOnlyCheckBox.isChecked():
+                folders = projectmanager_scan.scan_sceneFolders(projDir)
+
+            # scene folders only
+            if folders and self.ui.sceneFoldersOnlyCheckBox.isChecked():
+                self.scenes_display(projectmanager_scan.scan_folders(
+                    projDir, folders, extensions, versionPatterns=versionPatterns), partial=True)
+
+            # scene folders first, unless the whole project is already cached
+            else:
+                result = projectmanager_scan.scan_cached(projDir, extensions, versionPatterns=versionPatterns,
+                                                         cachedOnly=bool(folders))
+                if result is None:
+                    self.scenes_display(projectmanager_scan.scan_folders(
+                        projDir, folders, extensions, versionPatterns=versionPatterns), partial=True)
+                    self.scenes_scanInBackground(projDir, extensions, versionPatterns)
+                else:
+                    self.scenes_display(result)
+                    if self.visitChanges is None or self.visitChanges[0] is not result:
+                        self.scenes_scanInBackground(projDir, extensions, versionPatterns, result)
 
-            # get a clean project path
-            projectItem = self.ui.projectTree.selectedItems()[0]
-            projDir = projectItem.text(1).strip()
+            # remember how often each project gets opened
+            self.usage_record(projDir)
 
-            # get the checked file types from the filter list
-            fileTypes = self.ui_getFileTypes()          
-            selectedTypes = [fileTypes[action.text()] for action in self.ui.filtersMenu.actions() if action.isChecked()]
+            # restore the cursor to its normal state
+            QApplication.restoreOverrideCursor()
 
-            # walk the project and display all files of the checked types
-            for root, dirs, files in os.walk(projDir):
-                for file in files:
-                    filename, ext = os.path.splitext(file)
-                    if ext in selectedTypes:
-                        filePath = os.path.join(root, file)
-                        fileName = os.path.basename(filePath)
-                        relativePath = filePath.replace(projDir, '')
+    def scenes_getMerged(self, projDirs):
+        '''
+        List the files of several projects in one Scene List, tagged with their project.
+        The projects are scanned concurrently, taking turns, and their rows are added
+        as they arrive; the list is sorted once every project is done.
+        Changes since the last visit are only shown for a single project.
+        Arg 1: the project paths <list>
+        '''
+        self.scenes_clearList()
+        self.scanGeneration += 1
+        self.sceneChanges = {}
+        self.sceneRemoved = []
+        self.ui.sceneTree.setRootIsDecorated(self.ui.collapseSequencesCheckBox.isChecked() or
+                                             self.ui.groupVersionsCheckBox.isChecked())
+        self.ui.sceneTree.setColumnHidden(SCENECOL_PROJECT, False)
+        if self.ui.localCacheCheckBox.isChecked():
+            self.localcache_get()
+
+        extensions = self.scenes_getScanExtensions()
+        versionPatterns = read_versionPatterns()
+        self.sceneResult = projectmanager_multiscan.MergedScanResult(projDirs, extensions)
+        self.sceneResult.versionPatterns = versionPatterns
+        self.multiScan = projectmanager_multiscan.MultiScan(projDirs, extensions, versionPatterns)
+        self.multiScan.start()
+        self.multiscan_receive()
+        if self.multiScan is not None:
+            self.multiScanTimer.start()
+
+        for projDir in projDirs:
+            self.usage_record(projDir)
+
+    def multiscan_receive(self):
+        '''
+        Add the rows scanned since the last call to the merged Scene List, and sort
+        the whole list once every project is done.
+        '''
+        scan = self.multiScan
+        result = self.sceneResult
+        if scan is None or not isinstance(result, projectmanager_multiscan.MergedScanResult):
+            return
+        start = len(result)
+        added = scan.drain(result)
+        done = scan.isDone()
+        if added:
+            selectedTypes = self.scenes_getSelectedExtensions()
+            wanted = set(idx for idx, ext in enumerate(result.exts) if ext in selectedTypes)
+            entries = [row for row in range(start, len(result)) if result.extIds[row] in wanted]
+            collapse = self.ui.collapseSequencesCheckBox.isChecked()
+            group = self.ui.groupVersionsCheckBox.isChecked()
+            if collapse or group:
+                entries = result.collapsedRows(entries, collapse, group)
+            self.scenes_appendEntries(entries, sort=done)
+
+        if done:
+            self.multiScanTimer.stop()
+            self.multiScan = None
+            self.ui.sceneTree.headerItem().setText(0, self.sceneHeader)
+            self.scenes_sort()
+            self.filter_index(self.sceneItems)
+        else:
+            self.ui.sceneTree.headerItem().setText(0, '%s  (scanning: %d of %d projects done...)' % (
+                self.sceneHeader, len(scan.finished), len(scan.projDirs)))
 
-                        # create the file item
-                        item = QTreeWidgetItem()
-                        item.setText(0, fileName)
-                        item.setText(1, relativePath)
-                        item.setSizeHint(0, QSize(200, 25))
-                        item.setForeground(1 , QBrush(QColor('#575757')))
+    def multiscan_cancel(self):
+        '''
+        Stop scanning the selected projects.
+        '''
+        self.multiScanTimer.stop()
+        if self.multiScan is not None:
+            self.multiScan.cancel()
+            self.multiScan = None
+            self.ui.sceneTree.headerItem().setText(0, self.sceneHeader)
 
-                        # add the item to the scene tree
-                        self.ui.sceneTree.addTopLevelItem(item)
+    def scenes_appendEntries(self, entries, sort=False):
+        '''
+        Add entries to the end of the Scene List as they are scanned; they are
+        put in order by the next scenes_sort.
+        Arg 1: new rows, Sequences and VersionGroups of sceneResult <list>
+        Arg 2: whether a sort follows, so filtering can wait for it <bool>
+        '''
+        offset = len(self.sceneEntries)
+        items = [self.scenes_createItem(entry, offset + idx) for idx, entry in enumerate(entries)]
+        self.sceneEntries.extend(entries)
+        self.sceneItems.extend(items)
+        self.sceneSortKeys = {}
+        self.ui.sceneTree.addTopLevelItems(items)
+        self.scenes_fillPaths()
+        self.grid_queueRebuild()
+
+        # only a filter in use needs re-indexing while rows stream in
+        if not sort and self.ui.sceneFilterField.text().strip():
+            self.filter_index(self.sceneItems)
+
+    def scenes_display(self, result, partial=False):
+        '''
+        Fill the scene list with the files of a scan result.
+        Arg 1: the scan result <ScanResult>
+        Arg 2: whether the result only covers some folders of the project <bool>
+        '''
+        # get the checked file types from the filter list
+        selectedTypes = self.scenes_getSelectedExtensions()
+        entries = result.rows(selectedTypes)
+
+        # a partial listing says nothing about what was removed
+        if partial:
+            self.sceneChanges = {}
+            self.sceneRemoved = []
+        else:
+            self.changes_restore(result)
 
-                        # sort the scene tree
-                        self.ui.sceneTree.sortItems(0, Qt.AscendingOrder)
+        # either list only what changed since the last visit...
+        if self.ui.changesOnlyCheckBox.isChecked():
+            entries = [row for row in entries if row in self.sceneChanges]
+            entries += [r for r in self.sceneRemoved
+                        if os.path.splitext(r.relativePath)[1].lower() in selectedTypes]
+            self.ui.sceneTree.setRootIsDecorated(False)
 
-            # restore the cursor to its normal state
-            QApplication.restoreOverrideCursor()
+        # ...or optionally show image sequences and scene versions as a single row each
+        else:
+            collapse = self.ui.collapseSequencesCheckBox.isChecked() and bool(result.sequences)
+            group = self.ui.groupVersionsCheckBox.isChecked() and bool(result.versionGroups)
+            if collapse or group:
+                entries = result.collapsedRows(entries, collapse, group)
+            self.ui.sceneTree.setRootIsDecorated(collapse or group)
+
+        self.sceneResult = result
+        items = [self.scenes_createItem(entry, idx) for idx, entry in enumerate(entries)]
+
+        # add the items to the scene tree in one keyed sort
+        self.sceneItems = items
+        self.sceneEntries = entries
+        self.scenes_sort()
+        self.scenes_fillPaths()
+
+        # apply the type-to-filter text to the new list
+        self.filter_index(items)
+
+    def scenes_scanInBackground(self, projDir, extensions, versionPatterns, result=None):
+        '''
+        Scan the whole project at low priority and find what changed since the previous
+        visit, replacing the listing when done.
+        Arg 1: the project path <string>
+        Arg 2: lowercase extensions to scan for <set>
+        Arg 3: version patterns <list>
+        Arg 4: an existing scan of the whole project, which only needs diffing <ScanResult>
+        '''
+        self.scanWorkers = [w for w in self.scanWorkers if not w.isFinished()]
+        load = projDir != self.visitProject
+        worker = ProjectScanWorker(projDir, extensions, versionPatterns, self.scanGeneration,
+                                   self.visitBaseline, load, result, self)
+        worker.scanned.connect(self.scenes_receiveScan)
+        self.scanWorkers.append(worker)
+        worker.start(QThread.LowPriority)
+        if result is None:
+            self.ui.sceneTree.headerItem().setText(0, '%s  (scanning other folders...)' % self.sceneHeader)
+        else:
+            self.ui.sceneTree.headerItem().setText(0, '%s  (finding changes...)' % self.sceneHeader)
+
+    def scenes_receiveScan(self, generation, result, changes):
+        '''
+        Show the whole project once its background scan is done, keeping the selection.
+        Arg 1: the generation the scan was started in <int>
+        Arg 2: the scan result, or None if the scan failed <ScanResult>
+        Arg 3: the changes since the previous visit <SnapshotChanges>
+        '''
+        if generation != self.scanGeneration:
+            return
+        self.ui.sceneTree.headerItem().setText(0, self.sceneHeader)
+        if result is None or self.projects_getSelectedPath() != result.projDir:
+            return
+        self.changes_apply(result, changes)
+
+        selected = self.scenes_getSelectedPath()
+        self.scenes_clearList()
+        self.scenes_display(result)
+        if selected is not None:
+            for item in self.sceneItems:
+                if self.scenes_getItemPath(item) == selected:
+                    self.ui.sceneTree.setCurrentItem(item)
+                    break
+
+    def scenes_getSortKeys(self, column):
+        '''
+        Return the precomputed sort keys of a scene list column, building them on first use.
+        Names and paths sort naturally, so 'shot_9' comes before 'shot_010'.
+        Arg 1: the column index <int>
+        '''
+        keys = self.sceneSortKeys.get(column)
+        if keys is None:
+            naturalKey = projectmanager_scan.scan_naturalKey
+            result = self.sceneResult
+            if column == SCENECOL_PATH:
+                keys = [naturalKey(result.entryRelativePath(e)) for e in self.sceneEntries]
+            elif column == SCENECOL_SIZE:
+                keys = [result.entrySize(e) for e in self.sceneEntries]
+            elif column == SCENECOL_MODIFIED:
+                keys = [result.entryMtime(e) for e in self.sceneEntries]
+            elif column == SCENECOL_PROJECT:
+                keys = [naturalKey(os.path.basename(result.entryProject(e))) for e in self.sceneEntries]
+            elif column == SCENECOL_LOADTIME:
+                keys = [self.loadtimes_median(e) for e in self.sceneEntries]
+            else:
+                keys = [naturalKey(result.entryName(e)) for e in self.sceneEntries]
+            self.sceneSortKeys[column] = keys
+        return keys
+
+    def scenes_sort(self, column=None, order=None):
+        '''
+        Reorder the Scene List with a single keyed sort and re-add the items in bulk.
+        Arg 1: optional column index, defaults to the current sort column <int>
+        Arg 2: optional Qt.SortOrder, defaults to the current order <Qt.SortOrder>
+        '''
+        if column is None:
+            column, order = self.sceneSort
+        self.sceneSort = (column, order)
+        self.ui.sceneTree.header().setSortIndicator(column, order)
+
+        keys = self.scenes_getSortKeys(column)
+        rows = sorted(range(len(self.sceneItems)), key=keys.__getitem__,
+                      reverse=order == Qt.DescendingOrder)
+
+        tree = self.ui.sceneTree
+        tree.setUpdatesEnabled(False)
+        tree.invisibleRootItem().takeChildren()
+        tree.addTopLevelItems([self.sceneItems[idx] for idx in rows])
+
+        # hidden state belongs to the view, so restore it for filtered lists
+        if self.sceneVisible is not None:
+            for idx in set(range(len(self.sceneItems))) - self.sceneVisible:
+                self.sceneItems[idx].setHidden(True)
+        tree.setUpdatesEnabled(True)
+        self.grid_queueRebuild()
+
+    def scenes_sortByColumn(self, column):
+        '''
+        Sort the Scene List when a header is clicked.
+        Clicking the current column flips the order; size and date start newest/largest first.
+        Arg 1: the clicked column index <int>
+        '''
+        current, order = self.sceneSort
+        if column == current:
+            order = Qt.DescendingOrder if order == Qt.AscendingOrder else Qt.AscendingOrder
+        elif column in (SCENECOL_SIZE, SCENECOL_MODIFIED, SCENECOL_LOADTIME):
+            order = Qt.DescendingOrder
+        else:
+            order = Qt.AscendingOrder
+        self.scenes_sort(column, order)
+
+    def scenes_createItem(self, entry, index=None):
+        '''
+        Create a Scene List item for a scan result row, Sequence, VersionGroup or RemovedFile.
+        The item remembers its row (a sequence's first frame) for scenes_getSelectedPath.
+        Arg 1: the entry <int|Sequence|VersionGroup|RemovedFile>
+        Arg 2: optional index of the entry in sceneEntries, for top-level items <int>
+        '''
+        result = self.sceneResult
+        item = QTreeWidgetItem()
+        item.setText(0, result.entryName(entry))
+        item.setText(SCENECOL_SIZE, self.ui_formatSize(result.entrySize(entry)))
+        item.setText(SCENECOL_MODIFIED, time.strftime('%Y-%m-%d %H:%M', time.localtime(result.entryMtime(entry))))
+        item.setTextAlignment(SCENECOL_SIZE, Qt.AlignRight | Qt.AlignVCenter)
+        item.setData(0, Qt.UserRole, result.entryRow(entry))
+        if index is not None:
+            item.setData(0, Qt.UserRole + 1, index)
+        item.setSizeHint(0, QSize(200, 25))
+        item.setForeground(1 , QBrush(QColor('#575757')))
+
+        # sequences show their frame range, and list their frames on expand
+        if isinstance(entry, projectmanager_scan.Sequence):
+            item.setText(0, '%s  [%s]' % (entry.name(), entry.describe()))
+            tooltip = '%d frames, %s' % (len(entry), entry.describe())
+            if entry.missingCount():
+                tooltip += '\nMissing: %s' % projectmanager_scan.scan_formatRanges(entry.gaps())
+            item.setToolTip(0, tooltip)
+            item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+
+        # version groups show the latest version, and list older ones on expand
+        elif isinstance(entry, projectmanager_scan.VersionGroup):
+            item.setText(0, '%s  [%d versions]' % (result.entryName(entry), len(entry)))
+            item.setToolTip(0, 'Latest of %d versions. Expand to see older versions.' % len(entry))
+            item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+
+        # which project a merged row comes from
+        if isinstance(result, projectmanager_multiscan.MergedScanResult):
+            projDir = result.entryProject(entry)
+            item.setText(SCENECOL_PROJECT, os.path.basename(projDir))
+            item.setToolTip(SCENECOL_PROJECT, projDir)
+
+        # where referenced files are read from
+        row = result.entryRow(entry)
+        if self.localCache is not None and row is not None and self.ui.localCacheCheckBox.isChecked():
+            status = self.localCache.status(result.fullPath(row), result.size(row), result.mtime(row))
+            self.localcache_showSource(item, status)
+
+        # median load time, only looked up for file names that were ever loaded
+        if row is not None and result.name(row) in self.loadTimes.names():
+            self.loadtimes_show(item, result.fullPath(row))
+
+        # highlight what changed since the last visit
+        status = self.changes_statusOf(entry)
+        if status is not None:
+            item.setForeground(0, QBrush(QColor(CHANGE_COLORS[status])))
+            item.setToolTip(SCENECOL_MODIFIED, '%s since your last visit' % status.capitalize())
+            if status == 'removed':
+                font = item.font(0)
+                font.setStrikeOut(True)
+                item.setFont(0, font)
+        return item
+
+    def scenes_expandItem(self, item):
+        '''
+        Fill in the frames of a sequence, or the older versions of a scene,
+        the first time it is expanded.
+        Arg 1: the expanded item <QTreeWidgetItem>
+        '''
+        index = item.data(0, Qt.UserRole + 1)
+        if index is None or item.childCount():
+            return
+        entry = self.sceneEntries[int(index)]
+        if isinstance(entry, projectmanager_scan.Sequence):
+            item.addChildren([self.scenes_createItem(row) for row in entry.rows])
+        elif isinstance(entry, projectmanager_scan.VersionGroup):
+            item.addChildren([self.scenes_createItem(row) for row in entry.olderRows()])
+        if item.childCount():
+            self.scenes_fillPaths()
+
+    def scenes_fillPaths(self):
+        '''
+        Fill in the Path column, but only while it is shown.
+        Paths are built from the scan result on demand rather than kept per item.
+        '''
+        if self.ui.sceneTree.isColumnHidden(SCENECOL_PATH) or self.sceneResult is None:
+            return
+        result = self.sceneResult
+        for item, entry in zip(self.sceneItems, self.sceneEntries):
+            if not item.text(SCENECOL_PATH):
+                item.setText(SCENECOL_PATH, result.entryRelativePath(entry))
+
+            # expanded sequences
+            for idx in range(item.childCount()):
+                child = item.child(idx)
+                if not child.text(SCENECOL_PATH):
+                    child.setText(SCENECOL_PATH, result.relativePath(int(child.data(0, Qt.UserRole))))
+
+    def scenes_getItemPath(self, sceneItem):
+        '''
+        Return the path of the file a Scene List item stands for, or None.
+        Arg 1: the scene item <QTreeWidgetItem>
+        '''
+        if sceneItem is None or self.sceneResult is None:
+            return None
+        row = sceneItem.data(0, Qt.UserRole)
+        if row is None:
+            return None
+        return self.sceneResult.fullPath(int(row))
 
     def scenes_getSelectedPath(self):
         '''
@@ -406,25 +2294,141 @@ class ProjectManager(QMainWindow):
         '''
         scenePath = None
         if self.ui.sceneTree.selectedItems():
-            projectItem = self.ui.projectTree.selectedItems()[0]
-            projDir = projectItem.text(1).strip()
-            sceneItem = self.ui.sceneTree.selectedItems()[0]
-            sceneRelativePath = sceneItem.text(1)
-            if os.path.exists(projDir + sceneRelativePath):
-                scenePath = projDir + sceneRelativePath
+            path = self.scenes_getItemPath(self.ui.sceneTree.selectedItems()[0])
+            if path is not None and os.path.exists(path):
+                scenePath = path
         return scenePath
 
-    def scenes_openOrImport(self, type):
+    def scenes_getSelectedLatestPath(self):
+        '''
+        Return the path to the latest version of the selected scene.
+        '''
+        if self.ui.sceneTree.selectedItems() and self.sceneResult is not None:
+            row = self.ui.sceneTree.selectedItems()[0].data(0, Qt.UserRole)
+            if row is not None:
+                group = self.sceneResult.versionGroup(int(row))
+                if group is not None:
+                    row = group.latestRow()
+                scenePath = self.sceneResult.fullPath(int(row))
+                if os.path.exists(scenePath):
+                    return scenePath
+        return None
+
+    def scenes_openOrImport(self, type, scenePath=None):
         '''
         Open or Import the selected 3D file.
         Arg 1: the type of operation <string> ('ref' | 'normal' | 'open')
+        Arg 2: optional path to use instead of the selected scene <string>
         '''
-        scenePath = self.scenes_getSelectedPath()
+        if scenePath is None:
+            scenePath = self.scenes_getSelectedPath()
         if scenePath is not None:
-            if type == 'ref':
-                lx.eval("+scene.importReference {%s}" %scenePath)
-            else:
-                lx.eval('scene.open "%s" %s' %(scenePath, type))
+            prewarmed = self.prewarmer.status(scenePath) if self.prewarmer is not None else None
+            sourcePath = scenePath
+            try:
+                size = os.path.getsize(scenePath)
+            except OSError:
+                size = 0
+            known = self.loadTimes.median(scenePath)
+            if known is not None and known[0] >= self.options.get('heavySceneSecs'):
+                lx.out('PROJECT MANAGER: %s usually takes %s to load' % (
+                    os.path.basename(scenePath), projectmanager_loadtimes.loadtimes_format(known[0])))
+
+            # time the load, whether or not it succeeds
+            outcome = 'failed'
+            started = time.time()
+            try:
+                if type == 'ref':
+                    if self.ui.localCacheCheckBox.isChecked():
+                        scenePath = self.localcache_resolve(scenePath)
+                    lx.eval("+scene.importReference {%s}" %scenePath)
+                else:
+                    lx.eval('scene.open "%s" %s' %(scenePath, type))
+                outcome = 'ok'
+            finally:
+                operation = {'ref': 'reference', 'import': 'import'}.get(type, 'open')
+                self.loadtimes_record(sourcePath, operation, time.time() - started, size, outcome, prewarmed)
+
+            # log load times, so prewarmed and cold opens can be compared
+            if self.ui.prewarmScenesCheckBox.isChecked():
+                lx.out('PROJECT MANAGER: Loaded %s in %.2f s (%s)' % (
+                    os.path.basename(scenePath), time.time() - started, prewarmed or 'cold'))
+
+    def loadtimes_median(self, entry):
+        '''
+        Return the median load time of a Scene List entry, or -1 if it was never loaded.
+        Arg 1: a row, Sequence, VersionGroup or RemovedFile <object>
+        '''
+        result = self.sceneResult
+        row = result.entryRow(entry)
+        if row is None or result.name(row) not in self.loadTimes.names():
+            return -1.0
+        known = self.loadTimes.median(result.fullPath(row))
+        return known[0] if known is not None else -1.0
+
+    def loadtimes_show(self, item, scenePath):
+        '''
+        Display a scene's median load time, flagging it if it is over the heavy scene threshold.
+        Arg 1: the scene item <QTreeWidgetItem>
+        Arg 2: the scene path <string>
+        '''
+        known = self.loadTimes.median(scenePath) if scenePath is not None else None
+        if known is None:
+            return
+        median, count = known
+        threshold = self.options.get('heavySceneSecs')
+        tooltip = 'Median of %d load%s' % (count, 's' if count > 1 else '')
+        failures = self.loadTimes.failures(scenePath)
+        if failures:
+            tooltip += ', %d failed' % failures
+        item.setText(SCENECOL_LOADTIME, projectmanager_loadtimes.loadtimes_format(median))
+        item.setTextAlignment(SCENECOL_LOADTIME, Qt.AlignRight | Qt.AlignVCenter)
+        font = item.font(SCENECOL_LOADTIME)
+        font.setBold(median >= threshold)
+        item.setFont(SCENECOL_LOADTIME, font)
+        if median >= threshold:
+            item.setForeground(SCENECOL_LOADTIME, QBrush(QColor(LOADTIMES_HEAVYCOLOR)))
+            tooltip = 'Heavy scene: over %s to load\n%s' % (projectmanager_loadtimes.loadtimes_format(threshold), tooltip)
+        else:
+            item.setForeground(SCENECOL_LOADTIME, QBrush())
+        item.setToolTip(SCENECOL_LOADTIME, tooltip)
+
+    def loadtimes_record(self, scenePath, operation, seconds, size, outcome, prewarmed):
+        '''
+        Store how long a load took and update the loaded scene's Load Time column.
+        Arg 1: the scene path <string>
+        Arg 2: 'open', 'import' or 'reference' <string>
+        Arg 3: the duration in seconds <float>
+        Arg 4: the file size in bytes <int>
+        Arg 5: 'ok' or 'failed' <string>
+        Arg 6: the prewarm status, or None <string>
+        '''
+        try:
+            self.loadTimes.record(scenePath, operation, seconds, size, outcome, prewarmed)
+        except (IOError, OSError):
+            lx.out('PROJECT MANAGER: Unable to save scene load times.')
+        self.sceneSortKeys.pop(SCENECOL_LOADTIME, None)
+        for item in self.ui.sceneTree.selectedItems():
+            if self.scenes_getItemPath(item) == scenePath:
+                self.loadtimes_show(item, scenePath)
+
+    def act_scn_exportLoadTimes(self):
+        '''
+        Export every recorded scene load to a CSV file, for analysis elsewhere.
+        '''
+        if not os.path.exists(self.loadTimes.path):
+            self.dialog_info('Project Manager', 'No scene load times have been recorded yet.')
+            return
+        default = os.path.join(os.path.expanduser('~'), 'scene_load_times.csv')
+        targetPath = QFileDialog.getSaveFileName(self, 'Export Load Times to...', default, 'CSV files (*.csv)')[0]
+        if not targetPath:
+            return
+        try:
+            count = self.loadTimes.export(targetPath)
+        except (IOError, OSError) as error:
+            self.dialog_info('Trouble exporting load times...', str(error))
+            return
+        lx.out('PROJECT MANAGER: Exported %d scene loads to %s' % (count, targetPath))
 
     def act_project_create(self):
         '''
@@ -444,16 +2448,272 @@ class ProjectManager(QMainWindow):
                 if platform.PathNameByIndex(idx) == "project":
                     folder = platform.PathByIndex(idx)
 
-            # update the project list file
+            # update the project list file, and the project list in every panel
             self.write_projectListFile(folder)
 
-            # update the project list in the UI
-            self.projects_getExisting()
-
             # log and inform
             lx.out('PROJECT MANAGER: A new project was created: %s' %folder)
             self.dialog_info('Project Manager', "Project '%s' was created!" %os.path.basename(folder))
 
+    def act_proj_archive(self):
+        '''
+        Archive the selected project into a .tar.gz, leaving out cache folders and ignored files.
+        '''
+        projDir = self.projects_getSelectedPath()
+        if not projDir or not os.path.isdir(projDir):
+            self.dialog_info('Trouble archiving project...', 'Invalid project path.')
+            return
+        archivePath = self.dialog_archivePath(projDir, os.path.basename(projDir))
+        if archivePath:
+            self.archive_start(projDir, archivePath, lambda cancelled: (
+                projectmanager_archive.archive_projectFiles(projDir, cancelled=cancelled), []))
+
+    def act_scn_archiveSelected(self):
+        '''
+        Archive the selected scenes and the files they reference into a .tar.gz.
+        '''
+        projDir = self.projects_getSelectedPath()
+        scenePaths = [self.scenes_getItemPath(item) for item in self.ui.sceneTree.selectedItems()]
+        scenePaths = [path for path in scenePaths if path is not None]
+        if not projDir or not scenePaths:
+            return
+        name = os.path.splitext(os.path.basename(scenePaths[0]))[0]
+        archivePath = self.dialog_archivePath(projDir, name)
+        if archivePath:
+            self.archive_start(projDir, archivePath, lambda cancelled: (
+                projectmanager_archive.archive_sceneDependencies(projDir, scenePaths, cancelled=cancelled)))
+
+    def act_proj_cleanUp(self):
+        '''
+        Clean up the cache and render folders of the selected projects. The files
+        matching the cleanup rules are listed first, and their size confirmed.
+        '''
+        projDirs = [p for p in self.projects_getSelectedPaths() if os.path.isdir(p)]
+        if not projDirs:
+            self.dialog_info('Trouble cleaning up...', 'Invalid project path.')
+            return
+        if self.cleanupWorker is not None and self.cleanupWorker.isRunning():
+            self.dialog_info('Project Manager', 'A cleanup is already running.')
+            return
+        rules = projectmanager_cleanup.CleanupRules(self.options.get('cleanupOlderThanDays'),
+                                                    self.options.get('cleanupKeepVersions'),
+                                                    read_versionPatterns())
+        if rules.isEmpty():
+            self.dialog_info('Project Manager', 'Choose a cleanup rule first.')
+            return
+        self.cleanupWorker = CleanupPlanWorker(projDirs, rules, self)
+        self.cleanupWorker.planned.connect(self.cleanup_confirm)
+        self.cleanupDialog = QProgressDialog('Listing cache and render folders...', 'Cancel', 0, 0, self)
+        self.cleanupDialog.setWindowTitle('Clean Up')
+        self.cleanupDialog.setMinimumDuration(0)
+        self.cleanupDialog.canceled.connect(self.cleanupWorker.cancel)
+        self.cleanupDialog.show()
+        self.cleanupWorker.start()
+
+    def cleanup_confirm(self, plan):
+        '''
+        Show what a cleanup would remove, and run it if confirmed.
+        Arg 1: the cleanup plan, or None if listing was cancelled <CleanupPlan>
+        '''
+        if self.cleanupDialog is not None:
+            self.cleanupDialog.close()
+            self.cleanupDialog = None
+        if plan is None:
+            return
+        if not plan.count():
+            self.dialog_info('Project Manager', 'Nothing matches the cleanup rules.')
+            return
+        toTrash = self.options.get('cleanupToTrash', True)
+        question = 'Move these files to the cleanup trash?' if toTrash else 'Permanently delete these files?'
+        if self.dialog_confirm('Clean Up', plan.report(self.ui_formatSize) + ['', question]) != QMessageBox.Yes:
+            return
+        cleaner = projectmanager_cleanup.Cleaner(plan, toTrash)
+        self.cleanupWorker = CleanupWorker(cleaner, self)
+        self.cleanupWorker.progressed.connect(self.cleanup_showProgress)
+        self.cleanupWorker.cleaned.connect(self.cleanup_done)
+        self.cleanupDialog = QProgressDialog('Cleaning up...', 'Cancel', 0, 1000, self)
+        self.cleanupDialog.setWindowTitle('Clean Up')
+        self.cleanupDialog.setMinimumDuration(0)
+        self.cleanupDialog.canceled.connect(cleaner.cancel)
+        self.cleanupDialog.show()
+        self.cleanupWorker.start()
+
+    def cleanup_showProgress(self, progress):
+        '''
+        Update the cleanup progress dialog.
+        Arg 1: the Cleaner progress <dict>
+        '''
+        if self.cleanupDialog is None:
+            return
+        if progress['filesTotal']:
+            self.cleanupDialog.setValue(int(1000 * progress['filesDone'] / float(progress['filesTotal'])))
+        self.cleanupDialog.setLabelText('%d of %d files, %s of %s\n%d files/s' % (
+            progress['filesDone'], progress['filesTotal'],
+            self.ui_formatSize(progress['bytesDone']), self.ui_formatSize(progress['bytesTotal']),
+            progress['filesPerSec']))
+
+    def cleanup_done(self, summary, error):
+        '''
+        Close the progress dialog, report how the cleanup went and refresh cleaned projects.
+        Arg 1: the Cleaner summary, or None if it stopped <dict>
+        Arg 2: an error message, or None on success <string>
+        '''
+        if self.cleanupDialog is not None:
+            self.cleanupDialog.close()
+            self.cleanupDialog = None
+        projDirs = list(self.cleanupWorker.cleaner.plan.files)
+        for projDir in projDirs:
+            projectmanager_scan.SCANCACHE.discard(projDir)
+        if self.projects_getSelectedPath() in projDirs:
+            self.scenes_getAll()
+        if error is not None:
+            lx.out('PROJECT MANAGER: Cleanup not finished (%s)' % error)
+            self.dialog_info('Trouble cleaning up...', error)
+            return
+        for message in summary['errors']:
+            lx.out('PROJECT MANAGER: Not cleaned up: %s' % message)
+        verb = 'moved to the cleanup trash' if summary['run'] else 'deleted'
+        lx.out('PROJECT MANAGER: Cleanup %s %d files, %s' % (verb, summary['files'], self.ui_formatSize(summary['bytes'])))
+        message = '%d files (%s) were %s.' % (summary['files'], self.ui_formatSize(summary['bytes']), verb)
+        if summary['errors']:
+            message += '\n%d files could not be cleaned up; see the Event Log.' % len(summary['errors'])
+        self.dialog_info('Project Manager', message)
+
+    def act_proj_restoreCleanup(self):
+        '''
+        Move the files of the selected projects' last cleanup back from the cleanup trash.
+        '''
+        restored = 0
+        conflicts = []
+        for projDir in self.projects_getSelectedPaths():
+            runs = projectmanager_cleanup.cleanup_trashRuns(projDir)
+            if not runs:
+                continue
+            try:
+                count, skipped = projectmanager_cleanup.cleanup_restore(projDir, runs[0])
+            except (IOError, OSError) as error:
+                lx.out('PROJECT MANAGER: Unable to restore cleanup of %s (%s)' % (projDir, error))
+                continue
+            restored += count
+            conflicts.extend(os.path.join(projDir, path) for path in skipped)
+            projectmanager_scan.SCANCACHE.discard(projDir)
+        for path in conflicts:
+            lx.out('PROJECT MANAGER: Not restored, a newer file is in the way: %s' % path)
+        message = '%d files were restored.' % restored
+        if conflicts:
+            message += '\n%d files were left in the cleanup trash; see the Event Log.' % len(conflicts)
+        self.dialog_info('Project Manager', message)
+        self.scenes_getAll()
+
+    def act_proj_emptyCleanupTrash(self):
+        '''
+        Permanently delete the cleanup trash of the selected projects.
+        '''
+        projDirs = [p for p in self.projects_getSelectedPaths() if projectmanager_cleanup.cleanup_trashRuns(p)]
+        if not projDirs:
+            self.dialog_info('Project Manager', 'The cleanup trash is empty.')
+            return
+        lines = ['Permanently delete the cleanup trash of:'] + [os.path.basename(p.rstrip('/\\')) for p in projDirs]
+        if self.dialog_confirm('Empty Cleanup Trash', lines) != QMessageBox.Yes:
+            return
+        if self.cleanupWorker is not None and self.cleanupWorker.isRunning():
+            self.dialog_info('Project Manager', 'A cleanup is already running.')
+            return
+        self.cleanupWorker = TrashEmptyWorker(projDirs, self)
+        self.cleanupDialog = QProgressDialog('Emptying the cleanup trash...', 'Cancel', 0, len(projDirs), self)
+        self.cleanupDialog.setWindowTitle('Empty Cleanup Trash')
+        self.cleanupDialog.setMinimumDuration(0)
+        self.cleanupDialog.canceled.connect(self.cleanupWorker.cancel)
+        self.cleanupWorker.progressed.connect(self.cleanupDialog.setValue)
+        self.cleanupWorker.emptied.connect(self.cleanup_trashEmptied)
+        self.cleanupDialog.show()
+        self.cleanupWorker.start()
+
+    def cleanup_trashEmptied(self, errors):
+        '''
+        Close the progress dialog once the cleanup trash is emptied, reporting any failures.
+        Arg 1: the projects whose trash could not be deleted, with the reason <list>
+        '''
+        if self.cleanupDialog is not None:
+            self.cleanupDialog.close()
+            self.cleanupDialog = None
+        for message in errors:
+            lx.out('PROJECT MANAGER: Unable to empty the cleanup trash of %s' % message)
+        if errors:
+            self.dialog_info('Trouble emptying the cleanup trash...',
+                             '%d projects could not be emptied; see the Event Log.' % len(errors))
+
+    def archive_start(self, projDir, archivePath, listFiles):
+        '''
+        List files and write them to an archive in the background, with a progress
+        dialog which can cancel either.
+        Arg 1: the project path <string>
+        Arg 2: the archive path <string>
+        Arg 3: callable taking a cancelled callable and returning the files to include,
+               relative to the project, and the files left out as outside of it <callable>
+        '''
+        if self.archiveWorker is not None and self.archiveWorker.isRunning():
+            self.dialog_info('Project Manager', 'An archive is already being written.')
+            return
+        self.archiveWorker = ArchiveWorker(projDir, archivePath, listFiles, self)
+        self.archiveWorker.progressed.connect(self.archive_showProgress)
+        self.archiveWorker.archived.connect(self.archive_done)
+
+        self.archiveDialog = QProgressDialog('Listing files...', 'Cancel', 0, 0, self)
+        self.archiveDialog.setWindowTitle('Archive')
+        self.archiveDialog.setMinimumDuration(0)
+        self.archiveDialog.canceled.connect(self.archiveWorker.cancel)
+        self.archiveDialog.show()
+        self.archiveWorker.start()
+
+    def archive_showProgress(self, progress):
+        '''
+        Update the archive progress dialog.
+        Arg 1: the Archiver progress, or None while files are listed <dict>
+        '''
+        if self.archiveDialog is None or progress is None:
+            return
+        if self.archiveDialog.maximum() == 0:
+            self.archiveDialog.setMaximum(1000)
+        if progress['bytesTotal']:
+            self.archiveDialog.setValue(int(1000 * progress['bytesDone'] / float(progress['bytesTotal'])))
+        self.archiveDialog.setLabelText('%d of %d files, %s of %s\n%s/s, %s written' % (
+            progress['filesDone'], progress['filesTotal'],
+            self.ui_formatSize(progress['bytesDone']), self.ui_formatSize(progress['bytesTotal']),
+            self.ui_formatSize(progress['bytesPerSec']), self.ui_formatSize(progress['outBytes'])))
+
+    def archive_done(self, error):
+        '''
+        Close the progress dialog and report how the archive went.
+        Arg 1: an error message, or None on success <string>
+        '''
+        archivePath = self.archiveWorker.archivePath
+        if self.archiveDialog is not None:
+            self.archiveDialog.close()
+            self.archiveDialog = None
+        for path in self.archiveWorker.outside:
+            lx.out('PROJECT MANAGER: Not archived, outside of the project: %s' % path)
+        if error is None:
+            lx.out('PROJECT MANAGER: Archive written: %s' % archivePath)
+            self.dialog_info('Project Manager', "Archive '%s' was written!" % os.path.basename(archivePath))
+        else:
+            lx.out('PROJECT MANAGER: Archive not finished: %s (%s)' % (archivePath, error))
+            self.dialog_info('Trouble archiving...', error)
+
+    def dialog_archivePath(self, projDir, name):
+        '''
+        Ask where to write an archive; returns the path, or None.
+        Arg 1: the project path <string>
+        Arg 2: the default archive name, without extension <string>
+        '''
+        default = os.path.join(os.path.dirname(projDir.rstrip('/\\')), name + '.tar.gz')
+        archivePath = QFileDialog.getSaveFileName(self, 'Archive to...', default, 'Compressed archives (*.tar.gz)')[0]
+        if not archivePath:
+            return None
+        if not archivePath.endswith('.tar.gz'):
+            archivePath += '.tar.gz'
+        return archivePath
+
     def act_proj_explore(self):
         '''
         Explore the selected project's directory.
@@ -486,22 +2746,11 @@ class ProjectManager(QMainWindow):
             confirm = self.dialog_confirm(  'Remove Project...', ['Remove the selected project from the list?'])
             if confirm == QMessageBox.Yes:
 
-                # start by reading the current list
-                with open(PROJECTLISTFILE, 'r') as f:
-                    lines = [line.strip() for line in f if line.strip()]
-                    f.close()
-
-                # if the path is in the list, remove it
-                if project in lines:
-                    lines.remove(project)
-                    # and write the updated list
-                    with open(PROJECTLISTFILE, 'w') as f:
-                        for line in lines:
-                            f.write(line + '\n')
-                        f.close()
-
-                # update the UI
-                self.projects_getExisting()
+                # remove it from the list; every panel's list is updated
+                try:
+                    self.service.removeProject(project)
+                except (IOError, OSError):
+                    lx.out('PROJECT MANAGER: Unable to update the project list.')
 
     def act_proj_addExisting(self):
         '''
@@ -518,7 +2767,6 @@ class ProjectManager(QMainWindow):
                 # check if the '.luxproject' file is legit
                 if lines[0].strip() == '#LXProject#':
                     self.write_projectListFile(inputPath)
-                    self.projects_getExisting()
                     return
                 else:
                     self.dialog_info('Unable to add project...', 'The .luxproject file is incomplete...') 
@@ -526,7 +2774,6 @@ class ProjectManager(QMainWindow):
             else:
                 self.write_rootDefaultSysFile(inputPath)
                 self.write_projectListFile(inputPath)
-                self.projects_getExisting()
 
     def act_scn_openSelected(self):
         '''
@@ -534,6 +2781,12 @@ class ProjectManager(QMainWindow):
         '''
         self.scenes_openOrImport('normal')
 
+    def act_scn_openLatest(self):
+        '''
+        Open the latest version of the selected scene in the current instance of Modo
+        '''
+        self.scenes_openOrImport('normal', self.scenes_getSelectedLatestPath())
+
     def act_scn_importSelected(self):
         '''
         Import the selected Modo-compatible file into the current instance of Modo 
@@ -572,6 +2825,41 @@ class ProjectManager(QMainWindow):
         menu.addAction('Add Existing Project to List...', self.act_proj_addExisting)
         menu.addAction('Remove Selected Project from List', self.act_proj_removeSelected)
         menu.addAction('Show Scenes', self.scenes_getAll)
+        menu.addAction('Archive Project...', self.act_proj_archive)
+
+        # cache and render folder cleanup
+        cleanupMenu = menu.addMenu('Clean Up')
+        cleanupMenu.addAction('Clean Up Selected Projects...', self.act_proj_cleanUp)
+        cleanupMenu.addSeparator()
+        current = self.options.get('cleanupOlderThanDays')
+        for days in CLEANUP_AGES + (None,):
+            label = 'Older Than %d Days' % days if days else 'Any Age'
+            action = cleanupMenu.addAction(label, lambda days=days: self.options_set('cleanupOlderThanDays', days))
+            action.setCheckable(True)
+            action.setChecked(days == current)
+        cleanupMenu.addSeparator()
+        current = self.options.get('cleanupKeepVersions')
+        for count in CLEANUP_KEEPVERSIONS + (None,):
+            label = 'Keep Latest %d Versions' % count if count else 'Any Version'
+            action = cleanupMenu.addAction(label, lambda count=count: self.options_set('cleanupKeepVersions', count))
+            action.setCheckable(True)
+            action.setChecked(count == current)
+        cleanupMenu.addSeparator()
+        action = cleanupMenu.addAction('Move to Cleanup Trash', lambda: self.options_set(
+            'cleanupToTrash', not self.options.get('cleanupToTrash', True)))
+        action.setCheckable(True)
+        action.setChecked(self.options.get('cleanupToTrash', True))
+        cleanupMenu.addAction('Restore Last Cleanup', self.act_proj_restoreCleanup)
+        cleanupMenu.addAction('Empty Cleanup Trash...', self.act_proj_emptyCleanupTrash)
+
+        # catalog grouping
+        if self.ui.projectCatalogCheckBox.isChecked():
+            groupMenu = menu.addMenu('Group Projects By')
+            level = self.options.get('catalogLevel', 1)
+            for value, label in ((1, 'Parent Folder'), (2, 'Grandparent Folder'), (3, 'Great-Grandparent Folder')):
+                action = groupMenu.addAction(label, lambda value=value: self.ui_setCatalogLevel(value))
+                action.setCheckable(True)
+                action.setChecked(value == level)
         menu.exec_(QCursor.pos())
 
     def contextMenu_sceneList(self):
@@ -581,7 +2869,40 @@ class ProjectManager(QMainWindow):
         menu = QMenu()
         menu.setStyleSheet('QMenu::item:selected{color: #f89a2b;background: #545454;}')
         menu.addAction('Open Selected Scene', self.act_scn_openSelected)
+        menu.addAction('Open Latest Version', self.act_scn_openLatest)
         menu.addAction('Import Selected Scene', self.act_scn_importSelected)
         menu.addAction('Import Selected As Referenced', self.act_scn_importSelectedAsRef)
         menu.addAction('Open Scene Folder', self.act_scn_openFolder)
+        menu.addAction('Archive Selected Scenes...', self.act_scn_archiveSelected)
+        menu.addAction('Export Load Times...', self.act_scn_exportLoadTimes)
+
+        # heavy scene threshold
+        thresholdMenu = menu.addMenu('Heavy Scene Threshold')
+        current = self.options.get('heavySceneSecs')
+        for seconds in LOADTIMES_THRESHOLDS:
+            label = '%d s' % seconds if seconds < 60 else '%d min' % (seconds // 60)
+            action = thresholdMenu.addAction(label, lambda seconds=seconds: self.ui_setHeavySceneThreshold(seconds))
+            action.setCheckable(True)
+            action.setChecked(seconds == current)
+
+        # prewarm budget
+        if self.ui.prewarmScenesCheckBox.isChecked():
+            budgetMenu = menu.addMenu('Prewarm Budget')
+            current = self.options.get('prewarmBudgetMB', 2048)
+            for budgetMB in PREWARM_BUDGETS:
+                action = budgetMenu.addAction('%d MB' % budgetMB, lambda budgetMB=budgetMB: self.ui_setPrewarmBudget(budgetMB))
+                action.setCheckable(True)
+                action.setChecked(budgetMB == current)
+
+        # local cache settings
+        if self.ui.localCacheCheckBox.isChecked():
+            cacheMenu = menu.addMenu('Local Cache')
+            cacheMenu.addAction('Set Cache Folder...', self.ui_setLocalCacheFolder)
+            current = self.options.get('localCacheQuotaGB', 20)
+            for quotaGB in LOCALCACHE_QUOTAS:
+                action = cacheMenu.addAction('Quota: %d GB' % quotaGB, lambda quotaGB=quotaGB: self.ui_setLocalCacheQuota(quotaGB))
+                action.setCheckable(True)
+                action.setChecked(quotaGB == current)
+            cacheMenu.addSeparator()
+            cacheMenu.addAction('Clear Cache', self.ui_clearLocalCache)
         menu.exec_(QCursor.pos())
@@ -0,0 +1,330 @@
+#------------------------------------------------------------------------------
+# PROJECT MANAGER ARCHIVE, Tim Crowson
+#------------------------------------------------------------------------------
+# Streams a project, or some scenes and the files they reference, into a
+# .tar.gz without copying anything first. The tar stream is cut into chunks
+# which are compressed by a pool of threads as independent gzip members;
+# concatenated gzip members are a valid gzip file for every unpacking tool.
+#
+# A manifest written next to the archive records the files to include and the
+# last checkpoint, so an interrupted archive resumes where it stopped.
+
+
+import os
+import json
+import time
+import zlib
+import fnmatch
+import tarfile
+import threading
+import collections
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+
+import projectmanager_scan
+import projectmanager_prewarm
+
+
+# ARCHIVE
+ARCHIVE_CHUNK = 4 * 1024 * 1024             # uncompressed bytes per gzip member
+ARCHIVE_LEVEL = 6
+ARCHIVE_WORKERS = max(2, multiprocessing.cpu_count() - 1)
+ARCHIVE_CHECKPOINTSECS = 5                  # how often the manifest is brought up to date
+ARCHIVE_SKIPFOLDERS = ('IrradianceCaches', 'cache', 'Cache', '.cache', 'tmp', '__pycache__', '.git', '.svn', '.pmtrash')
+ARCHIVE_SKIPFILES = ('*.pyc', '*.tmp', '*.part', '.pmindex', '.pmindex.*', 'Thumbs.db', '.DS_Store')
+ARCHIVE_IGNOREFILE = '.pmignore'            # extra patterns, one per line, relative to the project
+ARCHIVE_MANIFEST = '.manifest.json'
+ARCHIVE_MAXDEPTH = 4                        # levels of referenced scenes followed when archiving dependencies
+
+
+class ArchiveCancelled(Exception):
+    '''
+    Raised inside an archive when it is cancelled; the manifest keeps the last checkpoint.
+    '''
+    pass
+
+
+def archive_gzipMember(data, level=ARCHIVE_LEVEL):
+    '''
+    Compress a chunk into a complete gzip member.
+    Arg 1: the uncompressed bytes <bytes>
+    Arg 2: the compression level <int>
+    '''
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+class ParallelGzipWriter(object):
+    '''
+    A write-only file object which compresses what it is given in parallel,
+    one gzip member per chunk, and writes the members to 'out' in order.
+    tell() reports the uncompressed position, as tarfile expects.
+    Arg 1: the output file, opened for binary writing <file>
+    Arg 2: the number of compression threads <int>
+    Arg 3: the uncompressed position to start counting from, when resuming <int>
+    '''
+    def __init__(self, out, workers=ARCHIVE_WORKERS, offset=0, level=ARCHIVE_LEVEL, chunkSize=ARCHIVE_CHUNK):
+        self.out = out
+        self.workers = workers
+        self.level = level
+        self.chunkSize = chunkSize
+        self.offset = offset
+        self.written = 0
+        self._buffer = bytearray()
+        self._pending = collections.deque()
+        self._pool = ThreadPool(workers)
+
+    def write(self, data):
+        self._buffer.extend(data)
+        self.offset += len(data)
+        while len(self._buffer) >= self.chunkSize:
+            self._submit(bytes(self._buffer[:self.chunkSize]))
+            del self._buffer[:self.chunkSize]
+
+    def tell(self):
+        return self.offset
+
+    def _submit(self, data):
+        self._pending.append(self._pool.apply_async(archive_gzipMember, (data, self.level)))
+        while len(self._pending) > self.workers * 2:
+            self._drainOne()
+
+    def _drainOne(self):
+        member = self._pending.popleft().get()
+        self.out.write(member)
+        self.written += len(member)
+
+    def sync(self):
+        '''
+        Compress and write everything given so far, ending the current gzip member.
+        Returns the position in the output file.
+        '''
+        if self._buffer:
+            self._submit(bytes(self._buffer))
+            del self._buffer[:]
+        while self._pending:
+            self._drainOne()
+        self.out.flush()
+        return self.out.tell()
+
+    def close(self):
+        self.sync()
+        self._pool.close()
+        self._pool.join()
+
+
+def archive_ignorePatterns(projDir):
+    '''
+    Return the file name patterns to leave out of a project's archive: the
+    defaults, plus any listed in the project's .pmignore file.
+    Arg 1: the project path <string>
+    '''
+    patterns = list(ARCHIVE_SKIPFILES)
+    path = os.path.join(projDir, ARCHIVE_IGNOREFILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            patterns.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+    return patterns
+
+
+def archive_projectFiles(projDir, patterns=None, cancelled=None):
+    '''
+    Return the relative paths of every file to archive, skipping cache folders,
+    the folders the project associates with irradiance caches, and ignored files.
+    Arg 1: the project path <string>
+    Arg 2: optional ignore patterns, defaults to archive_ignorePatterns <list>
+    Arg 3: optional callable, returning True when listing should stop <callable>
+
+    Raises ArchiveCancelled if cancelled.
+    '''
+    patterns = archive_ignorePatterns(projDir) if patterns is None else patterns
+    skipFolders = set(ARCHIVE_SKIPFOLDERS)
+    skipPaths = set(p.replace('\\', '/').strip('/')
+                    for p in projectmanager_scan.scan_readAssociations(projDir).get('irrad', []))
+    files = []
+    for root, dirs, names in os.walk(projDir):
+        if cancelled is not None and cancelled():
+            raise ArchiveCancelled(projDir)
+        relativeRoot = os.path.relpath(root, projDir).replace('\\', '/')
+        relativeRoot = '' if relativeRoot == '.' else relativeRoot + '/'
+        dirs[:] = sorted(d for d in dirs if d not in skipFolders and relativeRoot + d not in skipPaths
+                         and not archive_isIgnored(relativeRoot + d, patterns))
+        for name in sorted(names):
+            if not archive_isIgnored(relativeRoot + name, patterns):
+                files.append(relativeRoot + name)
+    return files
+
+
+def archive_isIgnored(relativePath, patterns):
+    '''
+    Return True if a relative path, or its file name, matches an ignore pattern.
+    Arg 1: the path relative to the project, with '/' separators <string>
+    Arg 2: the ignore patterns <list>
+    '''
+    name = relativePath.rsplit('/', 1)[-1]
+    return any(fnmatch.fnmatch(name, p) or fnmatch.fnmatch(relativePath, p) for p in patterns)
+
+
+def archive_sceneDependencies(projDir, scenePaths, maxDepth=ARCHIVE_MAXDEPTH, cancelled=None):
+    '''
+    Return the relative paths of some scenes and the files they reference,
+    following referenced scenes. References outside the project are returned
+    separately, since they can't be placed in the archive.
+    Arg 1: the project path <string>
+    Arg 2: absolute scene paths <list>
+    Arg 3: levels of referenced scenes to follow <int>
+    Arg 4: optional callable, returning True when reading scenes should stop <callable>
+
+    Returns (inside, outside) lists.
+    Raises ArchiveCancelled if cancelled.
+    '''
+    root = os.path.normcase(os.path.abspath(projDir)) + os.sep
+    inside, outside = [], []
+    seen = set()
+    queue = [(path, 0) for path in scenePaths]
+    while queue:
+        if cancelled is not None and cancelled():
+            raise ArchiveCancelled(projDir)
+        path, depth = queue.pop(0)
+        key = os.path.normcase(os.path.abspath(path))
+        if key in seen or not os.path.isfile(path):
+            continue
+        seen.add(key)
+        if not key.startswith(root):
+            outside.append(path)
+            continue
+        inside.append(os.path.relpath(path, projDir).replace('\\', '/'))
+        if depth < maxDepth and os.path.splitext(path)[1].lower() in ('.lxo', '.lxl'):
+            references = []
+            try:
+                projectmanager_prewarm.prewarm_file(path, os.path.getsize(path), cancelled, references)
+            except projectmanager_prewarm.PrewarmCancelled:
+                raise ArchiveCancelled(projDir)
+            except (IOError, OSError):
+                continue
+            queue.extend((ref, depth + 1) for ref in references)
+    return inside, outside
+
+
+class Archiver(object):
+    '''
+    Writes files of a project into a .tar.gz, resuming from a previous manifest
+    for the same files if there is one.
+    Arg 1: the project path <string>
+    Arg 2: the archive path <string>
+    Arg 3: the files to include, relative to the project <list>
+    Arg 4: optional callable receiving progress dictionaries <callable>
+    '''
+    def __init__(self, projDir, archivePath, files, progress=None, workers=ARCHIVE_WORKERS):
+        self.projDir = projDir
+        self.archivePath = archivePath
+        self.manifestPath = archivePath + ARCHIVE_MANIFEST
+        # never archive the archive itself
+        own = set(os.path.normcase(os.path.abspath(p))
+                  for p in (archivePath, self.manifestPath, self.manifestPath + '.tmp'))
+        self.files = [f for f in files if os.path.normcase(os.path.abspath(os.path.join(projDir, f))) not in own]
+        self.progress = progress
+        self.workers = workers
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        '''
+        Stop at the next file; the archive can be resumed later.
+        '''
+        self._cancelled.set()
+
+    def _loadManifest(self):
+        try:
+            with open(self.manifestPath) as f:
+                manifest = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+        if manifest.get('projDir') != self.projDir or manifest.get('files') != self.files or manifest.get('complete'):
+            return None
+        if not os.path.exists(self.archivePath) or os.path.getsize(self.archivePath) < manifest['outOffset']:
+            return None
+        return manifest
+
+    def _saveManifest(self, manifest):
+        with open(self.manifestPath + '.tmp', 'w') as f:
+            json.dump(manifest, f)
+        if os.path.exists(self.manifestPath):
+            os.remove(self.manifestPath)
+        os.rename(self.manifestPath + '.tmp', self.manifestPath)
+
+    def run(self):
+        '''
+        Write the archive. Returns the manifest, whose 'complete' key is True once done.
+        Raises ArchiveCancelled if cancelled, leaving a manifest to resume from.
+        Raises IOError if a file fails to read part way, also leaving a manifest.
+        '''
+        manifest = self._loadManifest()
+        if manifest is None:
+            manifest = {'projDir': self.projDir, 'files': self.files, 'done': 0, 'tarOffset': 0,
+                        'outOffset': 0, 'bytesDone': 0, 'complete': False}
+            out = open(self.archivePath, 'wb')
+        else:
+            out = open(self.archivePath, 'r+b')
+            out.seek(manifest['outOffset'])
+            out.truncate()
+
+        sizes = []
+        for relativePath in self.files:
+            try:
+                sizes.append(os.path.getsize(os.path.join(self.projDir, relativePath)))
+            except OSError:
+                sizes.append(0)
+        totalBytes = sum(sizes)
+        bytesDone = manifest['bytesDone']
+        started = time.time()
+        resumedBytes = bytesDone
+        checkpoint = started
+
+        topName = os.path.basename(self.projDir.rstrip('/\\'))
+        writer = ParallelGzipWriter(out, self.workers, offset=manifest['tarOffset'])
+        tar = tarfile.open(fileobj=writer, mode='w', format=tarfile.PAX_FORMAT)
+        try:
+            for idx in range(manifest['done'], len(self.files)):
+                if self._cancelled.is_set():
+                    raise ArchiveCancelled(self.archivePath)
+                relativePath = self.files[idx]
+                fullPath = os.path.join(self.projDir, *relativePath.split('/'))
+                try:
+                    info = tar.gettarinfo(fullPath, arcname=topName + '/' + relativePath)
+                    f = open(fullPath, 'rb')
+                except (IOError, OSError):
+                    # a file vanished or is unreadable; leave it out
+                    f = None
+                if f is not None:
+                    # once its header is written a file can't be left out without corrupting
+                    # the archive, so a failed read stops it; archiving again resumes from
+                    # the last checkpoint
+                    try:
+                        tar.addfile(info, f)
+                    except (IOError, OSError) as error:
+                        raise IOError('Could not read %s (%s). Archive the same files to the same '
+                                      'place to resume.' % (relativePath, error))
+                    finally:
+                        f.close()
+                bytesDone += sizes[idx]
+
+                # checkpoint: end the gzip member and record where the next file starts
+                now = time.time()
+                if now - checkpoint > ARCHIVE_CHECKPOINTSECS or idx == len(self.files) - 1:
+                    manifest.update(done=idx + 1, tarOffset=writer.tell(), outOffset=writer.sync(),
+                                    bytesDone=bytesDone)
+                    self._saveManifest(manifest)
+                    checkpoint = now
+                if self.progress is not None:
+                    elapsed = max(now - started, 1e-6)
+                    self.progress({'filesDone': idx + 1, 'filesTotal': len(self.files),
+                                   'bytesDone': bytesDone, 'bytesTotal': totalBytes,
+                                   'bytesPerSec': (bytesDone - resumedBytes) / elapsed,
+                                   'outBytes': out.tell()})
+            tar.close()
+        finally:
+            writer.close()
+            out.close()
+        manifest.update(complete=True, outOffset=os.path.getsize(self.archivePath))
+        self._saveManifest(manifest)
+        return manifest
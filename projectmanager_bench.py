@@ -0,0 +1,348 @@
+#------------------------------------------------------------------------------
+# PROJECT MANAGER BENCHMARKS, Tim Crowson
+#------------------------------------------------------------------------------
+# Standalone benchmarks for the Qt-free parts of the Project Manager.
+# Run outside of Modo, e.g.:
+#
+#   python projectmanager_bench.py memory 1000000
+#   python projectmanager_bench.py latency 200 100 4
+#   python projectmanager_bench.py projlist data/projects.projlist 4
+#   python projectmanager_bench.py prewarm /mnt/share/project/Scenes/big.lxo
+#   python projectmanager_bench.py index 100 20 4
+#   python projectmanager_bench.py archive /mnt/share/project /tmp/project.tar.gz
+#   python projectmanager_bench.py multiscan 4 50 20 4
+#   python projectmanager_bench.py cleanup 20000 5
+
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+import projectmanager_scan
+import projectmanager_fsshim
+import projectmanager_prewarm
+import projectmanager_index
+import projectmanager_archive
+import projectmanager_multiscan
+import projectmanager_cleanup
+
+
+def bench_syntheticRows(count, filesPerDir=1000):
+    '''
+    Yield (relativeDir, fileName, ext, size, mtime) rows resembling a large project.
+    Arg 1: the number of files <int>
+    Arg 2: the number of files per directory <int>
+    '''
+    now = time.time()
+    for idx in range(count):
+        relativeDir = '/Shots/sh%04d/Scenes/lighting' % (idx // filesPerDir)
+        fileName = 'sh%04d_lighting_v%03d.lxo' % (idx // filesPerDir, idx % filesPerDir)
+        yield relativeDir, fileName, '.lxo', 1024 * (idx % 5000), now - idx
+
+
+def bench_buildTuples(projDir, count):
+    '''
+    Build the per-file tuple layout used before ScanResult, with full relative paths.
+    '''
+    records = []
+    for relativeDir, fileName, ext, size, mtime in bench_syntheticRows(count):
+        filePath = projDir + relativeDir + '/' + fileName
+        records.append((fileName, filePath.replace(projDir, ''), ext, size, mtime))
+    return records
+
+
+def bench_buildScanResult(projDir, count):
+    '''
+    Build the compact ScanResult layout for the same rows.
+    '''
+    result = projectmanager_scan.ScanResult(projDir)
+    for relativeDir, fileName, ext, size, mtime in bench_syntheticRows(count):
+        result.add(result.dirId(relativeDir), fileName, result.extId(ext), size, mtime)
+    return result
+
+
+def bench_measure(builder, *args):
+    '''
+    Return the bytes still allocated after running a builder, and its result.
+    '''
+    import gc
+    import tracemalloc
+    gc.collect()
+    tracemalloc.start()
+    built = builder(*args)
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return current, built
+
+
+def bench_memory(count=1000000):
+    '''
+    Compare the memory held by tuple records and by a ScanResult.
+    Arg 1: the number of files <int>
+    '''
+    count = int(count)
+    try:
+        import tracemalloc
+    except ImportError:
+        print('The memory benchmark needs Python 3 (tracemalloc).')
+        return
+    projDir = '/mnt/projects/feature_film'
+    tupleBytes, records = bench_measure(bench_buildTuples, projDir, count)
+    del records
+    compactBytes, result = bench_measure(bench_buildScanResult, projDir, count)
+    print('files:            %d' % count)
+    print('tuple records:    %.1f MB (%.0f bytes/file)' % (tupleBytes / 1048576.0, tupleBytes / float(count)))
+    print('ScanResult:       %.1f MB (%.0f bytes/file)' % (compactBytes / 1048576.0, compactBytes / float(count)))
+    print('reduction:        %.1fx' % (tupleBytes / float(compactBytes)))
+
+
+def bench_timeScan(projDir, fs):
+    '''
+    Return the seconds taken to scan a project through a file system, and the file count.
+    '''
+    extensions = projectmanager_scan.scan_splitExtensions(['.lxo|.obj|.exr'])
+    started = time.time()
+    with projectmanager_fsshim.fsshim_installed(fs):
+        result = projectmanager_scan.scan_project(projDir, extensions)
+    return time.time() - started, len(result)
+
+
+def bench_latency(dirCount=200, filesPerDir=100, latencyMs=4):
+    '''
+    Time a scan of a synthetic project with and without simulated share latency.
+    Arg 1: the number of directories <int>
+    Arg 2: the number of files per directory <int>
+    Arg 3: the per-call latency in milliseconds <float>
+    '''
+    projDir = '/mnt/share/synthetic'
+    tree = projectmanager_fsshim.fsshim_buildTree(projDir, int(dirCount), int(filesPerDir))
+    local = projectmanager_fsshim.SyntheticFileSystem(tree)
+    latency = float(latencyMs) / 1000.0
+    share = projectmanager_fsshim.LatencyFileSystem(local, latency=latency, jitter=latency / 2, seed=1)
+
+    localTime, files = bench_timeScan(projDir, local)
+    shareTime = bench_timeScan(projDir, share)[0]
+    print('files:            %d in %d directories' % (files, len(tree)))
+    print('local scan:       %.3f s' % localTime)
+    print('share scan:       %.3f s (%s ms/call, %d listings, %d stats)' % (
+        shareTime, latencyMs, share.calls['listDir'], share.calls['stat']))
+
+
+def bench_projlist(projlistPath, latencyMs=4, hangSeconds=2):
+    '''
+    Time the project list health check and a scan of each listed project over a
+    simulated share, with the first project's mount hung.
+    Arg 1: a projects.projlist file <string>
+    Arg 2: the per-call latency in milliseconds <float>
+    Arg 3: seconds a call to the hung mount blocks <float>
+    '''
+    tree = projectmanager_fsshim.fsshim_projlistTree(projlistPath)
+    projects = [line.strip() for line in open(projlistPath) if line.strip()]
+    latency = float(latencyMs) / 1000.0
+    share = projectmanager_fsshim.LatencyFileSystem(
+        projectmanager_fsshim.SyntheticFileSystem(tree), latency=latency, jitter=latency / 2,
+        hungPaths=projects[:1], hangSeconds=float(hangSeconds), seed=1)
+
+    started = time.time()
+    with projectmanager_fsshim.fsshim_installed(share):
+        health = projectmanager_scan.scan_checkHealth(projects)
+    print('health check:     %.3f s for %d projects (%d unreachable)' % (
+        time.time() - started, len(projects), list(health.values()).count(False)))
+    for projDir in projects[1:]:
+        seconds, files = bench_timeScan(projDir, share)
+        print('scan %-40s %.3f s, %d files' % (projDir[-40:], seconds, files))
+
+
+def bench_prewarm(scenePath, budgetMB=2048):
+    '''
+    Time a cold read of a scene against a read after it was prewarmed.
+    Cold reads rely on evicting the file from the page cache (posix_fadvise);
+    on network shares the server's cache may still be warm.
+    Arg 1: a scene file <string>
+    Arg 2: the prewarm budget in megabytes <int>
+    '''
+    if not projectmanager_prewarm.prewarm_evict(scenePath):
+        print('The prewarm benchmark needs posix_fadvise to evict the file from the page cache.')
+        return
+    coldTime = projectmanager_prewarm.prewarm_timeRead(scenePath)
+
+    projectmanager_prewarm.prewarm_evict(scenePath)
+    references = []
+    started = time.time()
+    warmed = projectmanager_prewarm.prewarm_file(scenePath, int(budgetMB) * 1024 * 1024, references=references)
+    prewarmTime = time.time() - started
+    warmTime = projectmanager_prewarm.prewarm_timeRead(scenePath)
+
+    print('scene:            %s (%.1f MB)' % (scenePath, warmed / 1048576.0))
+    print('references:       %d found' % len(references))
+    print('cold read:        %.3f s' % coldTime)
+    print('prewarm:          %.3f s (in the background, before open)' % prewarmTime)
+    print('read after:       %.3f s (%.1fx faster)' % (warmTime, coldTime / max(warmTime, 1e-6)))
+
+
+def bench_index(dirCount=100, filesPerDir=20, latencyMs=4):
+    '''
+    Time a walk of a synthetic project over a simulated share against scans
+    through a shared index, with no and with one changed top-level folder.
+    The index itself is written to a local temporary folder.
+    Arg 1: the number of directories <int>
+    Arg 2: the number of files per directory <int>
+    Arg 3: the per-call latency in milliseconds <float>
+    '''
+    import shutil
+    import tempfile
+    projDir = tempfile.mkdtemp()
+    try:
+        tree = projectmanager_fsshim.fsshim_buildTree(projDir, int(dirCount), int(filesPerDir))
+
+        # folders need an mtime for the index to compare
+        synthetic = projectmanager_fsshim.SyntheticFileSystem(tree)
+        for name, isDir, size, mtime in tree[projDir]:
+            if isDir:
+                synthetic.files[os.path.join(projDir, name)] = projectmanager_fsshim.ShimStat(0, mtime)
+        latency = float(latencyMs) / 1000.0
+        share = projectmanager_fsshim.LatencyFileSystem(synthetic, latency=latency, jitter=latency / 2, seed=1)
+        extensions = projectmanager_scan.scan_splitExtensions(['.lxo|.obj|.exr'])
+
+        def timed(scanner):
+            started = time.time()
+            result = scanner(projDir, extensions, fs=share)
+            return time.time() - started, len(result)
+
+        walkTime, files = timed(projectmanager_scan.scan_project)
+        buildTime = timed(projectmanager_index.index_scan)[0]
+        reuseTime = timed(projectmanager_index.index_scan)[0]
+        name, isDir, size, mtime = tree[projDir][0]
+        synthetic.files[os.path.join(projDir, name)] = projectmanager_fsshim.ShimStat(0, mtime + 1)
+        updateTime = timed(projectmanager_index.index_scan)[0]
+
+        print('files:            %d in %d directories' % (files, len(tree)))
+        print('walk:             %.3f s' % walkTime)
+        print('index build:      %.3f s (%.1f KB)' % (
+            buildTime, os.path.getsize(os.path.join(projDir, projectmanager_index.INDEX_NAME)) / 1024.0))
+        print('index reuse:      %.3f s' % reuseTime)
+        print('one folder moved: %.3f s' % updateTime)
+    finally:
+        shutil.rmtree(projDir, True)
+
+
+def bench_archive(projDir, archivePath):
+    '''
+    Time archiving a project with one compression thread and with the default pool.
+    Arg 1: the project path <string>
+    Arg 2: where to write the archive; it is deleted afterwards <string>
+    '''
+    files = projectmanager_archive.archive_projectFiles(projDir)
+    for workers in (1, projectmanager_archive.ARCHIVE_WORKERS):
+        for path in (archivePath, archivePath + projectmanager_archive.ARCHIVE_MANIFEST):
+            if os.path.exists(path):
+                os.remove(path)
+        started = time.time()
+        manifest = projectmanager_archive.Archiver(projDir, archivePath, files, workers=workers).run()
+        seconds = time.time() - started
+        print('%2d thread(s):     %.2f s, %.1f MB/s, %.1f MB -> %.1f MB' % (
+            workers, seconds, manifest['bytesDone'] / 1048576.0 / max(seconds, 1e-6),
+            manifest['bytesDone'] / 1048576.0, manifest['outOffset'] / 1048576.0))
+    for path in (archivePath, archivePath + projectmanager_archive.ARCHIVE_MANIFEST):
+        os.remove(path)
+
+
+def bench_multiscan(projectCount=4, dirCount=50, filesPerDir=20, latencyMs=4):
+    '''
+    Time scanning several synthetic projects over a simulated share one after
+    another, against scanning them together, and when each had its first rows.
+    Arg 1: the number of projects <int>
+    Arg 2: the number of directories per project <int>
+    Arg 3: the number of files per directory <int>
+    Arg 4: the per-call latency in milliseconds <float>
+    '''
+    projDirs = ['/mnt/share/project%02d' % idx for idx in range(int(projectCount))]
+    tree = {}
+    for projDir in projDirs:
+        tree.update(projectmanager_fsshim.fsshim_buildTree(projDir, int(dirCount), int(filesPerDir)))
+    latency = float(latencyMs) / 1000.0
+    share = projectmanager_fsshim.LatencyFileSystem(projectmanager_fsshim.SyntheticFileSystem(tree),
+                                                    latency=latency, jitter=latency / 2, seed=1)
+    extensions = projectmanager_scan.scan_splitExtensions(['.lxo|.obj|.exr'])
+
+    with projectmanager_fsshim.fsshim_installed(share):
+        started = time.time()
+        firstRows = []
+        for projDir in projDirs:
+            firstRows.append(time.time() - started)
+            projectmanager_scan.scan_project(projDir, extensions)
+        sequentialTime = time.time() - started
+
+        started = time.time()
+        scan = projectmanager_multiscan.MultiScan(projDirs, extensions)
+        merged = projectmanager_multiscan.MergedScanResult(projDirs, extensions)
+        scan.start()
+        seen = {}
+        while not scan.isDone():
+            start = len(merged)
+            scan.drain(merged)
+            for row in range(start, len(merged)):
+                seen.setdefault(merged.project(row), time.time() - started)
+            time.sleep(0.005)
+        mergedTime = time.time() - started
+
+    print('files:            %d in %d projects' % (len(merged), len(projDirs)))
+    print('one by one:       %.3f s, last project started after %.3f s' % (sequentialTime, firstRows[-1]))
+    print('together:         %.3f s, every project listed after %.3f s' % (mergedTime, max(seen.values())))
+
+
+def bench_cleanup(fileCount=20000, versionCount=5):
+    '''
+    Time planning a cleanup of a temporary project's render frames with one
+    thread and with the default pool, then moving the files to the cleanup
+    trash, restoring them and deleting them.
+    Arg 1: the number of frames <int>
+    Arg 2: the number of render versions they are spread over <int>
+    '''
+    fileCount, versionCount = int(fileCount), int(versionCount)
+    projDir = tempfile.mkdtemp(prefix='pmcleanup')
+    try:
+        for idx in range(fileCount):
+            folder = os.path.join(projDir, 'Renders', 'Frames', 'shot_v%03d' % (idx % versionCount + 1),
+                                  'layer%02d' % (idx // 1000))
+            if not os.path.isdir(folder):
+                os.makedirs(folder)
+            with open(os.path.join(folder, 'beauty.%05d.exr' % idx), 'wb') as f:
+                f.write(b'\0' * 1024)
+        rules = projectmanager_cleanup.CleanupRules(keepVersions=1)
+        for workers in (1, projectmanager_cleanup.CLEANUP_WORKERS):
+            started = time.time()
+            plan = projectmanager_cleanup.cleanup_plan([projDir], rules, workers=workers)
+            print('plan, %2d thread(s): %.3f s, %d of %d files' % (workers, time.time() - started, plan.count(), fileCount))
+        started = time.time()
+        summary = projectmanager_cleanup.Cleaner(plan, toTrash=True).execute()
+        print('move to trash:      %.3f s, %d files' % (time.time() - started, summary['files']))
+        started = time.time()
+        restored, conflicts = projectmanager_cleanup.cleanup_restore(projDir, summary['run'])
+        print('restore:            %.3f s, %d files, %d conflicts' % (time.time() - started, restored, len(conflicts)))
+        started = time.time()
+        summary = projectmanager_cleanup.Cleaner(plan, toTrash=False).execute()
+        print('delete:             %.3f s, %d files' % (time.time() - started, summary['files']))
+    finally:
+        shutil.rmtree(projDir, True)
+
+
+BENCHMARKS = {
+    'memory': bench_memory,
+    'latency': bench_latency,
+    'projlist': bench_projlist,
+    'prewarm': bench_prewarm,
+    'index': bench_index,
+    'archive': bench_archive,
+    'multiscan': bench_multiscan,
+    'cleanup': bench_cleanup,
+}
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print('usage: python projectmanager_bench.py <%s> [args]' % '|'.join(sorted(BENCHMARKS)))
+        sys.exit(1)
+    BENCHMARKS[sys.argv[1]](*sys.argv[2:])
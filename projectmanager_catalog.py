@@ -0,0 +1,104 @@
+#------------------------------------------------------------------------------
+# PROJECT MANAGER CATALOG, Tim Crowson
+#------------------------------------------------------------------------------
+# Qt-free grouping and prefix lookup for large project lists.
+
+
+import os
+import re
+import bisect
+
+import projectmanager_scan
+
+
+_TOKENS = re.compile(r'[^a-z0-9]+')
+
+
+def catalog_groupKey(projDir, level=1):
+    '''
+    Return the folder a project is grouped under: its parent for level 1 (e.g. the
+    show), its grandparent for level 2 (e.g. the client), and so on.
+    Arg 1: the project path <string>
+    Arg 2: how many folders up to group by <int>
+    '''
+    folder = projDir.rstrip('/\\')
+    for i in range(max(1, level)):
+        parent = os.path.dirname(folder)
+        if parent == folder:
+            break
+        folder = parent
+    return folder
+
+
+class Catalog(object):
+    '''
+    Projects grouped by a common ancestor folder.
+    Groups are listed up front; their sorted contents are only built when asked for.
+    '''
+    def __init__(self, paths, level=1):
+        self.level = level
+        self._groups = {}
+        self._sorted = set()
+        for projDir in paths:
+            self._groups.setdefault(catalog_groupKey(projDir, level), []).append(projDir)
+
+    def groups(self):
+        '''
+        Return the group folders in natural order.
+        '''
+        return sorted(self._groups, key=projectmanager_scan.scan_naturalKey)
+
+    def count(self, group):
+        '''
+        Return the number of projects in a group.
+        Arg 1: the group folder <string>
+        '''
+        return len(self._groups.get(group, ()))
+
+    def projects(self, group):
+        '''
+        Return a group's projects in natural order.
+        Arg 1: the group folder <string>
+        '''
+        projects = self._groups.get(group, [])
+        if group not in self._sorted:
+            projects.sort(key=lambda p: projectmanager_scan.scan_naturalKey(os.path.basename(p)))
+            self._sorted.add(group)
+        return projects
+
+
+class PrefixIndex(object):
+    '''
+    Sorted index of project name tokens, full names and paths for type-ahead lookup.
+    'lig' finds 'shot010_lighting' through its 'lighting' token.
+    '''
+    def __init__(self, paths):
+        keys = []
+        for projDir in paths:
+            name = os.path.basename(projDir.rstrip('/\\')).lower()
+            keys.append((name, projDir))
+            keys.append((projDir.lower(), projDir))
+            for token in _TOKENS.split(name):
+                if token and token != name:
+                    keys.append((token, projDir))
+        keys.sort()
+        self.keys = [k for k, p in keys]
+        self.paths = [p for k, p in keys]
+
+    def lookup(self, prefix, limit=200):
+        '''
+        Return up to 'limit' distinct projects with a key starting with the prefix.
+        Arg 1: the typed text <string>
+        Arg 2: the maximum number of projects to return <int>
+        '''
+        prefix = prefix.lower()
+        found = []
+        seen = set()
+        idx = bisect.bisect_left(self.keys, prefix)
+        while idx < len(self.keys) and self.keys[idx].startswith(prefix) and len(found) < limit:
+            projDir = self.paths[idx]
+            if projDir not in seen:
+                seen.add(projDir)
+                found.append(projDir)
+            idx += 1
+        return sorted(found, key=lambda p: projectmanager_scan.scan_naturalKey(os.path.basename(p)))
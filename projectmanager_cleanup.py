@@ -0,0 +1,431 @@
+#------------------------------------------------------------------------------
+# PROJECT MANAGER CLEANUP, Tim Crowson
+#------------------------------------------------------------------------------
+# Reclaims space in the cache and render folders of projects. A plan lists
+# the files matching the cleanup rules, so its size can be reviewed before
+# anything is touched; a Cleaner then deletes the files, or moves them into
+# a trash folder in each project, with a pool of threads.
+#
+# Trash folders live in the project root (.pmtrash/<run>), on the same volume
+# as the files, so moving a file there is a rename and a run can be restored.
+
+
+import os
+import re
+import time
+import errno
+import shutil
+import threading
+from multiprocessing.pool import ThreadPool
+
+import projectmanager_scan
+
+
+# CLEANUP
+CLEANUP_WORKERS = 8                                     # files removed at the same time; shares are latency bound
+CLEANUP_CHUNK = 256                                     # files handed to a thread at once
+CLEANUP_ASSOCIATIONS = ('irrad', 'image@renderframes')  # .luxproject associations cleaned by default
+CLEANUP_DEFAULTFOLDERS = ('IrradianceCaches', 'Renders/Frames')
+CLEANUP_TRASH = '.pmtrash'                              # in each project; skipped by scans and archives (SCAN_SKIPFOLDERS, ARCHIVE_SKIPFOLDERS)
+CLEANUP_RUNFORMAT = '%Y%m%d-%H%M%S'
+_RUN = re.compile(r'^\d{8}-\d{6}$')
+
+
+class CleanupCancelled(Exception):
+    '''
+    Raised inside a cleanup when it is cancelled; files already handled stay handled.
+    '''
+    pass
+
+
+class _AnyExtension(object):
+    '''
+    Stands in for an extension set in scan_walk, so every file is listed.
+    '''
+    def __contains__(self, ext):
+        return True
+
+
+def cleanup_targetFolders(projDir):
+    '''
+    Return the folders of a project to clean, relative to the project with '/'
+    separators: those its .luxproject associates with irradiance caches and
+    render frames, or the default folders. Only existing folders are returned.
+    Arg 1: the project path <string>
+    '''
+    associations = projectmanager_scan.scan_readAssociations(projDir)
+    folders = []
+    for kind in CLEANUP_ASSOCIATIONS:
+        folders.extend(p.replace('\\', '/').strip('/') for p in associations.get(kind, []))
+    if not folders:
+        folders = list(CLEANUP_DEFAULTFOLDERS)
+    kept = []
+    for folder in sorted(set(f for f in folders if f and f != CLEANUP_TRASH)):
+        if any(folder.startswith(parent + '/') for parent in kept):
+            continue
+        if os.path.isdir(os.path.join(projDir, *folder.split('/'))):
+            kept.append(folder)
+    return kept
+
+
+def _versionOf(part, compiledPatterns):
+    # the family name and version of one folder or file name stem, or None
+    for regex in compiledPatterns:
+        matches = list(regex.finditer(part))
+        if matches:
+            match = matches[-1]
+            return part[:match.start('version')] + '#' + part[match.end('version'):], int(match.group('version'))
+    return None
+
+
+def cleanup_versionKey(relativePath, compiledPatterns, folderKeys=None):
+    '''
+    Return (family, version) for the first folder or file name in a path which
+    carries a version, e.g. 'Renders/Frames/shot_v003/beauty.0001.exr' gives
+    ('renders/frames/shot_v#', 3), so every frame of a render version goes
+    together. Returns None for unversioned paths.
+    Arg 1: the path relative to the project, with '/' separators <string>
+    Arg 2: compiled version patterns <list>
+    Arg 3: optional dictionary remembering the keys of folders, when keying many files <dict>
+    '''
+    folder, _, name = relativePath.rpartition('/')
+    if folderKeys is not None and folder in folderKeys:
+        key = folderKeys[folder]
+    else:
+        key = None
+        parts = folder.split('/') if folder else []
+        for idx, part in enumerate(parts):
+            found = _versionOf(part, compiledPatterns)
+            if found is not None:
+                key = '/'.join(parts[:idx] + [found[0]]).lower(), found[1]
+                break
+        if folderKeys is not None:
+            folderKeys[folder] = key
+    if key is not None:
+        return key
+    stem, ext = os.path.splitext(name)
+    found = _versionOf(stem, compiledPatterns)
+    if found is None:
+        return None
+    return (folder + '/' + found[0] + ext).lstrip('/').lower(), found[1]
+
+
+class CleanupRules(object):
+    '''
+    Which files to clean up. A file must match every rule that is set.
+    Arg 1: clean files not modified for this many days, or None <float>
+    Arg 2: clean versions older than the latest this many, or None; unversioned
+           files never match this rule <int>
+    Arg 3: optional version patterns, defaults to VERSION_PATTERNS <list>
+    '''
+    def __init__(self, olderThanDays=None, keepVersions=None, versionPatterns=None):
+        self.olderThanDays = olderThanDays
+        self.keepVersions = keepVersions
+        self.compiledPatterns = projectmanager_scan.scan_compileVersionPatterns(versionPatterns)
+
+    def isEmpty(self):
+        return self.olderThanDays is None and self.keepVersions is None
+
+    def select(self, files, now=None):
+        '''
+        Return the files matching the rules.
+        Arg 1: (relativePath, size, mtime) tuples <list>
+        Arg 2: optional current time <float>
+        '''
+        if self.isEmpty():
+            return []
+        selected = files
+        if self.olderThanDays is not None:
+            cutoff = (time.time() if now is None else now) - self.olderThanDays * 86400
+            selected = [f for f in selected if f[2] < cutoff]
+        if self.keepVersions is not None:
+            families = {}
+            versions = {}
+            folderKeys = {}
+            for f in files:
+                key = cleanup_versionKey(f[0], self.compiledPatterns, folderKeys)
+                if key is not None:
+                    families.setdefault(key[0], set()).add(key[1])
+                    versions[f[0]] = key
+            latest = dict((family, set(sorted(found)[-self.keepVersions:]) if self.keepVersions else set())
+                          for family, found in families.items())
+            selected = [f for f in selected if f[0] in versions and versions[f[0]][1] not in latest[versions[f[0]][0]]]
+        return selected
+
+
+class CleanupPlan(object):
+    '''
+    The files a cleanup would remove, per project, for a dry-run report.
+    '''
+    def __init__(self, rules):
+        self.rules = rules
+        self.files = {}
+        self.folders = {}
+
+    def add(self, projDir, folders, files):
+        self.folders[projDir] = folders
+        self.files[projDir] = files
+
+    def count(self, projDir=None):
+        if projDir is not None:
+            return len(self.files.get(projDir, ()))
+        return sum(len(files) for files in self.files.values())
+
+    def size(self, projDir=None):
+        if projDir is not None:
+            return sum(f[1] for f in self.files.get(projDir, ()))
+        return sum(f[1] for files in self.files.values() for f in files)
+
+    def report(self, formatSize=None):
+        '''
+        Return the dry-run report as lines of text: files and size per project, then the total.
+        Arg 1: optional callable formatting byte counts <callable>
+        '''
+        formatSize = formatSize or (lambda size: '%.1f MB' % (size / 1048576.0))
+        lines = []
+        for projDir in sorted(self.files):
+            folders = ', '.join(self.folders.get(projDir) or ['nothing to clean'])
+            lines.append('%s: %d files, %s (%s)' % (os.path.basename(projDir.rstrip('/\\')), self.count(projDir),
+                                                   formatSize(self.size(projDir)), folders))
+        lines.append('Total: %d files, %s' % (self.count(), formatSize(self.size())))
+        return lines
+
+
+def _listFolder(task):
+    projDir, top, recursive, abort = task
+    files = []
+    if recursive:
+        walk = projectmanager_scan.scan_walk(top, _AnyExtension(), abort)
+    else:
+        try:
+            entries = projectmanager_scan.FS.listDir(top)
+        except OSError:
+            return projDir, []
+        found = []
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    continue
+                st = entry.stat()
+                found.append((entry.name, '', st.st_size, st.st_mtime))
+            except OSError:
+                continue
+        walk = [(top, found)]
+    try:
+        for root, names in walk:
+            relativeRoot = root[len(projDir):].replace('\\', '/').strip('/')
+            for name, ext, size, mtime in names:
+                files.append((relativeRoot + '/' + name, size, mtime))
+    except projectmanager_scan.ScanAborted:
+        pass
+    return projDir, files
+
+
+def cleanup_plan(projDirs, rules, workers=CLEANUP_WORKERS, cancelled=None):
+    '''
+    List the cleanable folders of some projects in parallel and return a
+    CleanupPlan of the files matching the rules. Each subfolder of a cleanable
+    folder is listed by its own task, so large folders are spread over the threads.
+    Arg 1: the project paths <list>
+    Arg 2: the cleanup rules <CleanupRules>
+    Arg 3: the number of threads <int>
+    Arg 4: optional callable, returning True when planning should stop <callable>
+    '''
+    plan = CleanupPlan(rules)
+    tasks = []
+    for projDir in projDirs:
+        folders = cleanup_targetFolders(projDir)
+        plan.add(projDir, folders, [])
+        for folder in folders:
+            top = os.path.join(projDir, *folder.split('/'))
+            tasks.append((projDir, top, False, cancelled))
+            try:
+                entries = projectmanager_scan.FS.listDir(top)
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir() and not entry.is_symlink():
+                        tasks.append((projDir, entry.path, True, cancelled))
+                except OSError:
+                    continue
+
+    listed = dict((projDir, []) for projDir in projDirs)
+    pool = ThreadPool(max(1, min(workers, len(tasks))))
+    try:
+        for projDir, files in pool.imap_unordered(_listFolder, tasks):
+            listed[projDir].extend(files)
+    finally:
+        pool.close()
+        pool.join()
+    if cancelled is not None and cancelled():
+        raise CleanupCancelled('cleanup planning interrupted')
+
+    # version rules compare files across a whole project, so they run once everything is listed
+    now = time.time()
+    for projDir in projDirs:
+        plan.files[projDir] = sorted(rules.select(listed[projDir], now))
+    return plan
+
+
+def _makeDirs(path):
+    try:
+        os.makedirs(path)
+    except OSError as error:
+        if error.errno != errno.EEXIST:
+            raise
+
+
+def _removeEmptyDirs(projDir, relativeDirs, stopAt):
+    # deepest first, stopping at the cleaned folders themselves
+    for relativeDir in sorted(relativeDirs, key=lambda d: -d.count('/')):
+        while relativeDir and relativeDir not in stopAt:
+            try:
+                os.rmdir(os.path.join(projDir, *relativeDir.split('/')))
+            except OSError:
+                break
+            relativeDir = relativeDir.rpartition('/')[0]
+
+
+class Cleaner(object):
+    '''
+    Deletes the files of a CleanupPlan, or moves them into each project's trash,
+    with a pool of threads. Folders left empty are removed.
+    Arg 1: the plan <CleanupPlan>
+    Arg 2: True to move files into the trash, False to delete them <bool>
+    Arg 3: optional callable receiving progress dictionaries <callable>
+    Arg 4: the number of threads <int>
+    '''
+    def __init__(self, plan, toTrash=True, progress=None, workers=CLEANUP_WORKERS):
+        self.plan = plan
+        self.toTrash = toTrash
+        self.progress = progress
+        self.workers = workers
+        self.run = None
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        '''
+        Stop after the files being handled; a trash run can still be restored.
+        '''
+        self._cancelled.set()
+
+    def _handle(self, task):
+        projDir, trashDir, files = task
+        done = 0
+        freed = 0
+        errors = []
+        made = set()
+        for relativePath, size, mtime in files:
+            if self._cancelled.is_set():
+                break
+            source = os.path.join(projDir, *relativePath.split('/'))
+            try:
+                if trashDir is None:
+                    os.remove(source)
+                else:
+                    target = os.path.join(trashDir, *relativePath.split('/'))
+                    if os.path.dirname(target) not in made:
+                        _makeDirs(os.path.dirname(target))
+                        made.add(os.path.dirname(target))
+                    os.rename(source, target)
+                done += 1
+                freed += size
+            except OSError as error:
+                errors.append('%s: %s' % (source, error.strerror or error))
+        return done, freed, errors
+
+    def execute(self):
+        '''
+        Clean up. Returns a summary dictionary with the number of files and bytes
+        handled, any errors, and the trash run name when files were moved.
+        Raises CleanupCancelled if cancelled.
+        '''
+        self.run = time.strftime(CLEANUP_RUNFORMAT) if self.toTrash else None
+        tasks = []
+        for projDir, files in self.plan.files.items():
+            trashDir = os.path.join(projDir, CLEANUP_TRASH, self.run) if self.toTrash else None
+            for start in range(0, len(files), CLEANUP_CHUNK):
+                tasks.append((projDir, trashDir, files[start:start + CLEANUP_CHUNK]))
+
+        total = self.plan.count()
+        totalBytes = self.plan.size()
+        summary = {'files': 0, 'bytes': 0, 'errors': [], 'run': self.run}
+        started = time.time()
+        pool = ThreadPool(max(1, min(self.workers, len(tasks))))
+        try:
+            for done, freed, errors in pool.imap_unordered(self._handle, tasks):
+                summary['files'] += done
+                summary['bytes'] += freed
+                summary['errors'].extend(errors)
+                if self.progress is not None:
+                    elapsed = max(time.time() - started, 1e-6)
+                    self.progress({'filesDone': summary['files'], 'filesTotal': total,
+                                   'bytesDone': summary['bytes'], 'bytesTotal': totalBytes,
+                                   'filesPerSec': summary['files'] / elapsed})
+        finally:
+            pool.close()
+            pool.join()
+
+        for projDir, files in self.plan.files.items():
+            _removeEmptyDirs(projDir, set(f[0].rpartition('/')[0] for f in files), set(self.plan.folders.get(projDir, ())))
+        if self._cancelled.is_set():
+            raise CleanupCancelled(self.run or 'cleanup interrupted')
+        return summary
+
+
+def cleanup_trashRuns(projDir):
+    '''
+    Return the names of a project's trash runs, newest first.
+    Arg 1: the project path <string>
+    '''
+    trash = os.path.join(projDir, CLEANUP_TRASH)
+    try:
+        names = os.listdir(trash)
+    except OSError:
+        return []
+    return sorted((n for n in names if _RUN.match(n)), reverse=True)
+
+
+def cleanup_restore(projDir, run):
+    '''
+    Move the files of a trash run back where they were. Files recreated at their
+    original place since are left in the trash. Returns (restored, conflicts).
+    Arg 1: the project path <string>
+    Arg 2: the trash run name <string>
+    '''
+    runDir = os.path.join(projDir, CLEANUP_TRASH, run)
+    restored = 0
+    conflicts = []
+    for root, dirs, names in os.walk(runDir):
+        relativeRoot = os.path.relpath(root, runDir)
+        for name in names:
+            relativePath = os.path.normpath(os.path.join(relativeRoot, name))
+            target = os.path.join(projDir, relativePath)
+            if os.path.exists(target):
+                conflicts.append(relativePath)
+                continue
+            _makeDirs(os.path.dirname(target))
+            os.rename(os.path.join(root, name), target)
+            restored += 1
+    if not conflicts:
+        shutil.rmtree(runDir, True)
+    return restored, conflicts
+
+
+def cleanup_emptyTrash(projDir, olderThanDays=0):
+    '''
+    Permanently delete a project's trash runs. Returns the number of runs deleted.
+    Arg 1: the project path <string>
+    Arg 2: only delete runs older than this many days <float>
+    '''
+    cutoff = time.time() - olderThanDays * 86400
+    deleted = 0
+    for run in cleanup_trashRuns(projDir):
+        if time.mktime(time.strptime(run, CLEANUP_RUNFORMAT)) <= cutoff:
+            shutil.rmtree(os.path.join(projDir, CLEANUP_TRASH, run), True)
+            deleted += 1
+    trash = os.path.join(projDir, CLEANUP_TRASH)
+    if os.path.isdir(trash) and not os.listdir(trash):
+        os.rmdir(trash)
+    return deleted
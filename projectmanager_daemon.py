@@ -0,0 +1,408 @@
+#------------------------------------------------------------------------------
+# PROJECT MANAGER INDEX DAEMON, Tim Crowson
+#------------------------------------------------------------------------------
+# An optional local process which scans projects on behalf of every Modo
+# instance on the workstation, over a Unix domain socket, so a project is
+# walked once and held in memory once. Start it outside of Modo:
+#
+#   python projectmanager_daemon.py [socketPath]
+#
+# Panels fall back to scanning in-process whenever the daemon can't be reached.
+# Requests for a project already being scanned wait for that scan instead of
+# starting another one. Cached projects are watched by polling the mtimes of
+# their folders, and scanned again on the next request once one has changed.
+#
+# The socket is kept in a folder only its user can enter, and the panels only
+# talk to a socket owned by their user. Messages are JSON, with the listing
+# sent after them as raw .pmindex bytes.
+
+
+import os
+import sys
+import json
+import stat
+import time
+import errno
+import socket
+import struct
+import threading
+
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+
+import projectmanager_scan
+import projectmanager_index
+
+
+# INDEX DAEMON
+# the socket lives in a folder only its user can enter: $XDG_RUNTIME_DIR, or one made in the home folder
+DAEMON_FOLDER = (os.path.join(os.environ['XDG_RUNTIME_DIR'], 'projectmanager')
+                 if os.path.isdir(os.environ.get('XDG_RUNTIME_DIR') or '')
+                 else os.path.join(os.path.expanduser('~'), '.projectmanager'))
+DAEMON_SOCKET = os.path.join(DAEMON_FOLDER, 'index.sock')
+DAEMON_CONNECTTIMEOUT = 0.5     # seconds to wait for the daemon to accept a request
+DAEMON_SCANTIMEOUT = 600        # seconds to wait for a scan before scanning in-process
+DAEMON_RETRYDELAY = 30          # seconds before a daemon that couldn't be reached is tried again
+DAEMON_ABORTPOLL = 0.1          # seconds between checks of a scan's abort callable while waiting for the daemon
+DAEMON_MAXMESSAGE = 1 << 20     # bytes of JSON a message may hold, besides its payload
+DAEMON_WATCHSECS = 10           # seconds between checks of the folders of cached projects
+DAEMON_WATCHSTATS = 2000        # folders the watcher may check per second
+
+_HEADER = struct.Struct('<QQ')  # bytes of JSON, bytes of payload
+
+
+def daemon_isPrivate(path, kind):
+    '''
+    Return True if a path is owned by the current user, is of the given kind,
+    and, for a folder, can't be written to by anyone else.
+    Arg 1: the path <string>
+    Arg 2: stat.S_ISSOCK or stat.S_ISDIR <callable>
+    '''
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    if not kind(st.st_mode) or st.st_uid != os.getuid():
+        return False
+    return kind is not stat.S_ISDIR or not st.st_mode & 0o022
+
+
+def daemon_makeFolder(folder):
+    '''
+    Create the socket folder, readable by its user only, or check an existing one
+    can't be written to by anyone else.
+    Arg 1: the folder <string>
+    '''
+    if not os.path.isdir(folder):
+        os.makedirs(folder, 0o700)
+    if not daemon_isPrivate(folder, stat.S_ISDIR):
+        raise OSError(errno.EPERM, 'the socket folder must belong to you and only be writable by you', folder)
+
+
+def daemon_send(sock, message, payload=b''):
+    '''
+    Send a message as a length-prefixed JSON header followed by raw payload bytes.
+    Arg 1: the connected socket <socket>
+    Arg 2: the message, made of JSON types <list>
+    Arg 3: optional bytes sent as they are, e.g. a .pmindex <bytes>
+    '''
+    data = json.dumps(message).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(data), len(payload)) + data)
+    if payload:
+        sock.sendall(payload)
+
+
+def daemon_recv(sock, abort=None, deadline=None):
+    '''
+    Receive a message sent by daemon_send. Returns (message, payload).
+    With a socket timeout set, the abort callable is polled at each timeout
+    until the deadline.
+    Arg 1: the connected socket <socket>
+    Arg 2: optional callable, returning True when waiting should stop <callable>
+    Arg 3: optional time.time() to give up at <float>
+
+    Raises ScanAborted if aborted.
+    '''
+    def read(count):
+        chunks = []
+        while count:
+            try:
+                chunk = sock.recv(min(count, 1 << 20))
+            except socket.timeout:
+                if abort is not None and abort():
+                    raise projectmanager_scan.ScanAborted('scan interrupted')
+                if deadline is None or time.time() > deadline:
+                    raise
+                continue
+            if not chunk:
+                raise socket.error(errno.ECONNRESET, 'connection closed')
+            chunks.append(chunk)
+            count -= len(chunk)
+        return b''.join(chunks)
+    size, payloadSize = _HEADER.unpack(read(_HEADER.size))
+    if size > DAEMON_MAXMESSAGE:
+        raise ValueError('message too large')
+    message = json.loads(read(size).decode('utf-8'))
+    return message, read(payloadSize)
+
+
+def daemon_folderStamps(projDir, relativeDirs=()):
+    '''
+    Return the mtimes of a project's root, its top-level folders and some other
+    folders, as {path: mtime}; a folder which can't be read gets None.
+    Arg 1: the project path <string>
+    Arg 2: folders relative to the project, e.g. a ScanResult's dirs <list>
+    '''
+    paths = set([projDir])
+    try:
+        for entry in projectmanager_scan.FS.listDir(projDir):
+            try:
+                if entry.is_dir() and not entry.is_symlink() and entry.name not in projectmanager_scan.SCAN_SKIPFOLDERS:
+                    paths.add(entry.path)
+            except OSError:
+                continue
+    except OSError:
+        pass
+    paths.update(projDir + d for d in relativeDirs if d)
+    stamps = {}
+    for path in paths:
+        try:
+            stamps[path] = os.stat(path).st_mtime
+        except OSError:
+            stamps[path] = None
+    return stamps
+
+
+class _ScanJob(object):
+    '''
+    A scan in progress, which concurrent requests for the same project wait on.
+    '''
+    def __init__(self, extensions):
+        self.extensions = frozenset(extensions)
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class IndexDaemon(object):
+    '''
+    Serves project scans from a shared ScanCache, coalescing concurrent
+    requests for a project into a single scan. The folders of cached projects
+    are watched, and a project is dropped from the cache once one changes.
+    Arg 1: the socket path <string>
+    '''
+    def __init__(self, path=DAEMON_SOCKET):
+        self.path = path
+        self.cache = projectmanager_scan.ScanCache()
+        self.stats = {'requests': 0, 'scans': 0, 'coalesced': 0, 'cached': 0, 'invalidated': 0}
+        self._jobs = {}
+        self._watched = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def scan(self, projDir, extensions, refresh=False):
+        '''
+        Return the ScanResult of a project, from the cache, a scan already in
+        progress, or a new scan.
+        Arg 1: the project path <string>
+        Arg 2: lowercase extensions to scan for <set>
+        Arg 3: ignore any cached result <bool>
+        '''
+        extensions = frozenset(extensions)
+        with self._lock:
+            self.stats['requests'] += 1
+            if not refresh:
+                cached = self.cache.get(projDir)
+                if cached is not None and extensions <= cached.extensions:
+                    self.stats['cached'] += 1
+                    return cached
+            job = self._jobs.get(projDir)
+            owner = job is None or refresh or not extensions <= job.extensions
+            if owner:
+                job = self._jobs[projDir] = _ScanJob(extensions | (job.extensions if job is not None else extensions))
+                self.stats['scans'] += 1
+            else:
+                self.stats['coalesced'] += 1
+
+        if not owner:
+            job.done.wait()
+        else:
+            try:
+                # stamped before the scan, so changes made while it runs are noticed too
+                stamps = daemon_folderStamps(projDir)
+                job.result = projectmanager_scan.SCANNER(projDir, job.extensions)
+                stamps.update((path, mtime) for path, mtime in daemon_folderStamps(projDir, job.result.dirs).items()
+                              if path not in stamps)
+                self.cache.put(projDir, job.result)
+                with self._lock:
+                    self._watched[projDir] = (time.time(), stamps)
+            except Exception as error:
+                job.error = str(error)
+            finally:
+                with self._lock:
+                    if self._jobs.get(projDir) is job:
+                        del self._jobs[projDir]
+                job.done.set()
+        if job.error is not None:
+            raise OSError(job.error)
+        return job.result
+
+    def watch(self):
+        '''
+        Check the folders of cached projects every DAEMON_WATCHSECS until stop()
+        is called, dropping a project from the cache once one of its folders changed.
+        '''
+        while not self._stopped.wait(DAEMON_WATCHSECS):
+            with self._lock:
+                watched = list(self._watched.items())
+            budget = projectmanager_scan.IOBudget(0, DAEMON_WATCHSTATS)
+            for projDir, entry in watched:
+                stamped, stamps = entry
+                if time.time() - stamped > self.cache.maxAge:
+                    changed = True
+                else:
+                    changed = False
+                    for path, mtime in stamps.items():
+                        budget.spend(1)
+                        try:
+                            changed = os.stat(path).st_mtime != mtime
+                        except OSError:
+                            changed = mtime is not None
+                        if changed:
+                            break
+                if changed:
+                    with self._lock:
+                        # a scan may have replaced the entry meanwhile
+                        if self._watched.get(projDir) is entry:
+                            del self._watched[projDir]
+                            self.cache.discard(projDir)
+                            self.stats['invalidated'] += 1
+
+    def stop(self):
+        self._stopped.set()
+
+    def handle(self, request):
+        '''
+        Answer a request: ['scan', projDir, extensions, refresh, cachedOnly], ['stats']
+        or ['ping']. Returns the reply and its payload: a scan is answered with the
+        project's listing in the .pmindex layout, or 'missing' if only a cached
+        listing was asked for and there is none.
+        Arg 1: the request <list>
+        '''
+        if request[0] == 'scan':
+            if len(request) > 4 and request[4]:
+                with self._lock:
+                    cached = self.cache.get(request[1])
+                if cached is None or not set(request[2]) <= cached.extensions:
+                    return ['missing', None], b''
+            result = self.scan(request[1], request[2], request[3])
+            return ['ok', None], projectmanager_index.index_dumps(result, {})
+        if request[0] == 'stats':
+            with self._lock:
+                return ['ok', dict(self.stats, jobs=len(self._jobs), watched=len(self._watched),
+                                   cacheBytes=self.cache.usedBytes)], b''
+        if request[0] == 'ping':
+            return ['ok', os.getpid()], b''
+        return ['error', 'unknown request %r' % (request[0],)], b''
+
+    def serve(self):
+        '''
+        Listen on the socket until interrupted.
+        '''
+        daemon_makeFolder(os.path.dirname(os.path.abspath(self.path)))
+        if os.path.lexists(self.path):
+            if daemon_request(['ping'], self.path, DAEMON_CONNECTTIMEOUT) is not None:
+                raise OSError(errno.EADDRINUSE, 'a daemon is already listening', self.path)
+            os.remove(self.path)
+
+        daemon = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                try:
+                    request, payload = daemon_recv(self.request)
+                    try:
+                        reply, payload = daemon.handle(request)
+                    except (OSError, IOError, projectmanager_scan.ScanAborted,
+                            IndexError, KeyError, TypeError, ValueError) as error:
+                        reply, payload = ['error', str(error)], b''
+                    daemon_send(self.request, reply, payload)
+                except (socket.error, struct.error, ValueError):
+                    pass
+
+        # the socket is created readable by its user only, rather than restricted after bind
+        umask = os.umask(0o177)
+        try:
+            server = socketserver.ThreadingUnixStreamServer(self.path, Handler)
+        finally:
+            os.umask(umask)
+        server.daemon_threads = True
+        watcher = threading.Thread(target=self.watch, name='pm.daemon.watch')
+        watcher.daemon = True
+        watcher.start()
+        try:
+            server.serve_forever()
+        finally:
+            self.stop()
+            server.server_close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+_unreachable = [0.0]
+
+
+def daemon_request(request, path=DAEMON_SOCKET, timeout=DAEMON_SCANTIMEOUT, abort=None):
+    '''
+    Send a request to the daemon and return its reply: the payload bytes if it
+    has any, otherwise its value. Returns None if the daemon isn't running, can't
+    be reached or failed, or if the socket isn't the current user's own. After a
+    failed connection the daemon isn't tried again for a while.
+    Arg 1: the request <list>
+    Arg 2: the socket path <string>
+    Arg 3: seconds to wait for the reply <float>
+    Arg 4: optional callable, polled while waiting, returning True to stop <callable>
+
+    Raises ScanAborted if aborted while waiting.
+    '''
+    if not hasattr(socket, 'AF_UNIX') or not os.path.lexists(path):
+        return None
+    if time.time() - _unreachable[0] < DAEMON_RETRYDELAY:
+        return None
+    # anyone able to create the socket could answer in the daemon's place
+    if not (daemon_isPrivate(path, stat.S_ISSOCK) and
+            daemon_isPrivate(os.path.dirname(os.path.abspath(path)), stat.S_ISDIR)):
+        _unreachable[0] = time.time()
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(DAEMON_CONNECTTIMEOUT)
+        try:
+            sock.connect(path)
+        except socket.error:
+            _unreachable[0] = time.time()
+            return None
+        sock.settimeout(timeout if abort is None else min(timeout, DAEMON_ABORTPOLL))
+        daemon_send(sock, list(request))
+        reply, payload = daemon_recv(sock, abort, time.time() + timeout)
+    except (socket.error, struct.error, ValueError):
+        return None
+    finally:
+        sock.close()
+    if not isinstance(reply, list) or len(reply) != 2 or reply[0] != 'ok':
+        return None
+    return payload if payload else reply[1]
+
+
+def daemon_scanner(fallback):
+    '''
+    Return a scanner for projectmanager_scan.SCANNER which asks the daemon first
+    and scans with 'fallback' when the daemon can't answer. The abort callable
+    is polled while the daemon scans. The daemon's walks aren't throttled, so
+    scans given an I/O budget, i.e. prefetches, only take listings the daemon
+    already holds and otherwise scan in-process within their budget.
+    Arg 1: the in-process scanner, e.g. scan_project <callable>
+    '''
+    def scan(projDir, extensions, abort=None, budget=None, versionPatterns=None, fs=None):
+        if abort is not None and abort():
+            raise projectmanager_scan.ScanAborted('scan interrupted')
+        data = daemon_request(['scan', projDir, sorted(extensions), False, budget is not None], abort=abort)
+        index = projectmanager_index.index_parse(data, projDir) if isinstance(data, bytes) else None
+        if index is None:
+            return fallback(projDir, extensions, abort, budget, versionPatterns, fs)
+        return projectmanager_index.index_toResult(index, projDir, versionPatterns)
+    scan.fallback = fallback
+    return scan
+
+
+if __name__ == '__main__':
+    socketPath = sys.argv[1] if len(sys.argv) > 1 else DAEMON_SOCKET
+    if os.environ.get('PROJECTMANAGER_SHAREDINDEX'):
+        projectmanager_scan.SCANNER = projectmanager_index.index_scan
+    print('Project Manager index daemon listening on %s' % socketPath)
+    try:
+        IndexDaemon(socketPath).serve()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,223 @@
+#------------------------------------------------------------------------------
+# PROJECT MANAGER FILE SYSTEM SHIM, Tim Crowson
+#------------------------------------------------------------------------------
+# Test and benchmark stand-ins for projectmanager_scan.FS, which simulate the
+# behavior of network shares (latency, jitter, timeouts and hung mounts) on a
+# local machine, over either a synthetic tree or real paths.
+#
+#   shim = LatencyFileSystem(SyntheticFileSystem(fsshim_buildTree('/proj', 50, 200)),
+#                            latency=0.004, jitter=0.002, hungPaths=['/mnt/dead'])
+#   with fsshim_installed(shim):
+#       projectmanager_scan.scan_project('/proj', set(['.lxo']))
+
+
+import os
+import time
+import errno
+import random
+import threading
+import contextlib
+
+import projectmanager_scan
+
+
+class ShimStat(object):
+    '''
+    The stat fields used by scans.
+    '''
+    __slots__ = ('st_size', 'st_mtime')
+
+    def __init__(self, size, mtime):
+        self.st_size = size
+        self.st_mtime = mtime
+
+
+class ShimEntry(object):
+    '''
+    DirEntry-like object whose stat() goes back through a shim file system.
+    '''
+    __slots__ = ('name', 'path', '_isDir', '_isLink', '_fs', '_entry')
+
+    def __init__(self, fs, path, name, isDir, isLink=False, entry=None):
+        self._fs = fs
+        self.path = path
+        self.name = name
+        self._isDir = isDir
+        self._isLink = isLink
+        self._entry = entry
+
+    def is_dir(self):
+        return self._isDir
+
+    def is_symlink(self):
+        return self._isLink
+
+    def stat(self):
+        return self._fs.stat(self.path, self._entry)
+
+
+class SyntheticFileSystem(object):
+    '''
+    An in-memory directory tree, as built by fsshim_buildTree().
+    The tree maps directory paths to lists of (name, isDir, size, mtime) tuples.
+    '''
+    def __init__(self, tree):
+        self.tree = tree
+        self.files = {}
+        for root, children in tree.items():
+            for name, isDir, size, mtime in children:
+                if not isDir:
+                    self.files[os.path.join(root, name)] = ShimStat(size, mtime)
+
+    def listDir(self, path):
+        if path not in self.tree:
+            raise OSError(errno.ENOENT, 'No such directory', path)
+        return [ShimEntry(self, os.path.join(path, name), name, isDir)
+                for name, isDir, size, mtime in self.tree[path]]
+
+    def stat(self, path, entry=None):
+        if path not in self.files:
+            raise OSError(errno.ENOENT, 'No such file', path)
+        return self.files[path]
+
+    def exists(self, path):
+        return path in self.tree or path in self.files
+
+    def isDir(self, path):
+        return path in self.tree
+
+
+class LatencyFileSystem(object):
+    '''
+    Wraps another file system, adding per-call latency, jitter, random timeouts
+    and hung mounts to every listing, stat and existence check.
+    Arg 1: the wrapped file system, defaults to the local one <object>
+    Arg 2: seconds added to each call <float>
+    Arg 3: up to this many seconds of random extra delay <float>
+    Arg 4: probability of a call failing with ETIMEDOUT <float>
+    Arg 5: path prefixes whose calls hang <list>
+    Arg 6: seconds a hung call blocks before timing out, None to block until release() <float>
+    Arg 7: seed for reproducible jitter and timeouts <int>
+    '''
+    def __init__(self, base=None, latency=0.0, jitter=0.0, timeoutRate=0.0,
+                 hungPaths=(), hangSeconds=5.0, seed=None):
+        self.base = base or projectmanager_scan.LocalFileSystem()
+        self.latency = latency
+        self.jitter = jitter
+        self.timeoutRate = timeoutRate
+        self.hungPaths = list(hungPaths)
+        self.hangSeconds = hangSeconds
+        self.calls = {'listDir': 0, 'stat': 0, 'exists': 0, 'isDir': 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._released = threading.Event()
+
+    def release(self):
+        '''
+        Unblock every hung call, which then fails with ETIMEDOUT.
+        '''
+        self._released.set()
+
+    def _delay(self, call, path):
+        with self._lock:
+            self.calls[call] += 1
+            extra = self._random.uniform(0, self.jitter) if self.jitter else 0.0
+            timedOut = self.timeoutRate and self._random.random() < self.timeoutRate
+
+        for prefix in self.hungPaths:
+            if path == prefix or path.startswith(prefix.rstrip('/\\') + os.sep):
+                self._released.wait(self.hangSeconds)
+                raise OSError(errno.ETIMEDOUT, 'Mount not responding', path)
+
+        if self.latency or extra:
+            time.sleep(self.latency + extra)
+        if timedOut:
+            raise OSError(errno.ETIMEDOUT, 'Connection timed out', path)
+
+    def listDir(self, path):
+        self._delay('listDir', path)
+        entries = []
+        for entry in self.base.listDir(path):
+            try:
+                isDir = entry.is_dir()
+                isLink = entry.is_symlink()
+            except OSError:
+                isDir, isLink = False, False
+            entries.append(ShimEntry(self, entry.path, entry.name, isDir, isLink, entry))
+        return entries
+
+    def stat(self, path, entry=None):
+        self._delay('stat', path)
+        if entry is not None:
+            return entry.stat()
+        if hasattr(self.base, 'stat'):
+            return self.base.stat(path)
+        return os.stat(path)
+
+    def exists(self, path):
+        self._delay('exists', path)
+        return self.base.exists(path)
+
+    def isDir(self, path):
+        self._delay('isDir', path)
+        return self.base.isDir(path)
+
+
+def fsshim_buildTree(root, dirCount, filesPerDir, exts=('.lxo', '.exr', '.obj'), depth=3, seed=0):
+    '''
+    Build a synthetic project tree for SyntheticFileSystem.
+    Directories are nested up to the given depth; files cycle through the extensions.
+    Arg 1: the project root <string>
+    Arg 2: the number of directories below the root <int>
+    Arg 3: the number of files in each directory <int>
+    Arg 4: the file extensions to use <tuple>
+    Arg 5: the maximum nesting depth <int>
+    Arg 6: random seed <int>
+    '''
+    rand = random.Random(seed)
+    now = time.time()
+    tree = {root: []}
+    parents = [root]
+    for idx in range(dirCount):
+        parent = rand.choice([p for p in parents if p.count(os.sep) - root.count(os.sep) < depth] or [root])
+        name = 'dir%04d' % idx
+        path = os.path.join(parent, name)
+        tree[parent].append((name, True, 0, now))
+        tree[path] = []
+        parents.append(path)
+    for path in parents:
+        for idx in range(filesPerDir):
+            ext = exts[idx % len(exts)]
+            name = 'file_v%03d.%04d%s' % (idx // 10, idx, ext)
+            tree[path].append((name, False, rand.randint(1, 1 << 24), now - rand.randint(0, 1 << 22)))
+    return tree
+
+
+def fsshim_projlistTree(projlistPath, dirCount=20, filesPerDir=50):
+    '''
+    Build a synthetic tree for every project named in a projects.projlist file,
+    so project list and health check code can be exercised against its real entries.
+    Arg 1: the project list file <string>
+    Arg 2: the number of directories per project <int>
+    Arg 3: the number of files per directory <int>
+    '''
+    tree = {}
+    with open(projlistPath) as f:
+        for seed, line in enumerate(line.strip() for line in f):
+            if line:
+                tree.update(fsshim_buildTree(line, dirCount, filesPerDir, seed=seed))
+    return tree
+
+
+@contextlib.contextmanager
+def fsshim_installed(fs):
+    '''
+    Route every scan and health check through a shim for the duration of a with-block.
+    Arg 1: the file system to install <object>
+    '''
+    previous = projectmanager_scan.FS
+    projectmanager_scan.FS = fs
+    try:
+        yield fs
+    finally:
+        projectmanager_scan.FS = previous
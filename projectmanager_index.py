@@ -0,0 +1,500 @@
+#------------------------------------------------------------------------------
+# PROJECT MANAGER SHARED INDEX, Tim Crowson
+#------------------------------------------------------------------------------
+# A binary listing of a project's files, stored in the project root as
+# .pmindex so every workstation can reuse it instead of walking the share.
+#
+# The file is read through mmap; its sections are the ScanResult tables,
+# arrays, sequences and version groups as raw little-endian bytes, so an
+# unchanged project is loaded a section at a time, without per-file work.
+# It is trusted per top-level folder: a folder whose mtime still matches is
+# taken from the index, any other one is walked again and the index is
+# rewritten (to a temporary file, then renamed).
+
+
+import os
+import re
+import sys
+import time
+import mmap
+import bisect
+import socket
+import struct
+import threading
+from array import array
+
+import projectmanager_scan
+
+
+# SHARED INDEX
+INDEX_NAME = '.pmindex'
+INDEX_MAGIC = b'PMIX'
+INDEX_VERSION = 2
+INDEX_MAXAGE = 3600         # seconds after which an index is rebuilt in full, catching changes deep in folders
+
+_HEADER = struct.Struct('<4sHHd')
+_SECTION = struct.Struct('<QQ')
+_SECTIONS = ('extensions', 'stampNames', 'stampMtimes', 'versionPatterns', 'dirs', 'exts',
+             'nameData', 'nameEnds', 'dirIds', 'extIds', 'sizes', 'mtimes', 'seqIds', 'verIds',
+             'folderNames', 'folderEnds',
+             'seqDirIds', 'seqHeads', 'seqTails', 'seqPaddings', 'seqEnds', 'seqFrames', 'seqRows',
+             'seqSizes', 'seqMtimes',
+             'verDirIds', 'verEnds', 'verVersions', 'verRows')
+_ARRAYS = {'stampMtimes': 'd', 'nameEnds': 'I', 'dirIds': 'i', 'extIds': 'H', 'sizes': 'd', 'mtimes': 'd',
+           'seqIds': 'i', 'verIds': 'i', 'folderEnds': 'I',
+           'seqDirIds': 'i', 'seqPaddings': 'i', 'seqEnds': 'I', 'seqFrames': 'i', 'seqRows': 'i',
+           'seqSizes': 'd', 'seqMtimes': 'd',
+           'verDirIds': 'i', 'verEnds': 'I', 'verVersions': 'i', 'verRows': 'i'}
+_SEP = re.compile(r'[\\/]')
+
+
+def _toBytes(arr):
+    if sys.byteorder != 'little':
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes() if hasattr(arr, 'tobytes') else arr.tostring()
+
+
+def _fromBytes(typecode, data):
+    arr = array(typecode)
+    if hasattr(arr, 'frombytes'):
+        arr.frombytes(data)
+    else:
+        arr.fromstring(data)
+    if sys.byteorder != 'little':
+        arr.byteswap()
+    return arr
+
+
+# names end with a null byte, so lists of one empty name, e.g. the project root in 'dirs', survive
+def _joinNames(names):
+    return b''.join(projectmanager_scan._packName(name) + b'\0' for name in names)
+
+
+def _splitNames(data, root):
+    return [projectmanager_scan._unpackName(name, root) for name in bytes(data).split(b'\0')[:-1]]
+
+
+def index_topFolder(relativeDir):
+    '''
+    Return the top-level folder a relative directory is in, or '' for the project root.
+    Arg 1: the directory relative to the project, e.g. '/Scenes/shot010' <string>
+    '''
+    return _SEP.split(relativeDir.lstrip('/\\'), 1)[0]
+
+
+class IndexData(object):
+    '''
+    The contents of a .pmindex file: the extensions it covers, the mtimes of
+    the top-level folders when it was written, when the project was last walked
+    in full ('created'), and the listed files with their sequences and versions.
+    The per-file arrays are read a section at a time, never row by row. Names
+    come back as the same type as the path the index was read from.
+    '''
+    def __init__(self, created, sections, root=''):
+        self.created = created
+        self.root = root
+        self.sections = sections
+        self.extensions = frozenset(_splitNames(sections['extensions'], root))
+        self.stamps = dict(zip(_splitNames(sections['stampNames'], root), sections['stampMtimes']))
+        self.versionPatterns = _splitNames(sections['versionPatterns'], root)
+        self.dirs = _splitNames(sections['dirs'], root)
+        if os.sep != '/':
+            self.dirs = [d.replace('/', os.sep) for d in self.dirs]
+        self.exts = _splitNames(sections['exts'], root)
+        self.nameData = sections['nameData']
+        for key in ('nameEnds', 'dirIds', 'extIds', 'sizes', 'mtimes', 'seqIds', 'verIds'):
+            setattr(self, key, sections[key])
+        self.folderNames = _splitNames(sections['folderNames'], root)
+        self.folderEnds = sections['folderEnds']
+
+    def __len__(self):
+        return len(self.nameEnds)
+
+    def folderRuns(self):
+        '''
+        Return the rows of each top-level folder as {folder: [(startRow, endRow), ...]}.
+        The rows of a folder are contiguous, as walks finish one folder before the next.
+        '''
+        runs = {}
+        start = 0
+        for name, end in zip(self.folderNames, self.folderEnds):
+            runs.setdefault(name, []).append((start, end))
+            start = end
+        return runs
+
+    def sequences(self):
+        '''
+        Return the Sequences of the listing, in order.
+        '''
+        s = self.sections
+        heads = _splitNames(s['seqHeads'], self.root)
+        tails = _splitNames(s['seqTails'], self.root)
+        sequences = []
+        start = 0
+        for idx, end in enumerate(s['seqEnds']):
+            seq = projectmanager_scan.Sequence(s['seqDirIds'][idx], heads[idx], tails[idx], s['seqPaddings'][idx])
+            seq.frames = s['seqFrames'][start:end]
+            seq.rows = s['seqRows'][start:end]
+            seq.size = s['seqSizes'][idx]
+            seq.mtime = s['seqMtimes'][idx]
+            sequences.append(seq)
+            start = end
+        return sequences
+
+    def versionGroups(self):
+        '''
+        Return the VersionGroups of the listing, in order.
+        '''
+        s = self.sections
+        groups = []
+        start = 0
+        for idx, end in enumerate(s['verEnds']):
+            group = projectmanager_scan.VersionGroup(s['verDirIds'][idx])
+            group.versions = s['verVersions'][start:end]
+            group.rows = s['verRows'][start:end]
+            groups.append(group)
+            start = end
+        return groups
+
+
+def index_parse(data, root=''):
+    '''
+    Return the IndexData of an index held in a buffer, or None if it is truncated
+    or of another version.
+    Arg 1: the index contents <mmap|bytes>
+    Arg 2: the path names are relative to, whose type they come back as <string>
+    '''
+    try:
+        if len(data) < _HEADER.size:
+            return None
+        magic, version, count, created = _HEADER.unpack_from(data, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION or count != len(_SECTIONS):
+            return None
+        # on Python 3 sections are read through a memoryview, without an intermediate copy
+        view = data if str is bytes else memoryview(data)
+        sections = {}
+        for idx, key in enumerate(_SECTIONS):
+            offset, length = _SECTION.unpack_from(data, _HEADER.size + idx * _SECTION.size)
+            if offset + length > len(data):
+                return None
+            raw = view[offset:offset + length]
+            sections[key] = _fromBytes(_ARRAYS[key], raw) if key in _ARRAYS else bytes(raw)
+            del raw
+        del view
+        rows = len(sections['nameEnds'])
+        if not rows == len(sections['dirIds']) == len(sections['sizes']) == len(sections['seqIds']):
+            return None
+        if sections['folderEnds'] and sections['folderEnds'][-1] != rows:
+            return None
+        return IndexData(created, sections, root)
+    except (struct.error, ValueError):
+        return None
+
+
+def index_read(indexPath):
+    '''
+    Map a .pmindex file and return its IndexData, or None if it is missing,
+    truncated or of another version.
+    Arg 1: the index file <string>
+    '''
+    try:
+        f = open(indexPath, 'rb')
+    except (IOError, OSError):
+        return None
+    try:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, EnvironmentError):
+        f.close()
+        return None
+    try:
+        return index_parse(data, indexPath)
+    finally:
+        data.close()
+        f.close()
+
+
+def _folderRuns(result):
+    # the top-level folder of each run of rows, and the row each run ends at
+    folders = [index_topFolder(d) for d in result.dirs]
+    names = []
+    ends = array('I')
+    lastDir = None
+    for row, dirId in enumerate(result.dirIds):
+        if dirId == lastDir:
+            continue
+        lastDir = dirId
+        if not names or names[-1] != folders[dirId]:
+            if names:
+                ends.append(row)
+            names.append(folders[dirId])
+    if names:
+        ends.append(len(result))
+    return names, ends
+
+
+def index_dumps(result, stamps, created=None):
+    '''
+    Return a scan result, with its sequences and versions, in the index layout.
+    Directories are stored with '/' separators, whatever system wrote them.
+    Arg 1: the scan result <ScanResult>
+    Arg 2: {top-level folder: mtime} at the time of the scan <dict>
+    Arg 3: when the project was last walked in full, defaults to now <float>
+    '''
+    names = sorted(stamps)
+    folderNames, folderEnds = _folderRuns(result)
+    sequences = result.sequences
+    seqEnds = array('I')
+    seqFrames = array('i')
+    seqRows = array('i')
+    for seq in sequences:
+        seqFrames.extend(seq.frames)
+        seqRows.extend(seq.rows)
+        seqEnds.append(len(seqFrames))
+    groups = result.versionGroups
+    verEnds = array('I')
+    verVersions = array('i')
+    verRows = array('i')
+    for group in groups:
+        verVersions.extend(group.versions)
+        verRows.extend(group.rows)
+        verEnds.append(len(verRows))
+    sections = [
+        _joinNames(sorted(result.extensions)),
+        _joinNames(names),
+        _toBytes(array('d', (-1.0 if stamps[n] is None else stamps[n] for n in names))),
+        _joinNames(result.versionPatterns or []),
+        _joinNames(d.replace(os.sep, '/') for d in result.dirs),
+        _joinNames(result.exts),
+        bytes(result.nameData),
+        _toBytes(result.nameEnds),
+        _toBytes(result.dirIds),
+        _toBytes(result.extIds),
+        _toBytes(result.sizes),
+        _toBytes(result.mtimes),
+        _toBytes(result.seqIds),
+        _toBytes(result.verIds),
+        _joinNames(folderNames),
+        _toBytes(folderEnds),
+        _toBytes(array('i', (seq.dirId for seq in sequences))),
+        _joinNames(seq.head for seq in sequences),
+        _joinNames(seq.tail for seq in sequences),
+        _toBytes(array('i', (seq.padding for seq in sequences))),
+        _toBytes(seqEnds),
+        _toBytes(seqFrames),
+        _toBytes(seqRows),
+        _toBytes(array('d', (seq.size for seq in sequences))),
+        _toBytes(array('d', (seq.mtime for seq in sequences))),
+        _toBytes(array('i', (group.dirId for group in groups))),
+        _toBytes(verEnds),
+        _toBytes(verVersions),
+        _toBytes(verRows),
+        ]
+    offset = _HEADER.size + len(sections) * _SECTION.size
+    table = []
+    for section in sections:
+        table.append(_SECTION.pack(offset, len(section)))
+        offset += len(section)
+    header = _HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(sections), time.time() if created is None else created)
+    return header + b''.join(table) + b''.join(sections)
+
+
+def index_write(indexPath, result, stamps, created=None):
+    '''
+    Write a scan result to a .pmindex file, replacing any previous one atomically.
+    The temporary file is named after the host, process and thread writing it, as
+    workstations sharing the project may write at the same time.
+    Arg 1: the index file <string>
+    Arg 2: the scan result <ScanResult>
+    Arg 3: {top-level folder: mtime} at the time of the scan <dict>
+    Arg 4: when the project was last walked in full, defaults to now <float>
+    '''
+    partial = '%s.%s.%d.%d.tmp' % (indexPath, socket.gethostname(), os.getpid(), threading.current_thread().ident)
+    try:
+        with open(partial, 'wb') as f:
+            f.write(index_dumps(result, stamps, created))
+        if hasattr(os, 'replace'):
+            os.replace(partial, indexPath)
+        else:
+            if os.path.exists(indexPath):
+                os.remove(indexPath)
+            os.rename(partial, indexPath)
+    finally:
+        if os.path.exists(partial):
+            try:
+                os.remove(partial)
+            except OSError:
+                pass
+
+
+def _seedTables(result, index):
+    # share the index's directory and extension ids, so its id arrays are copied as they are
+    for relativeDir in index.dirs:
+        result.dirId(relativeDir)
+    for ext in index.exts:
+        result.extId(ext)
+
+
+def index_toResult(index, projDir, versionPatterns=None):
+    '''
+    Return the ScanResult an index holds, with its sequences and versions.
+    The result takes over the index's arrays; versions are only grouped again
+    if they were grouped with other patterns.
+    Arg 1: the index contents <IndexData>
+    Arg 2: the project path <string>
+    Arg 3: optional version patterns <list>
+    '''
+    result = projectmanager_scan.ScanResult(projDir, index.extensions)
+    _seedTables(result, index)
+    result.nameData = bytearray(index.nameData)
+    for key in ('nameEnds', 'dirIds', 'extIds', 'sizes', 'mtimes', 'seqIds', 'verIds'):
+        setattr(result, key, getattr(index, key))
+    result.sequences = index.sequences()
+    result.versionGroups = index.versionGroups()
+    result.versionPatterns = index.versionPatterns
+    versionPatterns = list(projectmanager_scan.VERSION_PATTERNS if versionPatterns is None else versionPatterns)
+    if result.versionPatterns != versionPatterns:
+        result.regroupVersions(versionPatterns)
+    return result
+
+
+def _shifted(arr, delta, keepNegative=False):
+    # the array with delta added to each value, or the array itself for no shift
+    if not delta:
+        return arr
+    if keepNegative:
+        return array(arr.typecode, [v + delta if v >= 0 else v for v in arr])
+    return array(arr.typecode, [v + delta for v in arr])
+
+
+def _appendRows(result, index, start, end, sequences, groups):
+    # copy the rows [start, end) of an index, with their sequences and versions, to the end of
+    # a result seeded with _seedTables; values are only rewritten when the rows moved
+    if start == end:
+        return
+    rowDelta = len(result) - start
+    nameStart = index.nameEnds[start - 1] if start else 0
+    result.nameEnds.extend(_shifted(index.nameEnds[start:end], len(result.nameData) - nameStart))
+    result.nameData.extend(index.nameData[nameStart:index.nameEnds[end - 1]])
+    for key in ('dirIds', 'extIds', 'sizes', 'mtimes'):
+        getattr(result, key).extend(getattr(index, key)[start:end])
+
+    # sequences and version groups are in row order, so those of a run of rows are a run of ids
+    for key, (found, firstRows), wanted in (('seqIds', sequences, result.sequences),
+                                           ('verIds', groups, result.versionGroups)):
+        ids = getattr(index, key)[start:end]
+        first = bisect.bisect_left(firstRows, start)
+        last = bisect.bisect_left(firstRows, end)
+        if first < last:
+            ids = _shifted(ids, len(wanted) - first, keepNegative=True)
+            for entry in found[first:last]:
+                entry.rows = _shifted(entry.rows, rowDelta)
+                wanted.append(entry)
+        getattr(result, key).extend(ids)
+
+
+def _sameRootFiles(index, runs, rootFiles):
+    # True if the files listed in the project root are those the index holds
+    start, end = runs[0] if runs else (0, 0)
+    if end - start != len(rootFiles):
+        return False
+    listed = []
+    for row in range(start, end):
+        rowStart = index.nameEnds[row - 1] if row else 0
+        listed.append((projectmanager_scan._unpackName(index.nameData[rowStart:index.nameEnds[row]], index.root),
+                       index.sizes[row], index.mtimes[row]))
+    return sorted(listed) == sorted((name, float(size), mtime) for name, ext, size, mtime in rootFiles)
+
+
+def index_scan(projDir, extensions, abort=None, budget=None, versionPatterns=None, fs=None):
+    '''
+    Scan a project through its shared index, walking only the top-level folders
+    that changed since the index was written, and update the index.
+    Takes the same arguments as projectmanager_scan.scan_project.
+    Arg 1: the project path <string>
+    Arg 2: lowercase extensions to keep <set>
+    Arg 3: optional callable, returning True when the walk should stop <callable>
+    Arg 4: optional I/O budget <IOBudget>
+    Arg 5: optional version patterns <list>
+    Arg 6: optional file system, defaults to projectmanager_scan.FS <LocalFileSystem>
+
+    Returns a ScanResult, which may cover more extensions than were asked for.
+    '''
+    fs = fs or projectmanager_scan.FS
+    indexPath = os.path.join(projDir, INDEX_NAME)
+    try:
+        entries = fs.listDir(projDir)
+    except OSError:
+        return projectmanager_scan.scan_project(projDir, extensions, abort, budget, versionPatterns, fs)
+    if budget is not None:
+        budget.spend(len(entries))
+
+    # a stale index or one missing some of the extensions is rebuilt in full
+    index = index_read(indexPath)
+    if index is not None and (time.time() - index.created > INDEX_MAXAGE or not set(extensions) <= index.extensions):
+        index = None
+    extensions = set(extensions) | (index.extensions if index is not None else set())
+
+    # the top-level folders and their mtimes, and the files in the root
+    stamps = {}
+    rootFiles = []
+    for entry in entries:
+        try:
+            isDir = entry.is_dir()
+        except OSError:
+            isDir = False
+        if isDir:
+            if not entry.is_symlink() and entry.name not in projectmanager_scan.SCAN_SKIPFOLDERS:
+                try:
+                    stamps[entry.name] = entry.stat().st_mtime
+                except OSError:
+                    stamps[entry.name] = None
+            continue
+        ext = os.path.splitext(entry.name)[1].lower()
+        if ext in extensions:
+            try:
+                st = entry.stat()
+                rootFiles.append((entry.name, ext, st.st_size, st.st_mtime))
+            except OSError:
+                rootFiles.append((entry.name, ext, 0, 0.0))
+
+    # an index matching every folder and the files in the root is used as it is
+    runs = index.folderRuns() if index is not None else {}
+    unchanged = set(name for name, mtime in stamps.items()
+                    if index is not None and mtime is not None and index.stamps.get(name) == mtime)
+    sameRoot = index is not None and _sameRootFiles(index, runs.get('', ()), rootFiles)
+    if sameRoot and unchanged == set(stamps) == set(index.stamps):
+        return index_toResult(index, projDir, versionPatterns)
+
+    result = projectmanager_scan.ScanResult(projDir, extensions)
+    result.versionPatterns = list(projectmanager_scan.VERSION_PATTERNS if versionPatterns is None else versionPatterns)
+    compiledPatterns = projectmanager_scan.scan_compileVersionPatterns(result.versionPatterns)
+    if index is not None:
+        _seedTables(result, index)
+        sequences = index.sequences()
+        sequences = (sequences, [seq.rows[0] for seq in sequences])
+        groups = index.versionGroups()
+        groups = (groups, [group.rows[0] for group in groups])
+    projectmanager_scan.scan_addFiles(result, '', rootFiles, compiledPatterns)
+
+    # copy unchanged folders from the index, walk the others
+    changed = not sameRoot or set(index.stamps) != set(stamps)
+    for name in sorted(stamps):
+        if name in unchanged:
+            for start, end in runs.get(name, ()):
+                _appendRows(result, index, start, end, sequences, groups)
+            continue
+        changed = True
+        for root, files in projectmanager_scan.scan_walk(os.path.join(projDir, name), extensions, abort, budget, fs):
+            projectmanager_scan.scan_addFiles(result, root[len(projDir):], files, compiledPatterns)
+    if index is not None and index.versionPatterns != result.versionPatterns:
+        result.regroupVersions(result.versionPatterns)
+
+    # share what changed; read-only projects simply keep walking. Folders copied from the
+    # index are only as fresh as its last full walk, which is kept so INDEX_MAXAGE still applies
+    if changed:
+        try:
+            index_write(indexPath, result, stamps, index.created if index is not None else None)
+        except (IOError, OSError):
+            pass
+    return result
@@ -0,0 +1,198 @@
+#------------------------------------------------------------------------------
+# PROJECT MANAGER LOAD TIMES, Tim Crowson
+#------------------------------------------------------------------------------
+# A local record of how long scenes took to open, import or reference, kept
+# as a CSV file which is appended to after every load and can be exported
+# as is. Each scene's median over its recent loads is kept in memory.
+
+
+import io
+import os
+import sys
+import csv
+import time
+import collections
+
+
+# LOAD TIMES
+LOADTIMES_PATH = os.path.join(os.path.dirname(__file__), 'data', 'loadtimes.csv')
+LOADTIMES_FIELDS = ('time', 'path', 'operation', 'seconds', 'size', 'outcome', 'prewarmed')
+LOADTIMES_MAXRECORDS = 20000    # records kept on disk; older ones are dropped when the file is compacted
+LOADTIMES_HISTORY = 20          # recent successful loads per scene used for its median
+LOADTIMES_HEAVYSECS = 60        # default median load time above which a scene is flagged as heavy
+
+
+def _open(path, mode):
+    # the csv module wants bytes on Python 2 and text without newline translation on Python 3
+    if sys.version_info[0] < 3:
+        return open(path, mode + 'b')
+    return io.open(path, mode, newline='', encoding='utf-8')
+
+
+def _encode(value):
+    if sys.version_info[0] < 3 and isinstance(value, type(u'')):
+        return value.encode('utf-8')
+    return value
+
+
+def _decode(value):
+    if sys.version_info[0] < 3:
+        return value.decode('utf-8')
+    return value
+
+
+def loadtimes_median(values):
+    '''
+    Return the median of some numbers, or None if there are none.
+    Arg 1: the numbers <list>
+    '''
+    values = sorted(values)
+    if not values:
+        return None
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
+
+def loadtimes_format(seconds):
+    '''
+    Return a load time as a short string, e.g. '12.4 s' or '3m 05s'.
+    Arg 1: the duration in seconds <float>
+    '''
+    if seconds < 60:
+        return '%.1f s' % seconds
+    return '%dm %02ds' % (seconds // 60, seconds % 60)
+
+
+class LoadTimes(object):
+    '''
+    The recorded loads of every scene, read from and appended to a CSV file.
+    Arg 1: the CSV file <string>
+    '''
+    def __init__(self, path=LOADTIMES_PATH):
+        self.path = path
+        self._durations = {}
+        self._failures = collections.defaultdict(int)
+        self._names = set()
+        self._records = 0
+        self._load()
+
+    def _key(self, scenePath):
+        return os.path.normcase(os.path.abspath(scenePath))
+
+    def _add(self, scenePath, seconds, outcome):
+        key = self._key(scenePath)
+        if outcome == 'ok':
+            durations = self._durations.get(key)
+            if durations is None:
+                durations = self._durations[key] = collections.deque(maxlen=LOADTIMES_HISTORY)
+            durations.append(seconds)
+            self._names.add(os.path.basename(scenePath))
+        else:
+            self._failures[key] += 1
+        self._records += 1
+
+    def _load(self):
+        try:
+            with _open(self.path, 'r') as f:
+                for row in csv.DictReader(f):
+                    try:
+                        self._add(_decode(row['path']), float(row['seconds']), row['outcome'])
+                    except (KeyError, TypeError, ValueError):
+                        continue
+        except (IOError, OSError, csv.Error):
+            return
+        if self._records > LOADTIMES_MAXRECORDS:
+            try:
+                self._compact()
+            except (IOError, OSError, csv.Error):
+                pass
+
+    def _compact(self):
+        # keep the most recent records, rewriting the file through a temporary copy
+        with _open(self.path, 'r') as f:
+            rows = list(csv.reader(f))[1:]
+        rows = rows[-LOADTIMES_MAXRECORDS // 2:]
+        with _open(self.path + '.tmp', 'w') as f:
+            writer = csv.writer(f)
+            writer.writerow(LOADTIMES_FIELDS)
+            writer.writerows(rows)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        os.rename(self.path + '.tmp', self.path)
+        self._records = len(rows)
+
+    def record(self, scenePath, operation, seconds, size, outcome, prewarmed=None):
+        '''
+        Record a load and append it to the file.
+        Arg 1: the scene path <string>
+        Arg 2: 'open', 'import' or 'reference' <string>
+        Arg 3: the duration in seconds <float>
+        Arg 4: the file size in bytes <int>
+        Arg 5: 'ok', or 'failed' if the load raised an error <string>
+        Arg 6: optional prewarm status, 'warm' or 'partial' <string>
+        '''
+        self._add(scenePath, seconds, outcome)
+        folder = os.path.dirname(self.path)
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        isNew = not os.path.exists(self.path)
+        with _open(self.path, 'a') as f:
+            writer = csv.writer(f)
+            if isNew:
+                writer.writerow(LOADTIMES_FIELDS)
+            writer.writerow([_encode(value) for value in (
+                time.strftime('%Y-%m-%d %H:%M:%S'), scenePath, operation, '%.3f' % seconds,
+                int(size), outcome, prewarmed or 'cold')])
+
+    def median(self, scenePath):
+        '''
+        Return (median seconds, number of loads) for a scene's recent successful loads,
+        or None if it was never loaded.
+        Arg 1: the scene path <string>
+        '''
+        durations = self._durations.get(self._key(scenePath))
+        if not durations:
+            return None
+        return loadtimes_median(durations), len(durations)
+
+    def failures(self, scenePath):
+        '''
+        Return how many loads of a scene failed.
+        Arg 1: the scene path <string>
+        '''
+        return self._failures.get(self._key(scenePath), 0)
+
+    def names(self):
+        '''
+        Return the file names of every scene with recorded loads, to skip building
+        paths for scenes that were never loaded.
+        '''
+        return self._names
+
+    def export(self, targetPath):
+        '''
+        Copy every recorded load to a CSV file; returns the number of records.
+        Arg 1: the file to write <string>
+        '''
+        with _open(self.path, 'r') as f:
+            rows = list(csv.reader(f))
+        with _open(targetPath, 'w') as f:
+            csv.writer(f).writerows(rows)
+        return max(0, len(rows) - 1)
+
+
+# process-wide load times shared by every Project Manager panel
+LOADTIMES = None
+
+
+def loadtimes_getShared(path=LOADTIMES_PATH):
+    '''
+    Return the process-wide LoadTimes, reading the file on first use.
+    Arg 1: the CSV file <string>
+    '''
+    global LOADTIMES
+    if LOADTIMES is None or LOADTIMES.path != path:
+        LOADTIMES = LoadTimes(path)
+    return LOADTIMES
@@ -0,0 +1,321 @@
+#------------------------------------------------------------------------------
+# PROJECT MANAGER LOCAL CACHE, Tim Crowson
+#------------------------------------------------------------------------------
+# Read-through cache of files on a share, copied to a local disk in the
+# background and served from there while they are unchanged on the share.
+#
+# Scenes may be saved referencing the copies, so the cache lives in a
+# persistent folder of the user's own rather than the shared temp folder, and
+# is only used while no one else can write to it.
+
+
+import os
+import json
+import stat
+import time
+import errno
+import hashlib
+import tempfile
+import threading
+import collections
+
+
+# LOCAL CACHE
+LOCALCACHE_PATH = os.path.join(os.path.expanduser('~'), '.projectmanager', 'localcache')
+LOCALCACHE_TEMPPATH = os.path.join(tempfile.gettempdir(), 'projectmanager_cache')   # the default of earlier versions
+LOCALCACHE_QUOTA = 20 * 1024 * 1024 * 1024     # bytes of copies kept before the least recently used go
+LOCALCACHE_CHUNK = 4 * 1024 * 1024
+LOCALCACHE_INDEX = 'index.json'
+LOCALCACHE_SAVEDELAY = 30                      # seconds between saves of last-used times alone
+
+
+class LocalCacheEntry(object):
+    '''
+    A cached copy: where it lives, the state of the original it was copied
+    from, the md5 of its contents and when it was last used.
+    '''
+    __slots__ = ('localName', 'size', 'mtime', 'md5', 'used')
+
+    def __init__(self, localName, size, mtime, md5, used=None):
+        self.localName = localName
+        self.size = size
+        self.mtime = mtime
+        self.md5 = md5
+        self.used = time.time() if used is None else used
+
+    def state(self):
+        '''
+        Return the entry as a list for the JSON index; LocalCacheEntry(*state) restores it.
+        '''
+        return [self.localName, self.size, self.mtime, self.md5, self.used]
+
+
+def localcache_privateFolder(folder):
+    '''
+    Create a folder only its user can enter, or check an existing one belongs
+    to the user and can't be written to by anyone else, so no one else can
+    plant files in it.
+    Arg 1: the folder <string>
+
+    Raises OSError if the folder isn't private.
+    '''
+    if not os.path.isdir(folder):
+        os.makedirs(folder, 0o700)
+    if not hasattr(os, 'getuid'):
+        # Windows: user folders are private through their ACLs
+        return
+    st = os.lstat(folder)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o022:
+        raise OSError(errno.EPERM, 'the folder must belong to you and only be writable by you', folder)
+
+
+def localcache_copy(source, target, cancelled=None):
+    '''
+    Copy a file in chunks, returning the md5 of what was read.
+    The copy is written next to the target and renamed into place once the
+    md5 of the written file matches, so a partial copy is never served.
+    Arg 1: the file to copy <string>
+    Arg 2: the destination path <string>
+    Arg 3: optional callable, returning True when the copy should stop <callable>
+
+    Returns None if cancelled or if the copy does not match.
+    '''
+    partial = target + '.part'
+    digest = hashlib.md5()
+    try:
+        with open(source, 'rb') as src:
+            with open(partial, 'wb') as dst:
+                while True:
+                    if cancelled is not None and cancelled():
+                        return None
+                    data = src.read(LOCALCACHE_CHUNK)
+                    if not data:
+                        break
+                    digest.update(data)
+                    dst.write(data)
+
+        check = hashlib.md5()
+        with open(partial, 'rb') as f:
+            for data in iter(lambda: f.read(LOCALCACHE_CHUNK), b''):
+                check.update(data)
+        if check.hexdigest() != digest.hexdigest():
+            return None
+
+        if os.path.exists(target):
+            os.remove(target)
+        os.rename(partial, target)
+        return digest.hexdigest()
+    finally:
+        # cancelled, mismatched or failed part way: never leave the partial copy behind
+        if os.path.exists(partial):
+            try:
+                os.remove(partial)
+            except OSError:
+                pass
+
+
+class LocalCache(object):
+    '''
+    Copies files from a share into a local folder in a background thread, and
+    hands out the local copy while the original's size and mtime still match.
+    Copies are evicted least recently used first to stay under a disk quota.
+    Arg 1: the local cache folder <string>
+    Arg 2: the disk quota in bytes <int>
+    '''
+    def __init__(self, path=LOCALCACHE_PATH, quota=LOCALCACHE_QUOTA):
+        self.path = path
+        self.quota = quota
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._queue = collections.deque()
+        self._copying = None
+        self._stop = False
+        self._saved = 0.0
+        self._thread = None
+        self._entries = self._load()
+
+    def _load(self):
+        try:
+            if not os.path.isdir(self.path):
+                return {}
+            localcache_privateFolder(self.path)
+            with open(os.path.join(self.path, LOCALCACHE_INDEX), 'r') as f:
+                entries = dict((remote, LocalCacheEntry(*state)) for remote, state in json.load(f).items())
+        except (IOError, OSError, ValueError, TypeError, AttributeError):
+            return {}
+        # copies are only ever plain file names inside the cache folder
+        return dict((remote, entry) for remote, entry in entries.items()
+                    if os.path.basename(entry.localName) == entry.localName
+                    and os.path.exists(os.path.join(self.path, entry.localName)))
+
+    def _save(self):
+        # called with the lock held
+        localcache_privateFolder(self.path)
+        indexPath = os.path.join(self.path, LOCALCACHE_INDEX)
+        with open(indexPath + '.tmp', 'w') as f:
+            json.dump(dict((remote, entry.state()) for remote, entry in self._entries.items()), f)
+        if os.path.exists(indexPath):
+            os.remove(indexPath)
+        os.rename(indexPath + '.tmp', indexPath)
+        self._saved = time.time()
+
+    def localPath(self, remotePath, size, mtime):
+        '''
+        Return the local copy of a file if it matches the given size and mtime, else None.
+        Using a copy makes it the most recently used.
+        Arg 1: the path on the share <string>
+        Arg 2: the current size of the original <int>
+        Arg 3: the current mtime of the original <float>
+        '''
+        with self._lock:
+            entry = self._entries.get(remotePath)
+            if entry is None or entry.size != size or entry.mtime != mtime:
+                return None
+            entry.used = time.time()
+            if entry.used - self._saved > LOCALCACHE_SAVEDELAY:
+                try:
+                    self._save()
+                except (IOError, OSError):
+                    pass
+            return os.path.join(self.path, entry.localName)
+
+    def status(self, remotePath, size, mtime):
+        '''
+        Return where a file would be read from: 'local' for a fresh copy, 'copying'
+        while a copy is queued or running, 'stale' if the original changed since
+        it was copied, otherwise 'remote'.
+        Arg 1: the path on the share <string>
+        Arg 2: the size of the original <int>
+        Arg 3: the mtime of the original <float>
+        '''
+        with self._lock:
+            if remotePath == self._copying or remotePath in self._queue:
+                return 'copying'
+            entry = self._entries.get(remotePath)
+        if entry is None:
+            return 'remote'
+        if entry.size != size or entry.mtime != mtime:
+            return 'stale'
+        return 'local'
+
+    def enqueue(self, remotePath):
+        '''
+        Queue a file to be copied into the cache, unless it already is.
+        Arg 1: the path on the share <string>
+        '''
+        with self._lock:
+            if remotePath == self._copying or remotePath in self._queue:
+                return
+            self._queue.append(remotePath)
+            self._stop = False
+        self._ensureThread()
+        self._wake.set()
+
+    def pending(self):
+        '''
+        Return the number of copies queued or running.
+        '''
+        with self._lock:
+            return len(self._queue) + (self._copying is not None)
+
+    def clear(self):
+        '''
+        Stop copying and delete every cached copy.
+        '''
+        with self._lock:
+            self._queue.clear()
+            self._stop = True
+            for entry in self._entries.values():
+                try:
+                    os.remove(os.path.join(self.path, entry.localName))
+                except OSError:
+                    pass
+            self._entries = {}
+            try:
+                self._save()
+            except (IOError, OSError):
+                pass
+
+    def evict(self, keep=0):
+        '''
+        Delete the least recently used copies until the cache, plus 'keep' bytes, fits the quota.
+        Arg 1: bytes about to be added <int>
+        '''
+        with self._lock:
+            total = sum(entry.size for entry in self._entries.values()) + keep
+            for remotePath in sorted(self._entries, key=lambda p: self._entries[p].used):
+                if total <= self.quota:
+                    break
+                entry = self._entries.pop(remotePath)
+                try:
+                    os.remove(os.path.join(self.path, entry.localName))
+                except OSError:
+                    pass
+                total -= entry.size
+            try:
+                self._save()
+            except (IOError, OSError):
+                pass
+
+    def _ensureThread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='pm.localcache')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _next(self):
+        with self._lock:
+            self._copying = self._queue.popleft() if self._queue else None
+            return self._copying
+
+    def _run(self):
+        while True:
+            self._wake.wait(30)
+            self._wake.clear()
+            remotePath = self._next()
+            while remotePath is not None:
+                try:
+                    self._copy(remotePath)
+                except (IOError, OSError):
+                    pass
+                remotePath = self._next()
+
+    def _copy(self, remotePath):
+        st = os.stat(remotePath)
+        if st.st_size > self.quota:
+            return
+        if self.status(remotePath, st.st_size, st.st_mtime) == 'local':
+            return
+        self.evict(st.st_size)
+
+        key = remotePath.encode('utf-8') if not isinstance(remotePath, bytes) else remotePath
+        localName = hashlib.md5(key).hexdigest() + os.path.splitext(remotePath)[1]
+        localcache_privateFolder(self.path)
+        md5 = localcache_copy(remotePath, os.path.join(self.path, localName), lambda: self._stop)
+
+        # only keep the copy if the original didn't change while it was being copied
+        after = os.stat(remotePath)
+        if md5 is None or (after.st_size, after.st_mtime) != (st.st_size, st.st_mtime):
+            return
+        with self._lock:
+            if not self._stop:
+                self._entries[remotePath] = LocalCacheEntry(localName, st.st_size, st.st_mtime, md5)
+                self._save()
+
+
+# process-wide local cache shared by every Project Manager panel
+LOCALCACHE = None
+
+
+def localcache_getShared(path=LOCALCACHE_PATH, quota=LOCALCACHE_QUOTA):
+    '''
+    Return the process-wide LocalCache, creating it on first use, or again if its folder changed.
+    Arg 1: the local cache folder <string>
+    Arg 2: the disk quota in bytes <int>
+    '''
+    global LOCALCACHE
+    if LOCALCACHE is None or LOCALCACHE.path != path:
+        LOCALCACHE = LocalCache(path, quota)
+    else:
+        LOCALCACHE.quota = quota
+    return LOCALCACHE
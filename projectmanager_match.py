@@ -0,0 +1,87 @@
+#------------------------------------------------------------------------------
+# PROJECT MANAGER MATCHING, Tim Crowson
+#------------------------------------------------------------------------------
+# Qt-free substring and fuzzy matching for the scene list filter.
+
+
+import re
+
+
+def match_compile(query):
+    '''
+    Return a predicate matching lowercase keys against a query.
+    A key matches if it contains the query, or failing that, contains all of
+    its characters in order (e.g. 'sh10lgt' matches 'shot010_lighting').
+    Arg 1: the filter text <string>
+    '''
+    query = query.lower()
+    fuzzy = re.compile('.*?'.join(re.escape(c) for c in query))
+
+    def predicate(key):
+        return query in key or fuzzy.search(key) is not None
+    return predicate
+
+
+def match_filter(keys, query, candidates=None, abort=None):
+    '''
+    Return the indices of the keys matching a query.
+    Arg 1: lowercase keys to match against <list>
+    Arg 2: the filter text <string>
+    Arg 3: optional indices to restrict the search to <list>
+    Arg 4: optional callable, returning True when matching should stop <callable>
+
+    Returns None if aborted.
+    '''
+    predicate = match_compile(query)
+    if candidates is None:
+        candidates = range(len(keys))
+    matches = []
+    for count, idx in enumerate(candidates):
+        if abort is not None and not count % 4096 and abort():
+            return None
+        if predicate(keys[idx]):
+            matches.append(idx)
+    return matches
+
+
+class IncrementalFilter(object):
+    '''
+    Remembers the last query and its matches so that a longer query only
+    re-filters the previous result set instead of the full list.
+    '''
+    def __init__(self, keys):
+        self.keys = keys
+        self.query = ''
+        self.matches = None
+
+    def candidates(self, query):
+        '''
+        Return the indices worth testing for a query, or None for all of them.
+        Arg 1: the filter text <string>
+        '''
+        if self.query and self.matches is not None and self.query.lower() in query.lower():
+            return self.matches
+        return None
+
+    def commit(self, query, matches):
+        '''
+        Record the matches of a completed query.
+        Arg 1: the filter text <string>
+        Arg 2: the matching indices, or None when the query is empty <list>
+        '''
+        self.query = query
+        self.matches = matches
+
+    def run(self, query, abort=None):
+        '''
+        Filter the keys synchronously and commit the result.
+        Arg 1: the filter text <string>
+        Arg 2: optional abort callable <callable>
+        '''
+        if not query:
+            self.commit('', None)
+            return None
+        matches = match_filter(self.keys, query, self.candidates(query), abort)
+        if matches is not None:
+            self.commit(query, matches)
+        return matches
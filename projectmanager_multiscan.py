@@ -0,0 +1,240 @@
+#------------------------------------------------------------------------------
+# PROJECT MANAGER MULTI-PROJECT SCAN, Tim Crowson
+#------------------------------------------------------------------------------
+# Scans several projects at once into one merged listing. A small pool of
+# threads takes turns on the projects, a few directories at a time, so every
+# project's first rows arrive together instead of one project after another.
+
+
+import os
+import threading
+import collections
+from array import array
+
+import projectmanager_scan
+
+
+# MULTI-PROJECT SCAN
+MULTISCAN_WORKERS = 4           # projects walked at the same time
+MULTISCAN_SLICEDIRS = 16        # directories walked per turn before the next project gets a go
+
+
+class MergedScanResult(projectmanager_scan.ScanResult):
+    '''
+    A ScanResult holding the files of several projects. Its directories are
+    absolute and each one remembers the project it belongs to, so relative
+    paths stay relative to their own project.
+    Arg 1: the project paths <list>
+    Arg 2: lowercase extensions scanned for <set>
+    '''
+    __slots__ = ('projDirs', 'dirProjects', '_adding')
+
+    def __init__(self, projDirs, extensions=()):
+        projectmanager_scan.ScanResult.__init__(self, '', extensions)
+        self.projDirs = list(projDirs)
+        self.dirProjects = array('i')
+        self._adding = -1
+
+    def dirId(self, directory):
+        '''
+        Return the id of an absolute directory, adding it to the table for the
+        project being added if needed.
+        Arg 1: the absolute directory <string>
+        '''
+        idx = projectmanager_scan.ScanResult.dirId(self, directory)
+        if idx == len(self.dirProjects):
+            self.dirProjects.append(self._adding)
+        return idx
+
+    def addFiles(self, projIdx, relativeDir, files, compiledPatterns):
+        '''
+        Add the matching files of one directory of a project.
+        Arg 1: the index of the project in projDirs <int>
+        Arg 2: the directory relative to the project <string>
+        Arg 3: (fileName, ext, size, mtime) tuples <list>
+        Arg 4: compiled version patterns <list>
+        '''
+        self._adding = projIdx
+        projectmanager_scan.scan_addFiles(self, self.projDirs[projIdx] + relativeDir, files, compiledPatterns)
+
+    def addResult(self, projIdx, result, compiledPatterns):
+        '''
+        Add every file of a project's own ScanResult, e.g. one taken from the cache.
+        Arg 1: the index of the project in projDirs <int>
+        Arg 2: the project's scan result <ScanResult>
+        Arg 3: compiled version patterns <list>
+        '''
+        start = 0
+        for row in range(1, len(result) + 1):
+            if row == len(result) or result.dirIds[row] != result.dirIds[start]:
+                files = [(result.name(r), result.ext(r), result.size(r), result.mtime(r)) for r in range(start, row)]
+                self.addFiles(projIdx, result.dirs[result.dirIds[start]], files, compiledPatterns)
+                start = row
+
+    def _relativeDir(self, dirId):
+        return self.dirs[dirId][len(self.projDirs[self.dirProjects[dirId]]):]
+
+    def project(self, row):
+        '''
+        Return the path of the project a row belongs to.
+        Arg 1: the row index <int>
+        '''
+        return self.projDirs[self.dirProjects[self.dirIds[row]]]
+
+    def entryProject(self, entry):
+        if isinstance(entry, (projectmanager_scan.Sequence, projectmanager_scan.VersionGroup)):
+            return self.projDirs[self.dirProjects[entry.dirId]]
+        return self.project(self.entryRow(entry))
+
+    def relativePath(self, row):
+        return self._relativeDir(self.dirIds[row]) + os.sep + self.name(row)
+
+    def fullPath(self, row):
+        return self.dirs[self.dirIds[row]] + os.sep + self.name(row)
+
+    def entryRelativePath(self, entry):
+        if isinstance(entry, projectmanager_scan.Sequence):
+            return self._relativeDir(entry.dirId) + os.sep + entry.name()
+        return self.relativePath(self.entryRow(entry))
+
+
+class MultiScan(object):
+    '''
+    Scans several projects concurrently with fair, round-robin scheduling.
+    Projects already in the scan cache are added at once; the others are walked
+    a slice of directories per turn, and put in the cache once complete. The
+    scanned directories queue up until drain() adds them to a MergedScanResult.
+    Arg 1: the project paths <list>
+    Arg 2: lowercase extensions to scan for <set>
+    Arg 3: optional version patterns <list>
+    Arg 4: the number of threads <int>
+    '''
+    def __init__(self, projDirs, extensions, versionPatterns=None, workers=MULTISCAN_WORKERS,
+                 sliceDirs=MULTISCAN_SLICEDIRS):
+        self.projDirs = list(projDirs)
+        self.extensions = set(extensions)
+        self.versionPatterns = list(projectmanager_scan.VERSION_PATTERNS if versionPatterns is None else versionPatterns)
+        self.compiledPatterns = projectmanager_scan.scan_compileVersionPatterns(self.versionPatterns)
+        self.workers = workers
+        self.sliceDirs = sliceDirs
+        self.finished = set()
+        self._lock = threading.Lock()
+        self._turns = collections.deque()
+        self._walks = {}
+        self._results = {}
+        self._batches = collections.deque()
+        self._cancelled = threading.Event()
+        self._running = 0
+
+    def start(self):
+        '''
+        Queue the cached projects and start walking the others.
+        '''
+        for projIdx, projDir in enumerate(self.projDirs):
+            result = projectmanager_scan.scan_cached(projDir, self.extensions, versionPatterns=self.versionPatterns,
+                                                     cachedOnly=True)
+            if result is not None:
+                self._batches.append((projIdx, None, result))
+                self._batches.append((projIdx, None, None))
+            else:
+                self._turns.append(projIdx)
+        count = min(self.workers, len(self._turns))
+        if not count:
+            return
+        self._running = count
+        prefetcher = projectmanager_scan.PREFETCHER
+        if prefetcher is not None:
+            prefetcher.foreground_begin()
+        for idx in range(count):
+            thread = threading.Thread(target=self._run, name='pm.multiscan.%d' % idx)
+            thread.daemon = True
+            thread.start()
+
+    def cancel(self):
+        '''
+        Stop every walk at its next directory.
+        '''
+        self._cancelled.set()
+
+    def isDone(self):
+        '''
+        Return True once every project is scanned and drained, or the scan was cancelled.
+        '''
+        with self._lock:
+            return (self._running == 0 and not self._batches) or self._cancelled.is_set()
+
+    def drain(self, merged):
+        '''
+        Add the directories scanned so far to a merged result. Call from one thread only.
+        Arg 1: the merged listing <MergedScanResult>
+
+        Returns the number of rows added.
+        '''
+        with self._lock:
+            batches = list(self._batches)
+            self._batches.clear()
+        before = len(merged)
+        for projIdx, relativeDir, files in batches:
+            if isinstance(files, projectmanager_scan.ScanResult):
+                merged.addResult(projIdx, files, self.compiledPatterns)
+            elif files is None:
+                self.finished.add(self.projDirs[projIdx])
+            else:
+                merged.addFiles(projIdx, relativeDir, files, self.compiledPatterns)
+        return len(merged) - before
+
+    def _run(self):
+        try:
+            while not self._cancelled.is_set():
+                with self._lock:
+                    if not self._turns:
+                        break
+                    projIdx = self._turns.popleft()
+                if self._scanSlice(projIdx):
+                    with self._lock:
+                        self._turns.append(projIdx)
+        finally:
+            with self._lock:
+                self._running -= 1
+                last = self._running == 0
+            prefetcher = projectmanager_scan.PREFETCHER
+            if last and prefetcher is not None:
+                prefetcher.foreground_end()
+
+    def _scanSlice(self, projIdx):
+        # returns True if the project has more directories to walk
+        projDir = self.projDirs[projIdx]
+        abort = self._cancelled.is_set
+        batches = []
+        try:
+            # scanners other than the plain walk (shared index, daemon) deliver a project whole
+            if projectmanager_scan.SCANNER is not projectmanager_scan.scan_project:
+                result = projectmanager_scan.scan_cached(projDir, self.extensions, versionPatterns=self.versionPatterns)
+                batches = [(projIdx, None, result), (projIdx, None, None)]
+                return False
+
+            walk = self._walks.get(projIdx)
+            if walk is None:
+                walk = self._walks[projIdx] = projectmanager_scan.scan_walk(projDir, self.extensions, abort)
+                result = self._results[projIdx] = projectmanager_scan.ScanResult(projDir, self.extensions)
+                result.versionPatterns = list(self.versionPatterns)
+            result = self._results[projIdx]
+            for idx in range(self.sliceDirs):
+                try:
+                    root, files = next(walk)
+                except StopIteration:
+                    projectmanager_scan.SCANCACHE.put(projDir, result)
+                    del self._walks[projIdx], self._results[projIdx]
+                    batches.append((projIdx, None, None))
+                    return False
+                if files:
+                    relativeDir = root[len(projDir):]
+                    projectmanager_scan.scan_addFiles(result, relativeDir, files, self.compiledPatterns)
+                    batches.append((projIdx, relativeDir, files))
+            return True
+        except (OSError, projectmanager_scan.ScanAborted):
+            batches.append((projIdx, None, None))
+            return False
+        finally:
+            with self._lock:
+                self._batches.extend(batches)
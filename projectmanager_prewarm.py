@@ -0,0 +1,267 @@
+#------------------------------------------------------------------------------
+# PROJECT MANAGER PREWARM, Tim Crowson
+#------------------------------------------------------------------------------
+# Background read-ahead of a scene and the files it references, so that the
+# following scene.open reads from the OS page cache instead of the share.
+
+
+import os
+import re
+import time
+import threading
+import collections
+
+
+# PREWARM
+PREWARM_CHUNK = 1024 * 1024                 # bytes read per call; cancellation is checked between chunks
+PREWARM_MAXBYTES = 2 * 1024 * 1024 * 1024   # default budget for a scene and its references together
+PREWARM_MAXREFS = 32                        # first-level references followed per scene
+PREWARM_WARMBUDGETS = 4                     # bytes remembered as warm, in byte budgets; the OS evicts the rest
+PREWARM_MAXFILES = 4096                     # files remembered as warm
+PREWARM_MAXSCENES = 256                     # scenes whose references are remembered
+PREWARM_REFEXTENSIONS = ('lxo', 'lxl', 'obj', 'abc', 'fbx', 'exr', 'tif', 'tiff', 'png', 'jpg', 'jpeg',
+                         'tga', 'hdr', 'psd', 'vdb', 'ies')
+
+# paths are stored in scenes as plain strings: find the (rare) extensions first, then
+# walk back to the start of the string and keep it if it is an absolute path
+_EXTENSION = re.compile(b'\\.(?:' + '|'.join(PREWARM_REFEXTENSIONS).encode('ascii') + b')(?![A-Za-z0-9])',
+                        re.IGNORECASE)
+_NONPATH = re.compile(b'[\\x00-\\x1f"*<>?|]')
+_ABSOLUTE = re.compile(b'[A-Za-z]:[\\\\/]|\\\\\\\\|/')
+_OVERLAP = 1100                             # longest path looked for, plus its extension
+
+
+class PrewarmCancelled(Exception):
+    '''
+    Raised inside a prewarm when it is superseded or cancelled.
+    '''
+    pass
+
+
+def _adviseSequential(f):
+    '''
+    Hint the OS to read ahead aggressively, where posix_fadvise is available.
+    '''
+    if hasattr(os, 'posix_fadvise'):
+        try:
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+
+
+def prewarm_evict(path):
+    '''
+    Ask the OS to drop a file from the page cache, where posix_fadvise is available.
+    Used by benchmarks to measure cold reads; returns False if unsupported.
+    Arg 1: the file path <string>
+    '''
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    with open(path, 'rb') as f:
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+    return True
+
+
+def prewarm_pathEndingAt(data, end):
+    '''
+    Return the absolute path in a block of bytes which ends at the given offset, or None.
+    Arg 1: the bytes <bytes>
+    Arg 2: the offset just past the file extension <int>
+    '''
+    start = max(0, end - 1024)
+    for bad in _NONPATH.finditer(data, start, end):
+        start = bad.end()
+    found = _ABSOLUTE.search(data, start, end)
+    if found is None:
+        return None
+    return data[found.start():end].decode('utf-8', 'replace')
+
+
+def prewarm_file(path, maxBytes, cancelled=None, references=None):
+    '''
+    Read a file sequentially so that its pages land in the OS cache.
+    Arg 1: the file path <string>
+    Arg 2: the most bytes to read <int>
+    Arg 3: optional callable, returning True when the read should stop <callable>
+    Arg 4: optional list to collect absolute paths found in the file into <list>
+
+    Returns the number of bytes read.
+    '''
+    done = 0
+    buf = bytearray(PREWARM_CHUNK)
+    view = memoryview(buf)
+    tail = b''
+    with open(path, 'rb') as f:
+        _adviseSequential(f)
+        while done < maxBytes:
+            if cancelled is not None and cancelled():
+                raise PrewarmCancelled(path)
+            count = f.readinto(buf)
+            if not count:
+                break
+            done += count
+            if references is not None and len(references) < PREWARM_MAXREFS:
+                chunk = tail + view[:count].tobytes()
+                for match in _EXTENSION.finditer(chunk):
+                    if match.end() > len(chunk) - _OVERLAP and count == PREWARM_CHUNK:
+                        break
+                    ref = prewarm_pathEndingAt(chunk, match.end())
+                    if ref is not None and ref not in references:
+                        references.append(ref)
+                tail = chunk[-_OVERLAP:]
+    return done
+
+
+class Prewarmer(object):
+    '''
+    Background worker which prewarms one scene at a time.
+    A new request cancels the one in progress. Files already warmed and unchanged
+    since are skipped; only the most recently warmed files are remembered, as
+    the OS page cache doesn't keep much more than a few budgets' worth either.
+    Arg 1: the byte budget per request, shared by the scene and its references <int>
+    '''
+    def __init__(self, maxBytes=PREWARM_MAXBYTES):
+        self.maxBytes = maxBytes
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending = None
+        self._current = None
+        self._generation = 0
+        self._warm = collections.OrderedDict()
+        self._warmBytes = 0
+        self._references = collections.OrderedDict()
+        self._thread = None
+
+    def request(self, scenePath):
+        '''
+        Prewarm a scene, replacing any prewarm in progress.
+        Arg 1: the scene path <string>
+        '''
+        with self._lock:
+            if scenePath in (self._pending, self._current):
+                return
+            self._generation += 1
+            self._pending = scenePath
+        self._ensureThread()
+        self._wake.set()
+
+    def cancel(self):
+        '''
+        Stop the prewarm in progress and drop any pending one.
+        '''
+        with self._lock:
+            self._generation += 1
+            self._pending = None
+            # the cancelled prewarm is unwinding; asking for the same scene again must queue it
+            self._current = None
+
+    def status(self, path):
+        '''
+        Return 'warm' if a file was fully read and hasn't changed since, 'partial'
+        if it was cut short by the budget, otherwise None.
+        Arg 1: the file path <string>
+        '''
+        with self._lock:
+            known = self._warm.get(path)
+        if known is None:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if (st.st_size, st.st_mtime) != known[:2]:
+            return None
+        return 'warm' if known[2] else 'partial'
+
+    def _remember(self, path, st, done, references=None):
+        # call with the lock held; drops the least recently warmed files and scenes over the caps
+        if path in self._warm:
+            self._warmBytes -= self._warm.pop(path)[3]
+        self._warm[path] = (st.st_size, st.st_mtime, done >= st.st_size, done)
+        self._warmBytes += done
+        while len(self._warm) > 1 and (len(self._warm) > PREWARM_MAXFILES or
+                                       self._warmBytes > self.maxBytes * PREWARM_WARMBUDGETS):
+            self._warmBytes -= self._warm.popitem(last=False)[1][3]
+        if references is not None:
+            self._references.pop(path, None)
+            self._references[path] = references
+            while len(self._references) > PREWARM_MAXSCENES:
+                self._references.popitem(last=False)
+
+    def _ensureThread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='pm.prewarm')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _next(self):
+        with self._lock:
+            scenePath, self._pending = self._pending, None
+            self._current = scenePath
+            return scenePath, self._generation
+
+    def _run(self):
+        while True:
+            self._wake.wait(30)
+            self._wake.clear()
+            scenePath, generation = self._next()
+            while scenePath is not None:
+                try:
+                    self._prewarm(scenePath, lambda: self._generation != generation)
+                except PrewarmCancelled:
+                    pass
+                scenePath, generation = self._next()
+
+    def _prewarm(self, scenePath, cancelled):
+        budget = self.maxBytes
+        paths = [scenePath]
+        while paths and budget > 0:
+            path = paths.pop(0)
+            isScene = path == scenePath
+            if self.status(path) != 'warm':
+                references = [] if isScene else None
+                try:
+                    st = os.stat(path)
+                    done = prewarm_file(path, budget, cancelled, references)
+                except (IOError, OSError):
+                    continue
+                budget -= done
+                with self._lock:
+                    self._remember(path, st, done, [ref for ref in references if ref != path] if isScene else None)
+            else:
+                with self._lock:
+                    if path in self._warm:
+                        self._warm[path] = self._warm.pop(path)
+            if isScene:
+                with self._lock:
+                    paths.extend(self._references.get(path, ()))
+
+
+def prewarm_timeRead(path):
+    '''
+    Return the seconds taken to read a file from start to end.
+    Arg 1: the file path <string>
+    '''
+    started = time.time()
+    with open(path, 'rb') as f:
+        while f.read(PREWARM_CHUNK):
+            pass
+    return time.time() - started
+
+
+# process-wide prewarmer shared by every Project Manager panel
+PREWARMER = None
+
+
+def prewarm_getShared(maxBytes=PREWARM_MAXBYTES):
+    '''
+    Return the process-wide Prewarmer, creating it on first use.
+    Arg 1: the byte budget per scene <int>
+    '''
+    global PREWARMER
+    if PREWARMER is None:
+        PREWARMER = Prewarmer(maxBytes)
+    else:
+        PREWARMER.maxBytes = maxBytes
+    return PREWARMER
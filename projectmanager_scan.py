@@ -0,0 +1,994 @@
+#------------------------------------------------------------------------------
+# PROJECT MANAGER SCANNING, Tim Crowson
+#------------------------------------------------------------------------------
+# Qt-free helpers for walking projects, caching the results and prefetching
+# the projects an artist is likely to open next.
+
+
+import os
+import re
+import time
+import threading
+import collections
+from array import array
+
+try:
+    from os import scandir as _scandir
+except ImportError:
+    try:
+        from scandir import scandir as _scandir
+    except ImportError:
+        _scandir = None
+
+
+# CACHE AND PREFETCH DEFAULTS
+CACHE_MAXBYTES = 64 * 1024 * 1024       # memory cap for cached scan results
+CACHE_MAXAGE = 300                      # seconds before a cached scan is considered stale
+PREFETCH_MAXENTRIES = 200000            # directory entries a single prefetch may touch
+PREFETCH_ENTRIESPERSEC = 20000          # throttle for prefetch directory entries
+PREFETCH_CANDIDATES = 4                 # projects queued per idle period
+
+_DIGITS = re.compile(r'(\d+)')
+
+# FRAME SEQUENCES
+SEQUENCE_EXTENSIONS = set(['.exr', '.png', '.jpg', '.jpeg', '.tif', '.tiff', '.tga', '.hdr', '.dpx', '.cin'])
+SEQUENCE_MINFRAMES = 2                  # files needed before a pattern counts as a sequence
+_FRAME = re.compile(r'^(.*[._])(\d+)(\.[^.]+)$')
+
+# SCENE VERSIONS
+# Each pattern is searched in the file name without its extension, and must
+# have a 'version' group. The last match in the name is used.
+VERSION_PATTERNS = [
+    r'(?:^|[._ -])v(?P<version>\d+)(?=$|[._ -])',
+    r'(?:^|[._ -])(?:ver|version)[._ -]?(?P<version>\d+)(?=$|[._ -])',
+    ]
+
+# FOLDERS NEVER SCANNED
+SCAN_SKIPFOLDERS = frozenset(['.pmtrash'])      # where Clean Up moves files aside, see projectmanager_cleanup
+
+# PROJECT ASSOCIATIONS
+# lines such as 'Associate scene Scenes' in a project's .luxproject file
+_ASSOCIATION = re.compile(r'^\s*Associate\s+(\S+)[ \t]+(.*?)\s*$')
+_ASSOCIATIONS = {}
+_associationsLock = threading.Lock()
+
+# file names are packed into a single byte buffer by ScanResult, and come back
+# out as the same type as the project path they were found under
+if str is bytes:
+    def _packName(name):
+        return name.encode('utf-8') if isinstance(name, unicode) else name
+
+    def _unpackName(data, root=''):
+        if isinstance(root, unicode):
+            try:
+                return bytes(data).decode('utf-8')
+            except UnicodeDecodeError:
+                # listdir leaves names it can't decode as bytes
+                pass
+        return str(data)
+else:
+    def _packName(name):
+        return name.encode('utf-8', 'surrogateescape')
+
+    def _unpackName(data, root=''):
+        return data.decode('utf-8', 'surrogateescape')
+
+
+def scan_splitExtensions(fileTypes):
+    '''
+    Flatten filetype lookup values into a set of lowercase extensions.
+    Arg 1: the extensions, some of which may be '|' separated <list>
+    '''
+    extensions = set()
+    for value in fileTypes:
+        for ext in value.split('|'):
+            if ext.strip():
+                extensions.add(ext.strip().lower())
+    return extensions
+
+
+def scan_naturalKey(text):
+    '''
+    Return a sort key which orders embedded numbers by value, so that
+    'shot_9' sorts before 'shot_010'.
+    Arg 1: the text to build a key for <string>
+    '''
+    parts = _DIGITS.split(text.lower())
+    parts[1::2] = [int(p) for p in parts[1::2]]
+    return parts
+
+
+class _ListdirEntry(object):
+    '''
+    Minimal stand-in for os.DirEntry on Pythons without scandir.
+    '''
+    __slots__ = ('name', 'path')
+
+    def __init__(self, root, name):
+        self.name = name
+        self.path = os.path.join(root, name)
+
+    def is_dir(self):
+        return os.path.isdir(self.path)
+
+    def is_symlink(self):
+        return os.path.islink(self.path)
+
+    def stat(self):
+        return os.stat(self.path)
+
+
+def scan_listDir(path):
+    '''
+    Return the entries of a directory as DirEntry-like objects.
+    Uses scandir when available, so that entry types come from the listing itself.
+    Arg 1: the directory path <string>
+    '''
+    if _scandir is not None:
+        return list(_scandir(path))
+    return [_ListdirEntry(path, name) for name in os.listdir(path)]
+
+
+class LocalFileSystem(object):
+    '''
+    The file system calls made by scans and project health checks.
+    Scans go through the module-level FS, so that tests and benchmarks can swap in
+    a shim (see projectmanager_fsshim) to simulate slow or failing network shares.
+    '''
+    def listDir(self, path):
+        return scan_listDir(path)
+
+    def exists(self, path):
+        return os.path.exists(path)
+
+    def isDir(self, path):
+        return os.path.isdir(path)
+
+
+def scan_checkHealth(paths, fs=None):
+    '''
+    Return a {path: reachable} dictionary for a list of project paths.
+    Arg 1: the project paths <list>
+    Arg 2: optional file system, defaults to FS <LocalFileSystem>
+    '''
+    fs = fs or FS
+    health = {}
+    for path in paths:
+        try:
+            health[path] = fs.exists(path)
+        except OSError:
+            health[path] = False
+    return health
+
+
+def scan_readAssociations(projDir):
+    '''
+    Return the folder associations of a project's .luxproject file, as
+    {type: [relative folder, ...]}. Results are cached until the file changes.
+    Arg 1: the project path <string>
+    '''
+    path = os.path.join(projDir, '.luxproject')
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return {}
+    with _associationsLock:
+        cached = _ASSOCIATIONS.get(projDir)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    associations = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                match = _ASSOCIATION.match(line)
+                if match and match.group(2):
+                    associations.setdefault(match.group(1), []).append(match.group(2))
+    except IOError:
+        return {}
+    with _associationsLock:
+        _ASSOCIATIONS[projDir] = (mtime, associations)
+    return associations
+
+
+def scan_sceneFolders(projDir):
+    '''
+    Return the folders a project associates with scenes ('scene', 'scene.saveAs'...),
+    relative to the project and without folders nested in one another.
+    Arg 1: the project path <string>
+    '''
+    folders = []
+    for kind, paths in scan_readAssociations(projDir).items():
+        if kind == 'scene' or kind.startswith('scene.') or kind.startswith('scene@'):
+            folders.extend(p.replace('\\', '/').strip('/') for p in paths)
+    kept = []
+    for folder in sorted(set(f for f in folders if f)):
+        if not any(folder.startswith(parent + '/') for parent in kept):
+            kept.append(folder)
+    return kept
+
+
+def scan_walk(top, extensions, abort=None, budget=None, fs=None):
+    '''
+    Walk a directory tree, yielding the matching files of each directory along
+    with their size and modification time. Sizes and times are read from the
+    directory entries as they are listed, so no second pass is needed.
+    Arg 1: the root directory <string>
+    Arg 2: lowercase extensions to keep <set>
+    Arg 3: optional callable, returning True when the walk should stop <callable>
+    Arg 4: optional I/O budget <IOBudget>
+    Arg 5: optional file system, defaults to FS <LocalFileSystem>
+
+    Yields (directory, [(fileName, ext, size, mtime), ...]) tuples.
+    Raises ScanAborted if the walk was interrupted.
+    '''
+    fs = fs or FS
+    stack = [top]
+    while stack:
+        if abort is not None and abort():
+            raise ScanAborted('scan interrupted')
+        root = stack.pop()
+        try:
+            entries = fs.listDir(root)
+        except OSError:
+            continue
+        if budget is not None:
+            budget.spend(len(entries))
+
+        files = []
+        subdirs = []
+        for entry in entries:
+            try:
+                isDir = entry.is_dir()
+            except OSError:
+                isDir = False
+            if isDir:
+                # like os.walk, don't descend into symlinked directories
+                if not entry.is_symlink() and entry.name not in SCAN_SKIPFOLDERS:
+                    subdirs.append(entry.path)
+                continue
+            ext = os.path.splitext(entry.name)[1].lower()
+            if ext in extensions:
+                try:
+                    st = entry.stat()
+                    files.append((entry.name, ext, st.st_size, st.st_mtime))
+                except OSError:
+                    files.append((entry.name, ext, 0, 0.0))
+        stack.extend(reversed(subdirs))
+        yield root, files
+
+
+class ScanAborted(Exception):
+    '''
+    Raised when a walk is interrupted or exhausts its I/O budget.
+    '''
+    pass
+
+
+class IOBudget(object):
+    '''
+    Bounds the number of directory entries a walk may touch, and how fast.
+    '''
+    def __init__(self, maxEntries=PREFETCH_MAXENTRIES, entriesPerSec=PREFETCH_ENTRIESPERSEC):
+        self.maxEntries = maxEntries
+        self.entriesPerSec = entriesPerSec
+        self.used = 0
+        self.started = time.time()
+
+    def spend(self, count):
+        '''
+        Consume entries from the budget, sleeping to honour the rate limit.
+        Arg 1: the number of entries touched <int>
+        '''
+        self.used += count
+        if self.maxEntries and self.used > self.maxEntries:
+            raise ScanAborted('I/O budget exhausted')
+        if self.entriesPerSec:
+            ahead = self.used / float(self.entriesPerSec) - (time.time() - self.started)
+            if ahead > 0:
+                time.sleep(min(ahead, 0.25))
+
+
+class Sequence(object):
+    '''
+    A run of numbered files in one directory, e.g. 'beauty.1001.exr' to 'beauty.1100.exr'.
+    '''
+    __slots__ = ('dirId', 'head', 'tail', 'padding', 'frames', 'rows', 'size', 'mtime')
+
+    def __init__(self, dirId, head, tail, padding):
+        self.dirId = dirId
+        self.head = head
+        self.tail = tail
+        self.padding = padding
+        self.frames = array('i')
+        self.rows = array('i')
+        self.size = 0
+        self.mtime = 0.0
+
+    def __len__(self):
+        return len(self.frames)
+
+    def name(self):
+        '''
+        Return the sequence pattern, e.g. 'beauty.####.exr'.
+        '''
+        return self.head + '#' * self.padding + self.tail
+
+    def first(self):
+        return self.frames[0]
+
+    def last(self):
+        return self.frames[-1]
+
+    def ranges(self):
+        '''
+        Return the contiguous frame ranges as (start, end) tuples.
+        A frame spelled with different paddings ('beauty.1.exr', 'beauty.001.exr') counts once.
+        '''
+        ranges = []
+        for frame in self.frames:
+            if ranges and frame <= ranges[-1][1] + 1:
+                ranges[-1][1] = frame
+            else:
+                ranges.append([frame, frame])
+        return [tuple(r) for r in ranges]
+
+    def frameCount(self):
+        '''
+        Return the number of distinct frames, which is less than the number of
+        files when a frame is spelled with different paddings.
+        '''
+        return sum(b - a + 1 for a, b in self.ranges())
+
+    def gaps(self):
+        '''
+        Return the missing frame ranges as (start, end) tuples.
+        '''
+        ranges = self.ranges()
+        return [(a[1] + 1, b[0] - 1) for a, b in zip(ranges, ranges[1:])]
+
+    def missingCount(self):
+        return (self.last() - self.first() + 1) - self.frameCount()
+
+    def describe(self):
+        '''
+        Return a short summary, e.g. '1001-1100 (3 missing)'.
+        '''
+        text = '%d-%d' % (self.first(), self.last())
+        frameCount = self.frameCount()
+        missing = (self.last() - self.first() + 1) - frameCount
+        duplicates = len(self.frames) - frameCount
+        if missing and duplicates:
+            text += ' (%d missing, %d duplicated)' % (missing, duplicates)
+        elif missing:
+            text += ' (%d missing)' % missing
+        elif duplicates:
+            text += ' (%d duplicated)' % duplicates
+        return text
+
+
+def scan_formatRanges(ranges):
+    '''
+    Format frame ranges as text, e.g. '1010, 1050-1051'.
+    Arg 1: (start, end) tuples <list>
+    '''
+    return ', '.join('%d' % a if a == b else '%d-%d' % (a, b) for a, b in ranges)
+
+
+def scan_detectSequences(result, dirId, firstRow):
+    '''
+    Group the numbered image files of one directory into Sequences.
+    This is a single pass over the rows the directory just added to the result.
+    Arg 1: the scan result <ScanResult>
+    Arg 2: the directory id <int>
+    Arg 3: the first row added for that directory <int>
+    '''
+    groups = {}
+    for row in range(firstRow, len(result)):
+        if result.ext(row) not in SEQUENCE_EXTENSIONS:
+            continue
+        match = _FRAME.match(result.name(row))
+        if match is None:
+            continue
+        head, digits, tail = match.groups()
+        groups.setdefault((head, tail), []).append((int(digits), len(digits), row))
+
+    for (head, tail), frames in groups.items():
+        if len(frames) < SEQUENCE_MINFRAMES:
+            continue
+        frames.sort()
+        seq = Sequence(dirId, head, tail, min(f[1] for f in frames))
+        for frame, padding, row in frames:
+            seq.frames.append(frame)
+            seq.rows.append(row)
+            seq.size += result.size(row)
+            seq.mtime = max(seq.mtime, result.mtime(row))
+            result.seqIds[row] = len(result.sequences)
+        result.sequences.append(seq)
+
+
+class VersionGroup(object):
+    '''
+    The versions of one scene in one directory, e.g. 'shot010_lighting_v001.lxo' to '_v087.lxo'.
+    Rows are kept ordered by version, so the last one is the latest.
+    '''
+    __slots__ = ('dirId', 'versions', 'rows')
+
+    def __init__(self, dirId):
+        self.dirId = dirId
+        self.versions = array('i')
+        self.rows = array('i')
+
+    def __len__(self):
+        return len(self.rows)
+
+    def latestRow(self):
+        return self.rows[-1]
+
+    def latestVersion(self):
+        return self.versions[-1]
+
+    def olderRows(self):
+        '''
+        Return the rows of every version but the latest, newest first.
+        '''
+        return list(reversed(self.rows[:-1]))
+
+
+class RemovedFile(object):
+    '''
+    A file which was in a project's previous snapshot but is gone from the fresh scan.
+    '''
+    __slots__ = ('relativePath', 'size', 'mtime')
+
+    def __init__(self, relativePath, size, mtime):
+        self.relativePath = relativePath
+        self.size = size
+        self.mtime = mtime
+
+
+def scan_compileVersionPatterns(patterns=None):
+    '''
+    Compile version patterns, skipping any that are invalid or lack a 'version' group.
+    Arg 1: optional regular expressions, defaults to VERSION_PATTERNS <list>
+    '''
+    compiled = []
+    for pattern in VERSION_PATTERNS if patterns is None else patterns:
+        try:
+            regex = re.compile(pattern, re.IGNORECASE)
+        except re.error:
+            continue
+        if 'version' in regex.groupindex:
+            compiled.append(regex)
+    return compiled
+
+
+def scan_detectVersions(result, dirId, firstRow, endRow, patterns):
+    '''
+    Group the versioned scene files of one directory into VersionGroups.
+    Files belonging to an image sequence are left alone.
+    Arg 1: the scan result <ScanResult>
+    Arg 2: the directory id <int>
+    Arg 3: the first row of the directory <int>
+    Arg 4: the row after the directory's last row <int>
+    Arg 5: compiled version patterns <list>
+    '''
+    groups = {}
+    for row in range(firstRow, endRow):
+        if result.seqIds[row] >= 0:
+            continue
+        name = result.name(row)
+        stem, ext = os.path.splitext(name)
+        for regex in patterns:
+            matches = list(regex.finditer(stem))
+            if matches:
+                match = matches[-1]
+                key = (stem[:match.start('version')] + '#' + stem[match.end('version'):] + ext).lower()
+                groups.setdefault(key, []).append((int(match.group('version')), name, row))
+                break
+
+    for versions in groups.values():
+        if len(versions) < 2:
+            continue
+        versions.sort()
+        group = VersionGroup(dirId)
+        for version, name, row in versions:
+            group.versions.append(version)
+            group.rows.append(row)
+            result.verIds[row] = len(result.versionGroups)
+        result.versionGroups.append(group)
+
+
+class ScanResult(object):
+    '''
+    Compact listing of the files found in a project.
+
+    Directories and extensions are stored once in lookup tables; each file is
+    a row across parallel arrays of (directory-id, name, ext-id, size, mtime).
+    Names are packed end to end into one byte buffer. Relative and absolute
+    paths are only built on demand.
+    '''
+    __slots__ = ('projDir', 'extensions', 'dirs', 'exts', 'nameData', 'nameEnds', 'dirIds', 'extIds',
+                 'sizes', 'mtimes', 'sequences', 'seqIds', 'versionGroups', 'verIds', 'versionPatterns',
+                 '_dirLookup', '_extLookup')
+
+    def __init__(self, projDir, extensions=()):
+        self.projDir = projDir
+        self.extensions = frozenset(extensions)
+        self.dirs = []
+        self.exts = []
+        self.nameData = bytearray()
+        self.nameEnds = array('I')
+        self.dirIds = array('i')
+        self.extIds = array('H')
+        self.sizes = array('d')
+        self.mtimes = array('d')
+        self.sequences = []
+        self.seqIds = array('i')
+        self.versionGroups = []
+        self.verIds = array('i')
+        self.versionPatterns = None
+        self._dirLookup = {}
+        self._extLookup = {}
+
+    def __len__(self):
+        return len(self.nameEnds)
+
+    def dirId(self, relativeDir):
+        '''
+        Return the id of a relative directory, adding it to the table if needed.
+        Arg 1: the directory relative to the project, e.g. '/Scenes' <string>
+        '''
+        idx = self._dirLookup.get(relativeDir)
+        if idx is None:
+            idx = self._dirLookup[relativeDir] = len(self.dirs)
+            self.dirs.append(relativeDir)
+        return idx
+
+    def extId(self, ext):
+        '''
+        Return the id of a lowercase extension, adding it to the table if needed.
+        Arg 1: the extension, e.g. '.lxo' <string>
+        '''
+        idx = self._extLookup.get(ext)
+        if idx is None:
+            idx = self._extLookup[ext] = len(self.exts)
+            self.exts.append(ext)
+        return idx
+
+    def add(self, dirId, name, extId, size, mtime):
+        '''
+        Append a file row.
+        Arg 1: the directory id from dirId() <int>
+        Arg 2: the file name <string>
+        Arg 3: the extension id from extId() <int>
+        Arg 4: the size in bytes <int>
+        Arg 5: the modification time <float>
+        '''
+        self.dirIds.append(dirId)
+        self.nameData.extend(_packName(name))
+        self.nameEnds.append(len(self.nameData))
+        self.extIds.append(extId)
+        self.sizes.append(size)
+        self.mtimes.append(mtime)
+        self.seqIds.append(-1)
+        self.verIds.append(-1)
+
+    def name(self, row):
+        start = self.nameEnds[row - 1] if row else 0
+        return _unpackName(self.nameData[start:self.nameEnds[row]], self.projDir)
+
+    def ext(self, row):
+        return self.exts[self.extIds[row]]
+
+    def size(self, row):
+        return int(self.sizes[row])
+
+    def mtime(self, row):
+        return self.mtimes[row]
+
+    def sequence(self, row):
+        '''
+        Return the Sequence a row belongs to, or None.
+        Arg 1: the row index <int>
+        '''
+        seqId = self.seqIds[row]
+        return self.sequences[seqId] if seqId >= 0 else None
+
+    def versionGroup(self, row):
+        '''
+        Return the VersionGroup a row belongs to, or None.
+        Arg 1: the row index <int>
+        '''
+        verId = self.verIds[row]
+        return self.versionGroups[verId] if verId >= 0 else None
+
+    def regroupVersions(self, patterns=None):
+        '''
+        Rebuild the version groups with different patterns, without touching the disk.
+        Rows of a directory are contiguous, so each directory is one run of rows.
+        Arg 1: optional regular expressions, defaults to VERSION_PATTERNS <list>
+        '''
+        self.versionGroups = []
+        self.verIds = array('i', [-1]) * len(self)
+        self.versionPatterns = list(VERSION_PATTERNS if patterns is None else patterns)
+        compiled = scan_compileVersionPatterns(self.versionPatterns)
+        start = 0
+        for row in range(1, len(self) + 1):
+            if row == len(self) or self.dirIds[row] != self.dirIds[start]:
+                scan_detectVersions(self, self.dirIds[start], start, row, compiled)
+                start = row
+
+    def collapsedRows(self, rows, sequences=True, versions=False):
+        '''
+        Collapse rows into their sequences and/or version groups, keeping the order of
+        first appearance. Returns a list holding row indices, Sequences and VersionGroups.
+        Arg 1: row indices, e.g. from rows() <list>
+        Arg 2: collapse frames into their Sequence <bool>
+        Arg 3: collapse versions into their VersionGroup <bool>
+        '''
+        entries = []
+        seen = set()
+        for row in rows:
+            if sequences and self.seqIds[row] >= 0:
+                key = ('seq', self.seqIds[row])
+                if key not in seen:
+                    seen.add(key)
+                    entries.append(self.sequences[self.seqIds[row]])
+            elif versions and self.verIds[row] >= 0:
+                key = ('ver', self.verIds[row])
+                if key not in seen:
+                    seen.add(key)
+                    entries.append(self.versionGroups[self.verIds[row]])
+            else:
+                entries.append(row)
+        return entries
+
+    def relativePath(self, row):
+        '''
+        Build the path of a file relative to the project root, e.g. '/Scenes/a.lxo'.
+        Arg 1: the row index <int>
+        '''
+        return self.dirs[self.dirIds[row]] + os.sep + self.name(row)
+
+    def fullPath(self, row):
+        '''
+        Build the absolute path of a file.
+        Arg 1: the row index <int>
+        '''
+        return self.projDir + self.relativePath(row)
+
+    def rows(self, extensions=None):
+        '''
+        Return the row indices of files with the given extensions.
+        Arg 1: optional lowercase extensions, defaults to all rows <set>
+        '''
+        if extensions is None:
+            return list(range(len(self.nameEnds)))
+        wanted = set(idx for idx, ext in enumerate(self.exts) if ext in extensions)
+        return [row for row, extId in enumerate(self.extIds) if extId in wanted]
+
+    def entryRow(self, entry):
+        '''
+        Return the row behind a scene list entry: the row itself, or a sequence's first frame.
+        Arg 1: a row index or Sequence <int|Sequence>
+        '''
+        if isinstance(entry, Sequence):
+            return entry.rows[0]
+        if isinstance(entry, VersionGroup):
+            return entry.latestRow()
+        if isinstance(entry, RemovedFile):
+            return None
+        return entry
+
+    def entryName(self, entry):
+        if isinstance(entry, Sequence):
+            return entry.name()
+        if isinstance(entry, RemovedFile):
+            return os.path.basename(entry.relativePath)
+        return self.name(self.entryRow(entry))
+
+    def entrySize(self, entry):
+        if isinstance(entry, (Sequence, RemovedFile)):
+            return int(entry.size)
+        return self.size(self.entryRow(entry))
+
+    def entryMtime(self, entry):
+        if isinstance(entry, (Sequence, RemovedFile)):
+            return entry.mtime
+        return self.mtime(self.entryRow(entry))
+
+    def entryRelativePath(self, entry):
+        if isinstance(entry, Sequence):
+            return self.dirs[entry.dirId] + os.sep + entry.name()
+        if isinstance(entry, RemovedFile):
+            return entry.relativePath
+        return self.relativePath(self.entryRow(entry))
+
+    def nbytes(self):
+        '''
+        Rough in-memory cost of the listing, used by ScanCache for its memory cap.
+        '''
+        arrays = (self.nameEnds, self.dirIds, self.extIds, self.sizes, self.mtimes, self.seqIds, self.verIds)
+        total = sum(a.itemsize * len(a) for a in arrays) + len(self.nameData)
+        total += sum(120 + len(seq.head) + 8 * len(seq) for seq in self.sequences)
+        total += sum(100 + 8 * len(group) for group in self.versionGroups)
+        total += sum(56 + len(d) for d in self.dirs) * 2
+        return total
+
+
+def scan_project(projDir, extensions, abort=None, budget=None, versionPatterns=None, fs=None):
+    '''
+    Walk a project and return every file matching the given extensions.
+    Arg 1: the project path <string>
+    Arg 2: lowercase extensions to keep <set>
+    Arg 3: optional callable, returning True when the walk should stop <callable>
+    Arg 4: optional I/O budget <IOBudget>
+    Arg 5: optional version patterns, defaults to VERSION_PATTERNS <list>
+    Arg 6: optional file system, defaults to FS <LocalFileSystem>
+
+    Returns a ScanResult.
+    Raises ScanAborted if the walk was interrupted.
+    '''
+    result = ScanResult(projDir, extensions)
+    result.versionPatterns = list(VERSION_PATTERNS if versionPatterns is None else versionPatterns)
+    compiledPatterns = scan_compileVersionPatterns(result.versionPatterns)
+    for root, files in scan_walk(projDir, extensions, abort, budget, fs):
+        scan_addFiles(result, root[len(projDir):], files, compiledPatterns)
+    return result
+
+
+def scan_folders(projDir, folders, extensions, abort=None, budget=None, versionPatterns=None, fs=None):
+    '''
+    Walk only some folders of a project, e.g. those associated with scenes.
+    Arg 1: the project path <string>
+    Arg 2: folders relative to the project, with '/' separators <list>
+    Arg 3: lowercase extensions to keep <set>
+    Args 4-7: as for scan_project
+
+    Returns a ScanResult with paths relative to the project, like scan_project.
+    '''
+    result = ScanResult(projDir, extensions)
+    result.versionPatterns = list(VERSION_PATTERNS if versionPatterns is None else versionPatterns)
+    compiledPatterns = scan_compileVersionPatterns(result.versionPatterns)
+    for folder in folders:
+        top = os.path.join(projDir, *folder.split('/'))
+        for root, files in scan_walk(top, extensions, abort, budget, fs):
+            scan_addFiles(result, root[len(projDir):], files, compiledPatterns)
+    return result
+
+
+def scan_addFiles(result, relativeDir, files, compiledPatterns):
+    '''
+    Add the matching files of one directory to a scan result, then detect its
+    sequences and versions.
+    Arg 1: the scan result <ScanResult>
+    Arg 2: the directory relative to the project <string>
+    Arg 3: (fileName, ext, size, mtime) tuples <list>
+    Arg 4: compiled version patterns <list>
+    '''
+    if not files:
+        return
+    dirId = result.dirId(relativeDir)
+    firstRow = len(result)
+    for fileName, ext, size, mtime in files:
+        result.add(dirId, fileName, result.extId(ext), size, mtime)
+    if SEQUENCE_EXTENSIONS & result.extensions:
+        scan_detectSequences(result, dirId, firstRow)
+    scan_detectVersions(result, dirId, firstRow, len(result), compiledPatterns)
+
+
+class ScanCache(object):
+    '''
+    Thread-safe, memory-capped LRU of scan results keyed by project path.
+    '''
+    def __init__(self, maxBytes=CACHE_MAXBYTES, maxAge=CACHE_MAXAGE):
+        self.maxBytes = maxBytes
+        self.maxAge = maxAge
+        self.usedBytes = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, projDir, maxAge=None):
+        '''
+        Return the cached ScanResult for a project, or None if missing or stale.
+        Arg 1: the project path <string>
+        Arg 2: optional override of the maximum age in seconds <float>
+        '''
+        maxAge = self.maxAge if maxAge is None else maxAge
+        with self._lock:
+            entry = self._entries.get(projDir)
+            if entry is None:
+                return None
+            stamp, size, result = entry
+            if maxAge is not None and time.time() - stamp > maxAge:
+                del self._entries[projDir]
+                self.usedBytes -= size
+                return None
+            # mark as most recently used
+            del self._entries[projDir]
+            self._entries[projDir] = entry
+            return result
+
+    def contains(self, projDir):
+        '''
+        Return True if a fresh result exists for the project.
+        Arg 1: the project path <string>
+        '''
+        return self.get(projDir) is not None
+
+    def put(self, projDir, result):
+        '''
+        Store a scan result for a project, evicting least recently used entries.
+        Arg 1: the project path <string>
+        Arg 2: the scan result <ScanResult>
+        '''
+        size = result.nbytes()
+        if size > self.maxBytes:
+            return
+        with self._lock:
+            if projDir in self._entries:
+                self.usedBytes -= self._entries.pop(projDir)[1]
+            self._entries[projDir] = (time.time(), size, result)
+            self.usedBytes += size
+            while self.usedBytes > self.maxBytes and self._entries:
+                oldest = next(iter(self._entries))
+                self.usedBytes -= self._entries.pop(oldest)[1]
+
+    def discard(self, projDir):
+        '''
+        Drop a project from the cache.
+        Arg 1: the project path <string>
+        '''
+        with self._lock:
+            if projDir in self._entries:
+                self.usedBytes -= self._entries.pop(projDir)[1]
+
+
+class Prefetcher(object):
+    '''
+    Background worker which pre-scans likely-next projects into a ScanCache.
+    Prefetching yields to foreground scans: call foreground_begin() before a
+    scan on the UI side and foreground_end() once it has finished.
+    '''
+    def __init__(self, cache, extensions):
+        self.cache = cache
+        self.extensions = set(extensions)
+        self._queue = collections.deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._foreground = 0
+        self._thread = None
+
+    def foreground_begin(self):
+        '''
+        Signal that a foreground scan is starting; running prefetches abort.
+        '''
+        with self._lock:
+            self._foreground += 1
+            self._queue.clear()
+
+    def foreground_end(self):
+        '''
+        Signal that a foreground scan has completed.
+        '''
+        with self._lock:
+            self._foreground = max(0, self._foreground - 1)
+
+    def isForegroundBusy(self):
+        '''
+        Return True while a foreground scan is running.
+        '''
+        return self._foreground > 0
+
+    def enqueue(self, projects):
+        '''
+        Replace the pending prefetch queue with the given projects.
+        Arg 1: project paths, most likely first <list>
+        '''
+        with self._lock:
+            self._queue.clear()
+            for projDir in projects:
+                if not self.cache.contains(projDir):
+                    self._queue.append(projDir)
+        if self._queue:
+            self._ensureThread()
+            self._wake.set()
+
+    def _ensureThread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='pm.prefetch')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _next(self):
+        with self._lock:
+            if self._foreground or not self._queue:
+                return None
+            return self._queue.popleft()
+
+    def _run(self):
+        while True:
+            self._wake.wait(30)
+            self._wake.clear()
+            projDir = self._next()
+            while projDir is not None:
+                if FS.isDir(projDir) and not self.cache.contains(projDir):
+                    try:
+                        result = SCANNER(projDir, self.extensions,
+                                         abort=self.isForegroundBusy,
+                                         budget=IOBudget())
+                        self.cache.put(projDir, result)
+                    except (ScanAborted, OSError):
+                        pass
+                projDir = self._next()
+
+
+def prefetch_rankCandidates(usage, neighbors, exclude=None, count=PREFETCH_CANDIDATES):
+    '''
+    Rank projects by how likely they are to be opened next.
+    Arg 1: per-project open counts <dict>
+    Arg 2: project paths adjacent to the current selection, nearest first <list>
+    Arg 3: optional project path to leave out, usually the current one <string>
+    Arg 4: the number of candidates to return <int>
+    '''
+    scores = {}
+    for projDir, opened in usage.items():
+        scores[projDir] = float(opened)
+    for distance, projDir in enumerate(neighbors):
+        scores[projDir] = scores.get(projDir, 0.0) + 3.0 / (distance + 1)
+    ranked = sorted(scores, key=lambda p: scores[p], reverse=True)
+    return [p for p in ranked if p != exclude][:count]
+
+
+# process-wide file system, cache and prefetcher shared by every Project Manager panel
+FS = LocalFileSystem()
+SCANCACHE = ScanCache()
+PREFETCHER = None
+
+# how projects are scanned; projectmanager_index.index_scan when the shared index is enabled
+SCANNER = scan_project
+
+
+def scan_cached(projDir, extensions, refresh=False, versionPatterns=None, cachedOnly=False):
+    '''
+    Return the ScanResult for a project, from the shared cache when possible.
+    A cached result is only reused if it was scanned for all requested extensions.
+    Running prefetches are told to back off while the scan runs.
+    Arg 1: the project path <string>
+    Arg 2: lowercase extensions to scan for <set>
+    Arg 3: ignore any cached result <bool>
+    Arg 4: optional version patterns, defaults to VERSION_PATTERNS <list>
+    Arg 5: return None instead of scanning when nothing suitable is cached <bool>
+    '''
+    versionPatterns = list(VERSION_PATTERNS if versionPatterns is None else versionPatterns)
+    result = None if refresh else SCANCACHE.get(projDir)
+    if result is None or not set(extensions) <= result.extensions:
+        if cachedOnly:
+            return None
+        prefetcher = PREFETCHER
+        if prefetcher is not None:
+            prefetcher.foreground_begin()
+        try:
+            scanner = scan_project if refresh else SCANNER
+            result = scanner(projDir, extensions, versionPatterns=versionPatterns)
+        finally:
+            if prefetcher is not None:
+                prefetcher.foreground_end()
+        SCANCACHE.put(projDir, result)
+    elif result.versionPatterns != versionPatterns:
+        result.regroupVersions(versionPatterns)
+    return result
+
+
+def prefetch_getShared(extensions):
+    '''
+    Return the process-wide Prefetcher, creating it on first use.
+    Arg 1: lowercase extensions to prefetch <set>
+    '''
+    global PREFETCHER
+    if PREFETCHER is None:
+        PREFETCHER = Prefetcher(SCANCACHE, extensions)
+    else:
+        PREFETCHER.extensions = set(extensions)
+    return PREFETCHER
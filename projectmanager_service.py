@@ -0,0 +1,330 @@
+#------------------------------------------------------------------------------
+# PROJECT MANAGER SERVICE, Tim Crowson
+#------------------------------------------------------------------------------
+# The state every Project Manager panel in a Modo session shares: the project
+# list, file type filters, view options, usage counts, version patterns and
+# project health, next to the shared scan cache. Files are read once per
+# process (and again only when changed on disk), and panels subscribe to be
+# told when another panel changes something.
+
+
+import os
+import time
+import pickle
+import weakref
+import threading
+
+import projectmanager_scan
+
+
+# SERVICE
+SERVICE_HEALTHMAXAGE = 300      # seconds a project health check is reused for
+
+
+class _WeakListener(object):
+    '''
+    A listener held without keeping its object alive, so closed panels are
+    dropped instead of piling up.
+    '''
+    def __init__(self, callback):
+        if hasattr(callback, '__self__') and callback.__self__ is not None:
+            self._obj = weakref.ref(callback.__self__)
+            self._func = callback.__func__
+        else:
+            self._obj = None
+            self._func = callback
+
+    def get(self):
+        '''
+        Return the callable, or None if its object is gone.
+        '''
+        if self._obj is None:
+            return self._func
+        obj = self._obj()
+        if obj is None:
+            return None
+        return self._func.__get__(obj, type(obj))
+
+    def matches(self, callback):
+        return self.get() == callback
+
+
+def service_readLines(path):
+    '''
+    Return the non-empty, non-comment lines of a text file, or [] if it is missing.
+    Arg 1: the file path <string>
+    '''
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def _loadPickle(path, default):
+    # unreadable data falls back to the default, as if the file were missing
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except (IOError, OSError, EOFError, ValueError, pickle.UnpicklingError):
+        return default
+
+
+def _savePickle(path, data, protocol=None):
+    with open(path, 'wb') as f:
+        if protocol is None:
+            pickle.dump(data, f)
+        else:
+            pickle.dump(data, f, protocol)
+
+
+class ProjectService(object):
+    '''
+    Thread-safe holder of the Project Manager's shared state.
+    Listeners subscribed with subscribe() are called as listener(topic, value)
+    on the thread which made the change, after the change is saved. Topics are
+    'projects', 'filters', 'options' and 'health'.
+    Arg 1: the Project List File <string>
+    Arg 2: the file type filters file <string>
+    Arg 3: the view options file <string>
+    Arg 4: the usage counts file <string>
+    Arg 5: the Version Patterns File <string>
+    Arg 6: the default view options <dict>
+    '''
+    def __init__(self, projectListPath, filtersPath, optionsPath, usagePath, versionPatternsPath, defaultOptions):
+        self.projectListPath = projectListPath
+        self.filtersPath = filtersPath
+        self.optionsPath = optionsPath
+        self.usagePath = usagePath
+        self.versionPatternsPath = versionPatternsPath
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._projects = None
+        self._projectsStamp = None
+        self._patterns = None
+        self._patternsStamp = None
+        self._health = {}
+        self._filters = _loadPickle(filtersPath, None)
+        self._usage = _loadPickle(usagePath, {})
+        self._options = dict(defaultOptions)
+        self._options.update(_loadPickle(optionsPath, {}))
+
+    # notifications
+    def subscribe(self, listener):
+        '''
+        Call a listener whenever shared state changes. Bound methods are held weakly.
+        Arg 1: the callable, taking (topic, value) <callable>
+        '''
+        with self._lock:
+            self._listeners.append(_WeakListener(listener))
+
+    def unsubscribe(self, listener):
+        '''
+        Stop calling a listener.
+        Arg 1: the callable passed to subscribe() <callable>
+        '''
+        with self._lock:
+            self._listeners = [l for l in self._listeners if l.get() is not None and not l.matches(listener)]
+
+    def listenerCount(self):
+        '''
+        Return the number of live listeners.
+        '''
+        with self._lock:
+            return len([l for l in self._listeners if l.get() is not None])
+
+    def _notify(self, topic, value=None):
+        with self._lock:
+            self._listeners = [l for l in self._listeners if l.get() is not None]
+            listeners = [l.get() for l in self._listeners]
+        for listener in listeners:
+            if listener is None:
+                continue
+            try:
+                listener(topic, value)
+            except RuntimeError:
+                # a panel whose widget Qt already deleted
+                self.unsubscribe(listener)
+
+    def _save(self, path, data, protocol=None):
+        # a failed save still changes the state in memory; the error is raised once listeners know
+        try:
+            _savePickle(path, data, protocol)
+        except (IOError, OSError) as error:
+            return error
+        return None
+
+    # project list
+    def projects(self):
+        '''
+        Return the project paths, in file order. The Project List File is read
+        again only if it changed on disk, e.g. when edited by another Modo.
+        '''
+        with self._lock:
+            stamp = _mtime(self.projectListPath)
+            if self._projects is None or stamp != self._projectsStamp:
+                self._projects = service_readLines(self.projectListPath)
+                self._projectsStamp = stamp
+            return list(self._projects)
+
+    def _saveProjects(self, projects):
+        with open(self.projectListPath, 'w') as f:
+            for line in projects:
+                f.write(line + '\n')
+        self._projects = list(projects)
+        self._projectsStamp = _mtime(self.projectListPath)
+
+    def addProject(self, projDir):
+        '''
+        Append a project to the list, unless it is already listed.
+        Returns True if it was added.
+        Arg 1: the project path <string>
+        '''
+        with self._lock:
+            projects = self.projects()
+            if projDir in projects:
+                return False
+            self._saveProjects(projects + [projDir])
+        self._notify('projects')
+        return True
+
+    def removeProject(self, projDir):
+        '''
+        Remove a project from the list. Returns True if it was listed.
+        Arg 1: the project path <string>
+        '''
+        with self._lock:
+            projects = self.projects()
+            if projDir not in projects:
+                return False
+            projects.remove(projDir)
+            self._saveProjects(projects)
+        self._notify('projects')
+        return True
+
+    # file type filters
+    def filters(self):
+        '''
+        Return the labels of the checked file types, or None if never saved.
+        '''
+        with self._lock:
+            return list(self._filters) if self._filters is not None else None
+
+    def setFilters(self, labels):
+        '''
+        Store the checked file types.
+        Arg 1: the file type labels <list>
+        '''
+        labels = list(labels)
+        with self._lock:
+            if labels == self._filters:
+                return
+            self._filters = labels
+            error = self._save(self.filtersPath, labels, 0)
+        self._notify('filters', labels)
+        if error is not None:
+            raise error
+
+    # view options
+    def options(self):
+        '''
+        Return a copy of the view options.
+        '''
+        with self._lock:
+            return dict(self._options)
+
+    def setOption(self, option, value):
+        '''
+        Change a view option and save the options. Unchanged values are ignored,
+        so panels can apply each other's changes without echoing them.
+        Arg 1: the option key <string>
+        Arg 2: the new value
+        '''
+        with self._lock:
+            if option in self._options and self._options[option] == value:
+                return
+            self._options[option] = value
+            error = self._save(self.optionsPath, self._options)
+        self._notify('options', (option, value))
+        if error is not None:
+            raise error
+
+    # usage counts
+    def usage(self):
+        '''
+        Return a copy of the per-project open counts.
+        '''
+        with self._lock:
+            return dict(self._usage)
+
+    def recordUsage(self, projDir):
+        '''
+        Count a project as opened and save the counts.
+        Arg 1: the project path <string>
+        '''
+        with self._lock:
+            self._usage[projDir] = self._usage.get(projDir, 0) + 1
+            _savePickle(self.usagePath, self._usage)
+
+    # version patterns
+    def versionPatterns(self):
+        '''
+        Return the scene version patterns of the Version Patterns File, or the
+        defaults if it is missing or empty. The file is read again only if it changed.
+        '''
+        with self._lock:
+            stamp = _mtime(self.versionPatternsPath)
+            if self._patterns is None or stamp != self._patternsStamp:
+                self._patterns = service_readLines(self.versionPatternsPath) or list(projectmanager_scan.VERSION_PATTERNS)
+                self._patternsStamp = stamp
+            return list(self._patterns)
+
+    # project health
+    def health(self):
+        '''
+        Return {path: reachable} for projects checked recently.
+        '''
+        cutoff = time.time() - SERVICE_HEALTHMAXAGE
+        with self._lock:
+            return dict((p, reachable) for p, (reachable, checked) in self._health.items() if checked >= cutoff)
+
+    def setHealth(self, health):
+        '''
+        Store the results of a health check.
+        Arg 1: {path: reachable} <dict>
+        '''
+        now = time.time()
+        with self._lock:
+            self._health.update((p, (reachable, now)) for p, reachable in health.items())
+        self._notify('health', health)
+
+    # scan caches
+    def scanCache(self):
+        '''
+        Return the process-wide ScanCache.
+        '''
+        return projectmanager_scan.SCANCACHE
+
+
+# process-wide service shared by every Project Manager panel
+SERVICE = None
+
+
+def service_getShared(projectListPath, filtersPath, optionsPath, usagePath, versionPatternsPath, defaultOptions):
+    '''
+    Return the process-wide ProjectService, creating it on first use.
+    Takes the same arguments as ProjectService.
+    '''
+    global SERVICE
+    if SERVICE is None:
+        SERVICE = ProjectService(projectListPath, filtersPath, optionsPath, usagePath, versionPatternsPath,
+                                 defaultOptions)
+    return SERVICE
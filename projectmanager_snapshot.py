@@ -0,0 +1,247 @@
+#------------------------------------------------------------------------------
+# PROJECT MANAGER SNAPSHOTS, Tim Crowson
+#------------------------------------------------------------------------------
+# Compact per-project records of the last scan (path, size, mtime), used to
+# show what changed in a project since it was last visited.
+
+
+import os
+import time
+import zlib
+import pickle
+import hashlib
+from array import array
+
+
+# SNAPSHOT STORE
+SNAPSHOTPATH = os.path.join(os.path.dirname(__file__), 'data', 'snapshots')
+SNAPSHOT_MAXBYTES = 32 * 1024 * 1024    # total size of all stored snapshots
+SNAPSHOT_MAXAGE = 90 * 24 * 3600        # snapshots not visited for this long are pruned
+SNAPSHOT_FORMAT = 1
+
+
+def _toBytes(arr):
+    return arr.tobytes() if hasattr(arr, 'tobytes') else arr.tostring()
+
+
+def _fromBytes(typecode, data):
+    arr = array(typecode)
+    if hasattr(arr, 'frombytes'):
+        arr.frombytes(data)
+    else:
+        arr.fromstring(data)
+    return arr
+
+
+class Snapshot(object):
+    '''
+    The files of a project sorted by relative path, with their sizes and times.
+    '''
+    __slots__ = ('projDir', 'stamp', 'extensions', 'paths', 'sizes', 'mtimes', 'rows')
+
+    def __init__(self, projDir, extensions, stamp=None):
+        self.projDir = projDir
+        self.extensions = frozenset(extensions)
+        self.stamp = time.time() if stamp is None else stamp
+        self.paths = []
+        self.sizes = array('d')
+        self.mtimes = array('d')
+        self.rows = None
+
+    def __len__(self):
+        return len(self.paths)
+
+    def dumps(self):
+        '''
+        Serialize the snapshot into a compressed string.
+        '''
+        data = (SNAPSHOT_FORMAT, self.projDir, self.stamp, sorted(self.extensions),
+                '\0'.join(self.paths), _toBytes(self.sizes), _toBytes(self.mtimes))
+        return zlib.compress(pickle.dumps(data, 2))
+
+    @classmethod
+    def loads(cls, data):
+        '''
+        Rebuild a snapshot from dumps() output; returns None for unknown formats.
+        Arg 1: the compressed string <string>
+        '''
+        data = pickle.loads(zlib.decompress(data))
+        if data[0] != SNAPSHOT_FORMAT:
+            return None
+        snapshot = cls(data[1], data[3], data[2])
+        snapshot.paths = data[4].split('\0') if data[4] else []
+        snapshot.sizes = _fromBytes('d', data[5])
+        snapshot.mtimes = _fromBytes('d', data[6])
+        return snapshot
+
+
+def snapshot_fromResult(result, extensions=None):
+    '''
+    Build a Snapshot of a ScanResult, keeping the scan rows for mapping diffs back.
+    Arg 1: the scan result <ScanResult>
+    Arg 2: optional extensions to keep, defaults to everything scanned <set>
+    '''
+    extensions = result.extensions if extensions is None else extensions
+    rows = result.rows(extensions)
+    paths = [result.relativePath(row) for row in rows]
+    order = sorted(range(len(rows)), key=paths.__getitem__)
+
+    snapshot = Snapshot(result.projDir, extensions)
+    snapshot.paths = [paths[idx] for idx in order]
+    snapshot.sizes = array('d', (result.sizes[rows[idx]] for idx in order))
+    snapshot.mtimes = array('d', (result.mtimes[rows[idx]] for idx in order))
+    snapshot.rows = array('i', (rows[idx] for idx in order))
+    return snapshot
+
+
+def snapshot_diff(old, new):
+    '''
+    Compare two snapshots in a single merge pass over their sorted paths.
+    Only files of extensions present in both snapshots are compared.
+    Arg 1: the previous snapshot <Snapshot>
+    Arg 2: the fresh snapshot, built by snapshot_fromResult <Snapshot>
+
+    Returns (added, modified, removed): added and modified are scan rows of the
+    fresh snapshot, removed is a list of (relativePath, size, mtime) tuples.
+    '''
+    common = old.extensions & new.extensions
+
+    def compared(path):
+        return os.path.splitext(path)[1].lower() in common
+
+    added, modified, removed = [], [], []
+    i, j = 0, 0
+    oldCount, newCount = len(old.paths), len(new.paths)
+    while i < oldCount or j < newCount:
+        oldPath = old.paths[i] if i < oldCount else None
+        newPath = new.paths[j] if j < newCount else None
+        if newPath is None or (oldPath is not None and oldPath < newPath):
+            if compared(oldPath):
+                removed.append((oldPath, old.sizes[i], old.mtimes[i]))
+            i += 1
+        elif oldPath is None or newPath < oldPath:
+            if compared(newPath):
+                added.append(new.rows[j])
+            j += 1
+        else:
+            if old.sizes[i] != new.sizes[j] or old.mtimes[i] != new.mtimes[j]:
+                modified.append(new.rows[j])
+            i += 1
+            j += 1
+    return added, modified, removed
+
+
+class SnapshotChanges(object):
+    '''
+    What changed in a project since its previous snapshot, as scan rows.
+    The baseline is None when the project had no snapshot.
+    '''
+    __slots__ = ('baseline', 'added', 'modified', 'removed', 'error')
+
+    def __init__(self, baseline, added=(), modified=(), removed=(), error=None):
+        self.baseline = baseline
+        self.added = list(added)
+        self.modified = list(modified)
+        self.removed = list(removed)
+        self.error = error
+
+
+def snapshot_visit(result, baseline=None, load=True):
+    '''
+    Diff a full scan against the snapshot of the previous visit, then store a fresh
+    snapshot of it. Building, compressing and writing the snapshot of a large
+    project takes a while, so this belongs on a worker thread.
+    Arg 1: the scan result <ScanResult>
+    Arg 2: the snapshot of the previous visit, if already loaded <Snapshot>
+    Arg 3: whether to load the stored snapshot instead of using Arg 2 <bool>
+
+    Returns a SnapshotChanges.
+    '''
+    if load:
+        baseline = snapshot_load(result.projDir)
+    fresh = snapshot_fromResult(result)
+    changes = SnapshotChanges(baseline)
+    if baseline is not None:
+        changes.added, changes.modified, changes.removed = snapshot_diff(baseline, fresh)
+    try:
+        snapshot_save(fresh)
+    except (IOError, OSError) as error:
+        changes.error = str(error)
+    return changes
+
+
+def snapshot_path(projDir):
+    '''
+    Return the file a project's snapshot is stored in.
+    Arg 1: the project path <string>
+    '''
+    key = projDir.encode('utf-8') if not isinstance(projDir, bytes) else projDir
+    return os.path.join(SNAPSHOTPATH, hashlib.md5(key).hexdigest() + '.snap')
+
+
+def snapshot_load(projDir):
+    '''
+    Return the stored snapshot of a project, or None.
+    Loading marks the snapshot as recently used, so pruning keeps it.
+    Arg 1: the project path <string>
+    '''
+    path = snapshot_path(projDir)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            snapshot = Snapshot.loads(f.read())
+        os.utime(path, None)
+    except (IOError, OSError, EOFError, ValueError, zlib.error, pickle.UnpicklingError):
+        return None
+    if snapshot is None or snapshot.projDir != projDir:
+        return None
+    return snapshot
+
+
+def snapshot_save(snapshot):
+    '''
+    Store a project's snapshot, replacing the previous one, then prune the store.
+    Arg 1: the snapshot <Snapshot>
+    '''
+    data = snapshot.dumps()
+    if len(data) > SNAPSHOT_MAXBYTES // 4:
+        return False
+    if not os.path.isdir(SNAPSHOTPATH):
+        os.makedirs(SNAPSHOTPATH)
+    path = snapshot_path(snapshot.projDir)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(path + '.tmp', path)
+    snapshot_prune()
+    return True
+
+
+def snapshot_prune(maxBytes=SNAPSHOT_MAXBYTES, maxAge=SNAPSHOT_MAXAGE):
+    '''
+    Delete stale snapshots, then the least recently used ones until the store fits.
+    Arg 1: the total size allowed <int>
+    Arg 2: the age in seconds after which unvisited snapshots are deleted <float>
+    '''
+    if not os.path.isdir(SNAPSHOTPATH):
+        return
+    files = []
+    for name in os.listdir(SNAPSHOTPATH):
+        path = os.path.join(SNAPSHOTPATH, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        files.append((st.st_mtime, st.st_size, path))
+
+    now = time.time()
+    total = sum(f[1] for f in files)
+    for mtime, size, path in sorted(files):
+        if now - mtime > maxAge or total > maxBytes:
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
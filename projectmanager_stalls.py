@@ -0,0 +1,199 @@
+#------------------------------------------------------------------------------
+# PROJECT MANAGER STALL DETECTOR, Tim Crowson
+#------------------------------------------------------------------------------
+# Opt-in watchdog for the UI thread. The panel beats a heartbeat from a timer
+# on the event loop; a background thread notices when beats stop coming,
+# takes the UI thread's Python stack while it is still blocked, and once the
+# event loop is back logs the duration, the blocking call site and the stack
+# to a rotating log.
+#
+# Beats also stop when no panel is shown. The UI thread is then idle in the
+# event loop, outside of any Python code, so a missing beat only counts as a
+# stall while the UI thread is running Python code.
+
+
+import os
+import sys
+import time
+import logging
+import threading
+import traceback
+import collections
+import logging.handlers
+
+
+# STALLS
+STALLS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'stalls.log')
+STALLS_THRESHOLD = 0.5              # seconds without a beat before the event loop counts as stalled
+STALLS_CHECKSECS = 0.05             # how often the watchdog looks at the heartbeat
+STALLS_LOGBYTES = 1024 * 1024       # size of the log before it is rotated
+STALLS_LOGBACKUPS = 3               # rotated logs kept
+STALLS_RECENT = 20                  # stalls kept in memory for the panel
+_KITPATH = os.path.normcase(os.path.dirname(os.path.abspath(__file__)))
+
+
+def stalls_callSite(frames):
+    '''
+    Return 'file:line in function' for the innermost frame of a stack that is
+    Project Manager code, or the innermost frame if none is, e.g. a stall in
+    Modo itself.
+    Arg 1: the stack, outermost first, as traceback.extract_stack returns it <list>
+    '''
+    if not frames:
+        return 'unknown'
+    site = frames[-1]
+    for frame in reversed(frames):
+        if os.path.normcase(os.path.dirname(os.path.abspath(frame[0]))) == _KITPATH:
+            site = frame
+            break
+    return '%s:%d in %s' % (os.path.basename(site[0]), site[1], site[2])
+
+
+class Stall(object):
+    '''
+    One stall of the UI thread: when it started, how long it lasted, and where
+    the UI thread was when it was noticed.
+    '''
+    __slots__ = ('started', 'seconds', 'callSite', 'blockedIn', 'stack')
+
+    def __init__(self, started, seconds, callSite, blockedIn, stack):
+        self.started = started
+        self.seconds = seconds
+        self.callSite = callSite
+        self.blockedIn = blockedIn
+        self.stack = stack
+
+    def describe(self):
+        '''
+        Return a one-line summary, e.g. '2.3 s at projectmanager.py:1523 in explore'.
+        '''
+        text = '%.1f s at %s' % (self.seconds, self.callSite)
+        if self.blockedIn != self.callSite:
+            text += ' (in %s)' % self.blockedIn
+        return text
+
+
+class StallDetector(object):
+    '''
+    Watches the event loop of one thread through the heartbeat it beats.
+    Beats are cheap, so they can come from a timer firing every few tens of
+    milliseconds; the gaps between them are the event loop's latency.
+    Arg 1: seconds without a beat before a stall is recorded <float>
+    Arg 2: the log file <string>
+    '''
+    def __init__(self, threshold=STALLS_THRESHOLD, path=STALLS_PATH):
+        self.threshold = threshold
+        self.path = path
+        self.count = 0
+        self.worstLatency = 0.0
+        self.recent = collections.deque(maxlen=STALLS_RECENT)
+        self._lock = threading.Lock()
+        self._lastBeat = None
+        self._threadId = None
+        self._sample = None
+        self._stopped = threading.Event()
+        self._thread = None
+        self._logger = None
+
+    def start(self):
+        '''
+        Start watching the calling thread, which must be the one beating.
+        '''
+        with self._lock:
+            self._threadId = threading.current_thread().ident
+            self._lastBeat = None
+        self._stopped.clear()
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='pm.stalls')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        '''
+        Stop watching; stalls in progress are dropped.
+        '''
+        self._stopped.set()
+        with self._lock:
+            self._lastBeat = None
+            self._sample = None
+
+    def isRunning(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stopped.is_set()
+
+    def beat(self):
+        '''
+        Tell the watchdog the event loop is running. Call from the watched thread.
+        '''
+        now = time.time()
+        with self._lock:
+            if self._lastBeat is not None:
+                self.worstLatency = max(self.worstLatency, now - self._lastBeat)
+            self._lastBeat = now
+
+    def _run(self):
+        while not self._stopped.wait(STALLS_CHECKSECS):
+            with self._lock:
+                lastBeat = self._lastBeat
+                sample = self._sample
+            if lastBeat is None:
+                continue
+
+            # stalled: take the stack once, while the UI thread is still blocked in it
+            waited = time.time() - lastBeat
+            if waited >= self.threshold and sample is None:
+                frame = sys._current_frames().get(self._threadId)
+                with self._lock:
+                    if self._lastBeat != lastBeat:
+                        continue
+                    if frame is None:
+                        # idle, or busy outside of Python: wait for the next beat
+                        self._lastBeat = None
+                        continue
+                    self._sample = (lastBeat, traceback.extract_stack(frame))
+
+            # the event loop is back: the stall lasted until the beat that ended it
+            elif sample is not None and lastBeat != sample[0]:
+                with self._lock:
+                    self._sample = None
+                self._record(sample[0], lastBeat - sample[0], sample[1])
+
+    def _record(self, started, seconds, stack):
+        stall = Stall(started, seconds, stalls_callSite(stack), stalls_callSite(stack[-1:]), stack)
+        with self._lock:
+            self.count += 1
+            self.recent.append(stall)
+        try:
+            self._getLogger().warning('%s\n%s', stall.describe(), ''.join(traceback.format_list(stack)).rstrip())
+        except (IOError, OSError):
+            pass
+
+    def _getLogger(self):
+        if self._logger is None:
+            folder = os.path.dirname(self.path)
+            if not os.path.isdir(folder):
+                os.makedirs(folder)
+            handler = logging.handlers.RotatingFileHandler(self.path, maxBytes=STALLS_LOGBYTES,
+                                                           backupCount=STALLS_LOGBACKUPS)
+            handler.setFormatter(logging.Formatter('%(asctime)s UI stall: %(message)s'))
+            self._logger = logging.getLogger('projectmanager.stalls.%d' % id(self))
+            self._logger.propagate = False
+            self._logger.addHandler(handler)
+        return self._logger
+
+
+# process-wide stall detector, shared by every Project Manager panel
+STALLS = None
+
+
+def stalls_getShared(threshold=STALLS_THRESHOLD, path=STALLS_PATH):
+    '''
+    Return the process-wide StallDetector, creating it on first use.
+    Arg 1: seconds without a beat before a stall is recorded <float>
+    Arg 2: the log file <string>
+    '''
+    global STALLS
+    if STALLS is None or STALLS.path != path:
+        STALLS = StallDetector(threshold, path)
+    else:
+        STALLS.threshold = threshold
+    return STALLS
@@ -0,0 +1,343 @@
+#------------------------------------------------------------------------------
+# PROJECT MANAGER THUMBNAILS, Tim Crowson
+#------------------------------------------------------------------------------
+# Thumbnails for the scene grid: the previews Modo embeds in scenes and
+# presets, and image files. Thumbnails are decoded by background threads,
+# only for the cells on screen, and kept twice: downscaled on the local disk,
+# keyed by path and modification time, and in a memory-bounded LRU cache.
+#
+# Decoding and saving images is left to callables given by the panel, so this
+# module stays free of Qt.
+
+
+import os
+import struct
+import hashlib
+import threading
+import collections
+
+import projectmanager_localcache
+
+
+# THUMBNAILS
+THUMBS_SIZE = 128                                   # longest side of a thumbnail, in pixels
+THUMBS_PATH = os.path.join(os.path.expanduser('~'), '.projectmanager', 'thumbs')
+THUMBS_FORMAT = '.png'
+THUMBS_MEMORY = 64 * 1024 * 1024                    # bytes of decoded thumbnails kept in memory
+THUMBS_DISKQUOTA = 512 * 1024 * 1024                # bytes of downscaled thumbnails kept on disk
+THUMBS_WORKERS = 2
+THUMBS_PREVIEWEXTENSIONS = ('.lxo', '.lxl')
+THUMBS_LXOCHUNKS = (b'PRVW', b'THUM', b'THMB')      # chunks holding a scene's preview image
+THUMBS_LXOMAXCHUNKS = 64                            # chunks skipped over before giving up on a preview
+THUMBS_MAXPREVIEW = 16 * 1024 * 1024                # bytes of a preview chunk read at most
+_PNG = b'\x89PNG\r\n\x1a\n'
+_JPEG = b'\xff\xd8\xff'
+
+
+def thumbs_key(path, mtime):
+    '''
+    Return the cache key of a file's thumbnail; a modified file gets a new key.
+    Arg 1: the file path <string>
+    Arg 2: the modification time <float>
+    '''
+    key = '%s|%r' % (os.path.normcase(os.path.abspath(path)), float(mtime))
+    if not isinstance(key, bytes):
+        key = key.encode('utf-8')
+    return hashlib.sha1(key).hexdigest()
+
+
+def thumbs_diskPath(folder, key):
+    '''
+    Return where a thumbnail is kept on disk, in one of 256 subfolders.
+    Arg 1: the thumbnail folder <string>
+    Arg 2: the thumbnail key <string>
+    '''
+    return os.path.join(folder, key[:2], key + THUMBS_FORMAT)
+
+
+def thumbs_lxoPreview(path, maxChunks=THUMBS_LXOMAXCHUNKS):
+    '''
+    Return the preview embedded in a Modo scene or preset, reading only the
+    chunk headers up to it. Returns ('encoded', bytes) for PNG or JPEG data,
+    ('rgba', width, height, bytes) or ('rgb', width, height, bytes) for raw
+    pixels, or None if the file has no preview this can read.
+    Arg 1: the scene path <string>
+    Arg 2: the number of chunks to look through <int>
+    '''
+    with open(path, 'rb') as f:
+        fileSize = os.fstat(f.fileno()).st_size
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b'FORM':
+            return None
+        for idx in range(maxChunks):
+            head = f.read(8)
+            if len(head) < 8:
+                return None
+            chunkId = head[:4]
+            size = struct.unpack('>I', head[4:])[0]
+            if chunkId in THUMBS_LXOCHUNKS:
+                # the size comes from the file: don't trust it with a large read
+                if size > THUMBS_MAXPREVIEW or size > fileSize - f.tell():
+                    return None
+                return thumbs_parsePreview(f.read(size))
+            # chunks are padded to an even length
+            f.seek(size + (size & 1), 1)
+    return None
+
+
+def thumbs_parsePreview(data):
+    '''
+    Return the image in a preview chunk: encoded data if it contains a PNG or
+    JPEG, otherwise raw pixels after a width, height and flags header.
+    Arg 1: the chunk data <bytes>
+    '''
+    for signature in (_PNG, _JPEG):
+        start = data.find(signature)
+        if start != -1:
+            return ('encoded', data[start:])
+    if len(data) < 8:
+        return None
+    width, height = struct.unpack('>HH', data[:4])
+    pixels = data[8:]
+    if width and height and len(pixels) == width * height * 4:
+        return ('rgba', width, height, pixels)
+    if width and height and len(pixels) == width * height * 3:
+        return ('rgb', width, height, pixels)
+    return None
+
+
+def thumbs_pruneDisk(folder, quota=THUMBS_DISKQUOTA):
+    '''
+    Delete the oldest thumbnails on disk until the rest fit the quota.
+    Returns the number of thumbnails deleted.
+    Arg 1: the thumbnail folder <string>
+    Arg 2: the disk quota in bytes <int>
+    '''
+    files = []
+    try:
+        subfolders = os.listdir(folder)
+    except OSError:
+        return 0
+    for subfolder in subfolders:
+        subPath = os.path.join(folder, subfolder)
+        try:
+            names = os.listdir(subPath)
+        except OSError:
+            continue
+        for name in names:
+            path = os.path.join(subPath, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+    total = sum(f[1] for f in files)
+    deleted = 0
+    for mtime, size, path in sorted(files):
+        if total <= quota:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        deleted += 1
+    return deleted
+
+
+class ThumbnailCache(object):
+    '''
+    Least recently used cache bounded by the bytes its values take. Values are
+    opaque, e.g. pixmaps; a cost is given with each one.
+    Arg 1: the memory budget in bytes <int>
+    '''
+    def __init__(self, maxBytes=THUMBS_MEMORY):
+        self.maxBytes = maxBytes
+        self.bytes = 0
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        '''
+        Return a cached value, marking it as recently used.
+        Arg 1: the key <string>
+        Arg 2: returned if the key isn't cached
+        '''
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return default
+        self._entries[key] = entry
+        return entry[0]
+
+    def put(self, key, value, cost):
+        '''
+        Cache a value, dropping the least recently used ones to stay in budget.
+        Arg 1: the key <string>
+        Arg 2: the value
+        Arg 3: the bytes the value takes <int>
+        '''
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old[1]
+        self._entries[key] = (value, cost)
+        self.bytes += cost
+        while self.bytes > self.maxBytes and len(self._entries) > 1:
+            dropped, (value, cost) = self._entries.popitem(last=False)
+            self.bytes -= cost
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+
+class ThumbnailLoader(object):
+    '''
+    Decodes thumbnails with a few background threads. Each request() replaces
+    the pending requests, so cells scrolled out of view are never decoded;
+    requests are decoded in the order given. Thumbnails already on disk are read
+    from there, others are decoded from the file and saved downscaled. The disk
+    cache is only used if its folder is private to the user.
+    Finished thumbnails queue up until results() collects them.
+    Arg 1: callable decoding (path, ext, size) into an image, or None <callable>
+    Arg 2: callable saving (image, path), returning True once saved <callable>
+    Arg 3: the thumbnail folder <string>
+    Arg 4: the number of threads <int>
+    '''
+    def __init__(self, decode, save, folder=THUMBS_PATH, workers=THUMBS_WORKERS, size=THUMBS_SIZE):
+        self.decode = decode
+        self.save = save
+        self.folder = folder
+        self.workers = workers
+        self.size = size
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._pending = []
+        self._busy = set()
+        self._results = collections.deque()
+        self._threads = []
+        self._pruned = False
+        self._private = False
+
+    def request(self, requests):
+        '''
+        Decode some thumbnails, dropping those requested before and not yet started.
+        Arg 1: (key, path, mtime) tuples, most wanted first <list>
+        '''
+        with self._lock:
+            self._pending = [r for r in reversed(requests) if r[0] not in self._busy]
+            self._wake.notify_all()
+        self._ensureThreads()
+
+    def cancel(self):
+        '''
+        Drop every pending request.
+        '''
+        with self._lock:
+            self._pending = []
+
+    def results(self):
+        '''
+        Return the (key, image) pairs decoded since the last call; the image is
+        None for files without a thumbnail.
+        '''
+        with self._lock:
+            results = list(self._results)
+            self._results.clear()
+        return results
+
+    def pending(self):
+        '''
+        Return the number of thumbnails requested or being decoded.
+        '''
+        with self._lock:
+            return len(self._pending) + len(self._busy)
+
+    def _ensureThreads(self):
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._run, name='pm.thumbs.%d' % len(self._threads))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _next(self):
+        with self._lock:
+            while not self._pending:
+                self._wake.wait(30)
+                if not self._pending:
+                    return None
+            request = self._pending.pop()
+            self._busy.add(request[0])
+            return request
+
+    def _run(self):
+        # the first thread to start checks and trims the disk cache, off the panel's thread
+        with self._lock:
+            prune = not self._pruned
+            self._pruned = True
+        if prune:
+            try:
+                projectmanager_localcache.localcache_privateFolder(self.folder)
+                self._private = True
+            except OSError:
+                pass
+            if self._private:
+                thumbs_pruneDisk(self.folder)
+        while True:
+            request = self._next()
+            if request is None:
+                return
+            key, path, mtime = request
+            image = None
+            try:
+                image = self._load(key, path)
+            except (IOError, OSError, ValueError, struct.error):
+                pass
+            with self._lock:
+                self._busy.discard(key)
+                self._results.append((key, image))
+
+    def _load(self, key, path):
+        if not self._private:
+            return self.decode(path, os.path.splitext(path)[1].lower(), self.size)
+        diskPath = thumbs_diskPath(self.folder, key)
+        if os.path.exists(diskPath):
+            image = self.decode(diskPath, THUMBS_FORMAT, self.size)
+            if image is not None:
+                return image
+        image = self.decode(path, os.path.splitext(path)[1].lower(), self.size)
+        if image is not None:
+            folder = os.path.dirname(diskPath)
+            if not os.path.isdir(folder):
+                try:
+                    os.makedirs(folder, 0o700)
+                except OSError:
+                    pass
+            # written under a temporary name, so other panels never read half a thumbnail
+            partial = diskPath[:-len(THUMBS_FORMAT)] + '.part' + THUMBS_FORMAT
+            if self.save(image, partial):
+                try:
+                    os.rename(partial, diskPath)
+                except OSError:
+                    os.remove(partial)
+        return image
+
+
+# process-wide memory cache of decoded thumbnails, shared by every Project Manager panel
+THUMBCACHE = None
+
+
+def thumbs_getShared(maxBytes=THUMBS_MEMORY):
+    '''
+    Return the process-wide ThumbnailCache, creating it on first use.
+    Arg 1: the memory budget in bytes <int>
+    '''
+    global THUMBCACHE
+    if THUMBCACHE is None:
+        THUMBCACHE = ThumbnailCache(maxBytes)
+    return THUMBCACHE
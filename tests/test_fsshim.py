@@ -0,0 +1,183 @@
+#------------------------------------------------------------------------------
+# PROJECT MANAGER NETWORK SHARE TESTS, Tim Crowson
+#------------------------------------------------------------------------------
+# Scans, health checks and project list loading over simulated shares, with
+# latency, timeouts and hung mounts injected by projectmanager_fsshim.
+# Run with 'python -m unittest discover tests' under Python 2.7 and 3.
+
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import projectmanager_scan
+import projectmanager_fsshim
+import projectmanager_service
+import projectmanager_multiscan
+
+
+EXTENSIONS = set(['.lxo', '.exr', '.obj'])
+
+
+def countFiles(tree, top):
+    # files below a directory of a synthetic tree
+    return sum(1 for root, children in tree.items() if root == top or root.startswith(top + os.sep)
+               for name, isDir, size, mtime in children if not isDir)
+
+
+class ScanLatencyTest(unittest.TestCase):
+    '''
+    Scans over a slow share either complete, skipping what fails, or abort
+    within their budget; they never hang on a dead mount.
+    '''
+    def setUp(self):
+        self.projDir = '/mnt/share/%s' % self.id().split('.')[-1]
+        self.tree = projectmanager_fsshim.fsshim_buildTree(self.projDir, 20, 10)
+        self.synthetic = projectmanager_fsshim.SyntheticFileSystem(self.tree)
+
+    def test_completes(self):
+        share = projectmanager_fsshim.LatencyFileSystem(self.synthetic, latency=0.001, jitter=0.001, seed=1)
+        with projectmanager_fsshim.fsshim_installed(share):
+            result = projectmanager_scan.scan_project(self.projDir, EXTENSIONS)
+        self.assertEqual(len(result), countFiles(self.tree, self.projDir))
+        self.assertEqual(share.calls['listDir'], len(self.tree))
+        self.assertTrue(projectmanager_scan.FS is not share)
+
+    def test_timeouts(self):
+        share = projectmanager_fsshim.LatencyFileSystem(self.synthetic, timeoutRate=0.3, seed=2)
+        with projectmanager_fsshim.fsshim_installed(share):
+            result = projectmanager_scan.scan_project(self.projDir, EXTENSIONS)
+        self.assertTrue(len(result) < countFiles(self.tree, self.projDir))
+        for row in result.rows():
+            self.assertTrue(result.fullPath(row) in self.synthetic.files)
+
+    def test_hungFolder(self):
+        hung = [root for root in self.tree if root.count(os.sep) == self.projDir.count(os.sep) + 1][0]
+        share = projectmanager_fsshim.LatencyFileSystem(self.synthetic, hungPaths=[hung], hangSeconds=0.2)
+        started = time.time()
+        with projectmanager_fsshim.fsshim_installed(share):
+            result = projectmanager_scan.scan_project(self.projDir, EXTENSIONS)
+        self.assertTrue(time.time() - started < 5)
+        self.assertEqual(len(result), countFiles(self.tree, self.projDir) - countFiles(self.tree, hung))
+
+    def test_abort(self):
+        share = projectmanager_fsshim.LatencyFileSystem(self.synthetic, latency=0.001)
+        abort = lambda: share.calls['listDir'] >= 5
+        with projectmanager_fsshim.fsshim_installed(share):
+            self.assertRaises(projectmanager_scan.ScanAborted,
+                              projectmanager_scan.scan_project, self.projDir, EXTENSIONS, abort)
+        self.assertEqual(share.calls['listDir'], 5)
+
+    def test_budgetEntries(self):
+        share = projectmanager_fsshim.LatencyFileSystem(self.synthetic)
+        budget = projectmanager_scan.IOBudget(maxEntries=50, entriesPerSec=0)
+        with projectmanager_fsshim.fsshim_installed(share):
+            self.assertRaises(projectmanager_scan.ScanAborted,
+                              projectmanager_scan.scan_project, self.projDir, EXTENSIONS, None, budget)
+        self.assertTrue(budget.used > 50)
+        self.assertTrue(share.calls['listDir'] < len(self.tree))
+
+    def test_budgetRate(self):
+        share = projectmanager_fsshim.LatencyFileSystem(self.synthetic)
+        budget = projectmanager_scan.IOBudget(maxEntries=0, entriesPerSec=1000)
+        started = time.time()
+        with projectmanager_fsshim.fsshim_installed(share):
+            projectmanager_scan.scan_project(self.projDir, EXTENSIONS, budget=budget)
+        # the last sleep may be cut short, by at most 0.25 s
+        self.assertTrue(time.time() - started >= budget.used / 1000.0 - 0.3)
+
+
+class HealthCheckTest(unittest.TestCase):
+    '''
+    A health check reports dead mounts as unreachable, once their calls time out.
+    '''
+    def setUp(self):
+        self.projects = ['/mnt/share/alive', '/mnt/dead/project', '/mnt/share/other']
+        tree = {}
+        for projDir in self.projects:
+            tree.update(projectmanager_fsshim.fsshim_buildTree(projDir, 2, 2))
+        self.synthetic = projectmanager_fsshim.SyntheticFileSystem(tree)
+
+    def test_hungMount(self):
+        share = projectmanager_fsshim.LatencyFileSystem(self.synthetic, latency=0.001,
+                                                        hungPaths=['/mnt/dead'], hangSeconds=0.2)
+        started = time.time()
+        with projectmanager_fsshim.fsshim_installed(share):
+            health = projectmanager_scan.scan_checkHealth(self.projects + ['/mnt/share/missing'])
+        self.assertTrue(time.time() - started < 5)
+        self.assertEqual(health, {'/mnt/share/alive': True, '/mnt/dead/project': False,
+                                  '/mnt/share/other': True, '/mnt/share/missing': False})
+
+    def test_released(self):
+        share = projectmanager_fsshim.LatencyFileSystem(self.synthetic, hungPaths=['/mnt/dead'], hangSeconds=None)
+        share.release()
+        with projectmanager_fsshim.fsshim_installed(share):
+            health = projectmanager_scan.scan_checkHealth(self.projects)
+        self.assertFalse(health['/mnt/dead/project'])
+
+    def test_timeouts(self):
+        share = projectmanager_fsshim.LatencyFileSystem(self.synthetic, timeoutRate=1.0)
+        with projectmanager_fsshim.fsshim_installed(share):
+            health = projectmanager_scan.scan_checkHealth(self.projects)
+        self.assertEqual(list(health.values()), [False] * len(self.projects))
+
+
+class ProjectListTest(unittest.TestCase):
+    '''
+    Loading a project list over a slow share with a hung mount: the health check
+    is stored by the service, and a merged scan of the list lists every reachable project.
+    '''
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.projects = ['/mnt/dead/projlist', '/mnt/share/projlistA', '/mnt/share/projlistB']
+        self.projlistPath = os.path.join(self.folder, 'projects.projlist')
+        with open(self.projlistPath, 'w') as f:
+            f.write('\n'.join(self.projects) + '\n')
+        self.tree = projectmanager_fsshim.fsshim_projlistTree(self.projlistPath, 5, 4)
+        self.share = projectmanager_fsshim.LatencyFileSystem(
+            projectmanager_fsshim.SyntheticFileSystem(self.tree), latency=0.001, jitter=0.001,
+            hungPaths=['/mnt/dead'], hangSeconds=0.2, seed=3)
+        for projDir in self.projects:
+            projectmanager_scan.SCANCACHE.discard(projDir)
+
+    def tearDown(self):
+        for projDir in self.projects:
+            projectmanager_scan.SCANCACHE.discard(projDir)
+        shutil.rmtree(self.folder)
+
+    def test_loadProjectList(self):
+        service = projectmanager_service.ProjectService(
+            self.projlistPath, os.path.join(self.folder, 'filters'), os.path.join(self.folder, 'options'),
+            os.path.join(self.folder, 'usage'), os.path.join(self.folder, 'versions'), {})
+        projects = service.projects()
+        self.assertEqual(projects, self.projects)
+
+        started = time.time()
+        with projectmanager_fsshim.fsshim_installed(self.share):
+            service.setHealth(projectmanager_scan.scan_checkHealth(projects))
+            scan = projectmanager_multiscan.MultiScan(projects, EXTENSIONS)
+            merged = projectmanager_multiscan.MergedScanResult(projects, EXTENSIONS)
+            scan.start()
+            while not scan.isDone():
+                scan.drain(merged)
+                time.sleep(0.005)
+                self.assertTrue(time.time() - started < 30)
+            scan.drain(merged)
+        self.assertEqual(service.health(), {'/mnt/dead/projlist': False,
+                                            '/mnt/share/projlistA': True, '/mnt/share/projlistB': True})
+        for projDir in self.projects:
+            self.assertTrue(projDir in scan.finished)
+        counts = {}
+        for row in merged.rows():
+            counts[merged.project(row)] = counts.get(merged.project(row), 0) + 1
+        self.assertEqual(counts, {'/mnt/share/projlistA': countFiles(self.tree, '/mnt/share/projlistA'),
+                                  '/mnt/share/projlistB': countFiles(self.tree, '/mnt/share/projlistB')})
+
+
+if __name__ == '__main__':
+    unittest.main()
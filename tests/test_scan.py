@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# PROJECT MANAGER SCANNING TESTS, Tim Crowson
+#------------------------------------------------------------------------------
+# Run with 'python -m unittest discover tests' under Python 2.7 and 3.
+
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import projectmanager_scan
+import projectmanager_index
+
+
+class NonAsciiNamesTest(unittest.TestCase):
+    '''
+    Names found under a unicode project path come back as unicode, so they join
+    with the project path; on Python 2 they used to come back as UTF-8 bytes.
+    '''
+    def setUp(self):
+        try:
+            u'szène'.encode(sys.getfilesystemencoding() or 'ascii')
+        except UnicodeEncodeError:
+            self.skipTest('the file system encoding cannot hold non-ASCII names')
+        self.projDir = os.path.join(tempfile.mkdtemp(), u'proj')
+        os.makedirs(os.path.join(self.projDir, u'Scènes'))
+        for name in (u'szène_v001.lxo', u'szène_v002.lxo'):
+            open(os.path.join(self.projDir, u'Scènes', name), 'wb').close()
+
+    def tearDown(self):
+        shutil.rmtree(os.path.dirname(self.projDir))
+
+    def checkResult(self, result):
+        paths = sorted(result.fullPath(row) for row in result.rows())
+        self.assertEqual(paths, [os.path.join(self.projDir, u'Scènes', u'szène_v001.lxo'),
+                                 os.path.join(self.projDir, u'Scènes', u'szène_v002.lxo')])
+        self.assertEqual(len(result.versionGroups), 1)
+        for path in paths:
+            self.assertTrue(os.path.isfile(path))
+
+    def test_scanProject(self):
+        self.checkResult(projectmanager_scan.scan_project(self.projDir, set(['.lxo'])))
+
+    def test_sharedIndex(self):
+        # written by the first scan, read back by the second
+        projectmanager_index.index_scan(self.projDir, set(['.lxo']))
+        self.assertTrue(os.path.isfile(os.path.join(self.projDir, projectmanager_index.INDEX_NAME)))
+        self.checkResult(projectmanager_index.index_scan(self.projDir, set(['.lxo'])))
+
+
+
+class SequenceTest(unittest.TestCase):
+    '''
+    A frame spelled with different paddings is one frame, not a negative gap.
+    '''
+    def setUp(self):
+        self.projDir = tempfile.mkdtemp()
+        for name in ('beauty.1.exr', 'beauty.001.exr', 'beauty.2.exr', 'beauty.004.exr', 'beauty.0004.exr'):
+            open(os.path.join(self.projDir, name), 'wb').close()
+
+    def tearDown(self):
+        shutil.rmtree(self.projDir)
+
+    def test_duplicateFrames(self):
+        result = projectmanager_scan.scan_project(self.projDir, set(['.exr']))
+        self.assertEqual(len(result.sequences), 1)
+        seq = result.sequences[0]
+        self.assertEqual(len(seq), 5)
+        self.assertEqual(seq.frameCount(), 3)
+        self.assertEqual(seq.missingCount(), 1)
+        self.assertEqual(seq.ranges(), [(1, 2), (4, 4)])
+        self.assertEqual(seq.gaps(), [(3, 3)])
+        self.assertEqual(seq.describe(), '1-4 (1 missing, 2 duplicated)')
+
+
+if __name__ == '__main__':
+    unittest.main()